@@ -1,22 +1,103 @@
+import os
+import json
+import hashlib
+import uuid
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
 import pandas as pd
+import numpy as np
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Callable
 import io
 from datetime import datetime
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-# Define required schemas for each CSV file
-REQUIRED_SCHEMAS = {
-    'Products.csv': ['ProductID', 'ProductName', 'INN', 'DosageForm', 'Strength'],
-    'Authorizations.csv': ['AuthorizationID', 'ProductID', 'Country', 'MarketingStatus', 'AuthorizationDate', 'LicenseNumber'],
-    'AdverseEvents.csv': ['AEID', 'ProductID', 'ReportedDate', 'PatientAge', 'Gender', 'EventDescription', 'Outcome'],
-    'RegulatoryActions.csv': ['ActionID', 'ProductID', 'ActionDate', 'Region', 'ActionTaken', 'Justification'],
-    'ExposureEstimates.csv': ['ExposureID', 'ProductID', 'Region', 'TimePeriod', 'EstimatedPatients', 'EstimationMethod'],
-    'ClinicalStudies.csv': ['StudyID', 'ProductID', 'StudyTitle', 'Status', 'CompletionDate']
+# Rows per chunk in streaming ingestion mode
+STREAM_CHUNK_ROWS = 500_000
+
+# Uploads of product-related files at least this large are ingested in
+# streaming mode (PHARMA_PULSE_STREAM_THRESHOLD_MB overrides it)
+STREAM_THRESHOLD_BYTES = int(os.environ.get("PHARMA_PULSE_STREAM_THRESHOLD_MB", "512")) * 1024 * 1024
+
+# Store cleaned text columns as Arrow-backed strings
+USE_ARROW_STRINGS = os.environ.get("PHARMA_PULSE_ARROW_STRINGS", "").lower() in ("1", "true", "yes")
+
+# Typed column specification for each CSV file. Values are the dtype applied
+# at parse time; 'date' columns are parsed with DATE_FORMAT.
+SCHEMA_SPECS = {
+    'Products.csv': {
+        'ProductID': 'str', 'ProductName': 'str', 'INN': 'str', 'DosageForm': 'str', 'Strength': 'str'
+    },
+    'Authorizations.csv': {
+        'AuthorizationID': 'str', 'ProductID': 'str', 'Country': 'category', 'MarketingStatus': 'category',
+        'AuthorizationDate': 'date', 'LicenseNumber': 'str'
+    },
+    'AdverseEvents.csv': {
+        'AEID': 'str', 'ProductID': 'str', 'ReportedDate': 'date', 'PatientAge': 'float64', 'Gender': 'category',
+        'EventDescription': 'str', 'Outcome': 'category'
+    },
+    'RegulatoryActions.csv': {
+        'ActionID': 'str', 'ProductID': 'str', 'ActionDate': 'date', 'Region': 'category', 'ActionTaken': 'str',
+        'Justification': 'str'
+    },
+    'ExposureEstimates.csv': {
+        'ExposureID': 'str', 'ProductID': 'str', 'Region': 'category', 'TimePeriod': 'str',
+        'EstimatedPatients': 'Int64', 'EstimationMethod': 'str'
+    },
+    'ClinicalStudies.csv': {
+        'StudyID': 'str', 'ProductID': 'str', 'StudyTitle': 'str', 'Status': 'category', 'CompletionDate': 'date'
+    }
+}
+
+# Files whose rows belong to a product through their ProductID column
+PRODUCT_RELATED_FILES = [
+    'Authorizations.csv', 'AdverseEvents.csv', 'RegulatoryActions.csv',
+    'ExposureEstimates.csv', 'ClinicalStudies.csv'
+]
+
+# Date column placing each row of a dataset in a PSUR reporting period. Rows
+# are sorted by date within each product so a period is a binary search.
+# Other datasets (authorizations, exposure, studies) are cumulative.
+PERIOD_DATE_COLUMNS = {
+    'AdverseEvents.csv': 'ReportedDate',
+    'RegulatoryActions.csv': 'ActionDate'
+}
+
+# Number of product slices kept in the LRU cache used by get_product_slice
+PRODUCT_SLICE_CACHE_SIZE = 64
+
+product_slice_cache = OrderedDict()
+product_slice_lock = threading.Lock()
+
+# Date format applied to 'date' columns at parse time. A column with values that
+# do not match is left as text, and clean_dataframe parses it with the same
+# format, turning only the invalid values into missing dates.
+DATE_FORMAT = 'ISO8601'
+
+# Version of the cleaning code (the typed read and clean_dataframe). It is part
+# of the dataset cache key, so bump it whenever cleaning changes to stop cached
+# frames cleaned by the old code from being served.
+CLEANING_VERSION = 2
+
+# Patient age bands as (label, lower bound in years). Each band runs up to the
+# next band's lower bound and the last band is open-ended. 'ich' follows the
+# ICH E11 paediatric subsets and the ICH E7 elderly groups.
+AGE_BAND_PRESETS = {
+    'summary': [('0-17', 0), ('18-64', 18), ('65+', 65)],
+    'ich': [
+        ('0-27d', 0), ('28d-23m', 28 / 365.25), ('2-11', 2), ('12-17', 12),
+        ('18-64', 18), ('65-84', 65), ('85+', 85)
+    ]
 }
 
-def validate_file_schema(df: pd.DataFrame, required_columns: List[str], file_name: str) -> Dict[str, Any]:
+# Define required schemas for each CSV file
+REQUIRED_SCHEMAS = {file_name: list(spec) for file_name, spec in SCHEMA_SPECS.items()}
+
+def validate_file_schema(df: pd.DataFrame, required_columns: List[str], file_name: str,
+                         source_columns: List[str] = None) -> Dict[str, Any]:
     """
     Validate that a DataFrame has the required columns and basic data quality
     
@@ -24,6 +105,102 @@ def validate_file_schema(df: pd.DataFrame, required_columns: List[str], file_nam
         df: DataFrame to validate
         required_columns: List of required column names
         file_name: Name of the file being validated
+        source_columns: Columns present in the source file, if the DataFrame
+            was read with a column subset (defaults to df.columns)
+    
+    Returns:
+        Dictionary with validation results
+    """
+    
+    try:
+        stats = collect_validation_stats(df, file_name)
+        validation_result = build_validation_result(stats, required_columns, file_name, source_columns)
+        
+    except Exception as e:
+        validation_result = {
+            'valid': False,
+            'errors': [f"Validation error: {str(e)}"],
+            'warnings': [],
+            'rows': len(df)
+        }
+        logger.error(f"Error validating {file_name}: {str(e)}")
+    
+    return validation_result
+
+def collect_validation_stats(df: pd.DataFrame, file_name: str, seen_product_ids: set = None) -> Dict[str, Any]:
+    """
+    Collect the statistics used by schema validation from a DataFrame or chunk
+    
+    Statistics from consecutive chunks of the same file can be combined with
+    merge_validation_stats, so large files can be validated incrementally.
+    
+    Args:
+        df: DataFrame (or chunk) to collect statistics from
+        file_name: Name of the file being validated
+        seen_product_ids: ProductIDs seen in earlier chunks of Products.csv,
+            updated in place so duplicates across chunks are counted
+    
+    Returns:
+        Dictionary of row, null and rule-violation counts
+    """
+    
+    stats = {
+        'rows': len(df),
+        'columns': list(df.columns),
+        'non_null_counts': df.notna().sum().to_dict(),
+        'null_product_ids': 0,
+        'duplicate_product_ids': 0,
+        'invalid_ages': 0,
+        'negative_patients': 0
+    }
+    
+    if 'ProductID' in df.columns:
+        product_ids = df['ProductID']
+        stats['null_product_ids'] = int(product_ids.isnull().sum())
+        
+        # Check for duplicate keys in primary files
+        if file_name == 'Products.csv':
+            duplicates = int(product_ids.duplicated().sum())
+            if seen_product_ids is not None:
+                unique_ids = product_ids.dropna().unique()
+                duplicates += int(pd.Series(unique_ids).isin(seen_product_ids).sum())
+                seen_product_ids.update(unique_ids)
+            stats['duplicate_product_ids'] = duplicates
+    
+    # File-specific statistics
+    if file_name == 'AdverseEvents.csv' and 'PatientAge' in df.columns:
+        stats['invalid_ages'] = int(df[(df['PatientAge'] < 0) | (df['PatientAge'] > 120)]['PatientAge'].count())
+    
+    elif file_name == 'ExposureEstimates.csv' and 'EstimatedPatients' in df.columns:
+        stats['negative_patients'] = int(df[df['EstimatedPatients'] < 0]['EstimatedPatients'].count())
+    
+    return stats
+
+def merge_validation_stats(total: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the statistics of one chunk to the running totals for a file"""
+    
+    if not total:
+        return {**stats, 'non_null_counts': dict(stats['non_null_counts'])}
+    
+    for key in ('rows', 'null_product_ids', 'duplicate_product_ids', 'invalid_ages', 'negative_patients'):
+        total[key] += stats[key]
+    
+    for col, count in stats['non_null_counts'].items():
+        total['non_null_counts'][col] = total['non_null_counts'].get(col, 0) + count
+    
+    return total
+
+def build_validation_result(stats: Dict[str, Any], required_columns: List[str], file_name: str,
+                            source_columns: List[str] = None) -> Dict[str, Any]:
+    """
+    Turn collected validation statistics into a validation result
+    
+    Args:
+        stats: Statistics from collect_validation_stats (or merged chunks)
+        required_columns: List of required column names
+        file_name: Name of the file being validated
+        source_columns: Columns present in the source file (defaults to the
+            columns the statistics were collected from)
     
     Returns:
         Dictionary with validation results
@@ -33,131 +210,385 @@ def validate_file_schema(df: pd.DataFrame, required_columns: List[str], file_nam
         'valid': True,
         'errors': [],
         'warnings': [],
-        'rows': len(df)
+        'rows': stats['rows']
     }
     
-    try:
-        # Check if DataFrame is empty
-        if df.empty:
-            validation_result['valid'] = False
-            validation_result['errors'].append("File is empty")
-            return validation_result
-        
-        # Check for required columns
-        missing_columns = set(required_columns) - set(df.columns)
-        if missing_columns:
+    # Check if DataFrame is empty
+    if stats['rows'] == 0:
+        validation_result['valid'] = False
+        validation_result['errors'].append("File is empty")
+        return validation_result
+    
+    source_columns = stats['columns'] if source_columns is None else source_columns
+    
+    # Check for required columns
+    missing_columns = set(required_columns) - set(source_columns)
+    if missing_columns:
+        validation_result['valid'] = False
+        validation_result['errors'].append(f"Missing required columns: {', '.join(missing_columns)}")
+    
+    # Check for extra columns (warning only)
+    extra_columns = set(source_columns) - set(required_columns)
+    if extra_columns:
+        validation_result['warnings'].append(f"Extra columns found: {', '.join(extra_columns)}")
+    
+    # Check for completely null columns
+    null_columns = [col for col in stats['columns'] if stats['non_null_counts'].get(col, 0) == 0]
+    if null_columns:
+        validation_result['errors'].append(f"Columns with all null values: {', '.join(null_columns)}")
+        validation_result['valid'] = False
+    
+    # Check for ProductID presence and validity (for files that should have it)
+    if 'ProductID' in required_columns:
+        if stats['null_product_ids'] > 0:
+            validation_result['errors'].append(f"Found {stats['null_product_ids']} rows with null ProductID")
             validation_result['valid'] = False
-            validation_result['errors'].append(f"Missing required columns: {', '.join(missing_columns)}")
-        
-        # Check for extra columns (warning only)
-        extra_columns = set(df.columns) - set(required_columns)
-        if extra_columns:
-            validation_result['warnings'].append(f"Extra columns found: {', '.join(extra_columns)}")
         
-        # Check for completely null columns
-        null_columns = df.columns[df.isnull().all()].tolist()
-        if null_columns:
-            validation_result['errors'].append(f"Columns with all null values: {', '.join(null_columns)}")
+        if stats['duplicate_product_ids'] > 0:
+            validation_result['errors'].append(f"Found {stats['duplicate_product_ids']} duplicate ProductIDs")
             validation_result['valid'] = False
-        
-        # Check for ProductID presence and validity (for files that should have it)
-        if 'ProductID' in required_columns:
-            if df['ProductID'].isnull().any():
-                null_product_ids = df['ProductID'].isnull().sum()
-                validation_result['errors'].append(f"Found {null_product_ids} rows with null ProductID")
-                validation_result['valid'] = False
-            
-            # Check for duplicate keys in primary files
-            if file_name == 'Products.csv' and 'ProductID' in df.columns:
-                if df['ProductID'].duplicated().any():
-                    duplicate_count = df['ProductID'].duplicated().sum()
-                    validation_result['errors'].append(f"Found {duplicate_count} duplicate ProductIDs")
-                    validation_result['valid'] = False
-        
-        # File-specific validations
-        if file_name == 'AdverseEvents.csv':
-            # Check for valid age values
-            if 'PatientAge' in df.columns:
-                invalid_ages = df[(df['PatientAge'] < 0) | (df['PatientAge'] > 120)]['PatientAge'].count()
-                if invalid_ages > 0:
-                    validation_result['warnings'].append(f"Found {invalid_ages} rows with suspicious age values")
-        
-        elif file_name == 'ExposureEstimates.csv':
-            # Check for valid patient estimates
-            if 'EstimatedPatients' in df.columns:
-                negative_patients = df[df['EstimatedPatients'] < 0]['EstimatedPatients'].count()
-                if negative_patients > 0:
-                    validation_result['errors'].append(f"Found {negative_patients} rows with negative patient estimates")
-                    validation_result['valid'] = False
-        
-        logger.info(f"Validation completed for {file_name}: {'Valid' if validation_result['valid'] else 'Invalid'}")
-        
-    except Exception as e:
+    
+    # File-specific validations
+    if stats['invalid_ages'] > 0:
+        validation_result['warnings'].append(f"Found {stats['invalid_ages']} rows with suspicious age values")
+    
+    if stats['negative_patients'] > 0:
+        validation_result['errors'].append(f"Found {stats['negative_patients']} rows with negative patient estimates")
         validation_result['valid'] = False
-        validation_result['errors'].append(f"Validation error: {str(e)}")
-        logger.error(f"Error validating {file_name}: {str(e)}")
+    
+    logger.info(f"Validation completed for {file_name}: {'Valid' if validation_result['valid'] else 'Invalid'}")
     
     return validation_result
 
-def validate_all_files(uploaded_files: Dict) -> Dict[str, Dict[str, Any]]:
+def read_typed_csv(source, file_name: str) -> Tuple[pd.DataFrame, List[str]]:
     """
-    Validate all uploaded files against their required schemas
+    Read a CSV file applying the typed schema for that file at parse time
+    
+    Only the schema columns are parsed (usecols), with explicit dtypes,
+    categorical low-cardinality fields and fixed-format date parsing.
+    If a numeric column contains non-numeric values, the file is re-read
+    with those columns untyped and they are coerced to numbers (invalid
+    values become missing) before validation sees them.
     
     Args:
-        uploaded_files: Dictionary of file names to uploaded file objects
+        source: Uploaded file object or path to read
+        file_name: Name of the file, used to look up its schema
     
     Returns:
-        Dictionary of validation results for each file
+        Tuple of the parsed DataFrame and the columns found in the file header
     """
     
-    validation_results = {}
+    read_options, source_columns = typed_read_options(source, file_name)
     
-    for file_name, uploaded_file in uploaded_files.items():
+    try:
+        df = pd.read_csv(source, **read_options)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Typed read failed for {file_name}, retrying with untyped numeric columns: {str(e)}")
+        read_options, source_columns = typed_read_options(source, file_name, typed_numeric=False)
+        df = coerce_numeric_columns(pd.read_csv(source, **read_options), file_name)
+    
+    return df, source_columns
+
+def coerce_numeric_columns(df: pd.DataFrame, file_name: str) -> pd.DataFrame:
+    """Convert schema numeric columns read as text to numbers, turning invalid values into missing values"""
+    
+    spec = SCHEMA_SPECS.get(file_name, {})
+    coerced = {
+        col: pd.to_numeric(df[col], errors='coerce') for col in df.columns
+        if spec.get(col) not in (None, 'str', 'category', 'date') and not pd.api.types.is_numeric_dtype(df[col])
+    }
+    
+    if not coerced:
+        return df
+    
+    return df.assign(**coerced)
+
+def typed_read_options(source, file_name: str, typed_numeric: bool = True) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Build the pd.read_csv options for a file from its typed schema
+    
+    The file header is read to find which schema columns are present, and the
+    source is rewound so it is ready for the actual read.
+    
+    Args:
+        source: Uploaded file object or path to read
+        file_name: Name of the file, used to look up its schema
+        typed_numeric: Apply numeric dtypes at parse time (False leaves numeric
+            columns for clean_dataframe to coerce)
+    
+    Returns:
+        Tuple of the read_csv keyword arguments and the columns in the file header
+    """
+    
+    spec = SCHEMA_SPECS.get(file_name)
+    
+    # Read the header only to find which schema columns are present
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    source_columns = pd.read_csv(source, nrows=0).columns.tolist()
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    
+    known_columns = [col for col in source_columns if spec and col in spec]
+    if not known_columns:
+        return {}, source_columns
+    
+    dtypes = {
+        col: spec[col] for col in known_columns
+        if spec[col] != 'date' and (typed_numeric or spec[col] in ('str', 'category'))
+    }
+    date_columns = [col for col in known_columns if spec[col] == 'date']
+    
+    read_options = {
+        'usecols': known_columns,
+        'dtype': dtypes,
+        'parse_dates': date_columns,
+        'date_format': DATE_FORMAT
+    }
+    
+    return read_options, source_columns
+
+def ingest_file(uploaded_file, file_name: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Parse an uploaded CSV file once, validate it and clean it
+
+    The parsed DataFrame is validated and then handed to clean_dataframe
+    without re-reading the upload, so each file is parsed exactly once.
+    Cleaned datasets are cached in the dataset store under a hash of the
+    file contents, so uploading the same bytes again skips CSV parsing.
+
+    Args:
+        uploaded_file: Uploaded file object (or path) to read
+        file_name: Name of the file being ingested
+        use_cache: Look up and populate the content-addressed dataset cache
+
+    Returns:
+        Validation result dictionary with the cleaned DataFrame under 'data'
+        (None if the file could not be read or failed validation)
+    """
+
+    content_hash = None
+
+    try:
+        if use_cache:
+            import dataset_store
+
+            content_hash = dataset_store.hash_upload(uploaded_file, get_cache_salt(file_name))
+            cached = dataset_store.load_cleaned_dataset(content_hash)
+            if cached is not None:
+                df, validation_result = cached
+                validation_result['data'] = df
+                validation_result['content_hash'] = content_hash
+                logger.info(f"Reused cached dataset for {file_name}")
+                return validation_result
+
+        # Read the CSV file with its typed schema
+        df, source_columns = read_typed_csv(uploaded_file, file_name)
+
+        # Get required schema for this file
+        required_columns = REQUIRED_SCHEMAS.get(file_name, [])
+
+        # Validate the file
+        validation_result = validate_file_schema(df, required_columns, file_name, source_columns)
+
+        # Clean the same parsed object instead of parsing the upload again,
+        # grouping rows by product so they can be indexed without re-sorting
+        validation_result['data'] = sort_by_product(clean_dataframe(df, file_name), file_name) if validation_result['valid'] else None
+
+        if content_hash and validation_result['valid']:
+            dataset_store.save_cleaned_dataset(content_hash, validation_result['data'], validation_result)
+
+        validation_result['content_hash'] = content_hash
+
+    except Exception as e:
+        validation_result = {
+            'valid': False,
+            'errors': [f"Error reading file: {str(e)}"],
+            'warnings': [],
+            'rows': 0,
+            'data': None
+        }
+        logger.error(f"Error processing {file_name}: {str(e)}")
+
+    return validation_result
+
+def get_cache_salt(file_name: str) -> str:
+    """Describe the schema and cleaning settings a cached dataset depends on"""
+
+    return json.dumps({
+        'file_name': file_name,
+        'schema': SCHEMA_SPECS.get(file_name),
+        'date_format': DATE_FORMAT,
+        'cleaning_version': CLEANING_VERSION,
+        'row_order': ['ProductID', PERIOD_DATE_COLUMNS.get(file_name)],
+        'arrow_strings': USE_ARROW_STRINGS
+    }, sort_keys=True)
+
+def stream_ingest_file(uploaded_file, file_name: str, chunksize: int = STREAM_CHUNK_ROWS,
+                       store_dir=None) -> Dict[str, Any]:
+    """
+    Validate and clean a large CSV file chunk by chunk without loading it whole
+    
+    Each chunk is read with the typed schema, its validation statistics are
+    accumulated, and the cleaned chunk is appended to an on-disk dataset
+    partitioned by ProductID (see dataset_store) for later per-product access.
+    Every ingest writes to a new dataset directory; directories older than
+    dataset_store.STORE_RETENTION_DAYS are removed first.
+    
+    Args:
+        uploaded_file: Uploaded file object (or path) to read
+        file_name: Name of the file being ingested
+        chunksize: Number of rows per chunk
+        store_dir: Root directory of the columnar store (defaults to dataset_store.STORE_DIR)
+    
+    Returns:
+        Validation result dictionary with the dataset directory under 'store_path'
+        (None if the file could not be read or failed validation)
+    """
+    
+    import dataset_store
+    
+    dataset_store.cleanup_old_datasets(store_dir=store_dir)
+    dataset_dir = dataset_store.create_dataset_dir(file_name, store_dir)
+    required_columns = REQUIRED_SCHEMAS.get(file_name, [])
+    spec = SCHEMA_SPECS.get(file_name, {})
+    
+    try:
         try:
-            # Read the CSV file
-            df = pd.read_csv(uploaded_file)
-            
-            # Get required schema for this file
-            required_columns = REQUIRED_SCHEMAS.get(file_name, [])
-            
-            # Validate the file
-            validation_result = validate_file_schema(df, required_columns, file_name)
-            validation_results[file_name] = validation_result
-            
-        except Exception as e:
-            validation_results[file_name] = {
-                'valid': False,
-                'errors': [f"Error reading file: {str(e)}"],
-                'warnings': [],
-                'rows': 0
-            }
-            logger.error(f"Error processing {file_name}: {str(e)}")
+            stats, source_columns = stream_chunks_to_store(uploaded_file, file_name, chunksize, dataset_dir, spec)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Typed streaming read failed for {file_name}, retrying with untyped numeric columns: {str(e)}")
+            stats, source_columns = stream_chunks_to_store(uploaded_file, file_name, chunksize, dataset_dir, spec,
+                                                           typed_numeric=False)
+        
+        validation_result = build_validation_result(stats, required_columns, file_name, source_columns)
+        validation_result['store_path'] = str(dataset_dir) if validation_result['valid'] else None
+        
+        if not validation_result['valid']:
+            dataset_store.remove_dataset(dataset_dir)
+        
+    except Exception as e:
+        validation_result = {
+            'valid': False,
+            'errors': [f"Error reading file: {str(e)}"],
+            'warnings': [],
+            'rows': 0,
+            'store_path': None
+        }
+        logger.error(f"Error streaming {file_name}: {str(e)}")
+        dataset_store.remove_dataset(dataset_dir)
+    
+    return validation_result
+
+def stream_chunks_to_store(uploaded_file, file_name: str, chunksize: int, dataset_dir, spec: Dict[str, str],
+                           typed_numeric: bool = True) -> Tuple[Dict[str, Any], List[str]]:
+    """Read, validate and clean a file in chunks, appending each chunk to the columnar store"""
+    
+    import dataset_store
+    
+    read_options, source_columns = typed_read_options(uploaded_file, file_name, typed_numeric)
+    dataset_store.reset_dataset(dataset_dir)
+    
+    stats = {}
+    seen_product_ids = set()
+    schema = None
+    
+    for chunk_number, chunk in enumerate(pd.read_csv(uploaded_file, chunksize=chunksize, **read_options)):
+        if not typed_numeric:
+            chunk = coerce_numeric_columns(chunk, file_name)
+        stats = merge_validation_stats(stats, collect_validation_stats(chunk, file_name, seen_product_ids))
+        
+        cleaned = clean_dataframe(chunk, file_name)
+        if 'ProductID' in cleaned.columns:
+            cleaned = cleaned.dropna(subset=['ProductID'])
+            schema = schema or dataset_store.arrow_schema(spec, list(cleaned.columns))
+            dataset_store.append_product_partitions(cleaned, dataset_dir, chunk_number, schema)
+        
+        logger.info(f"Streamed chunk {chunk_number} of {file_name}: {stats['rows']} rows so far")
+    
+    if not stats:
+        stats = collect_validation_stats(pd.DataFrame(columns=source_columns), file_name)
     
-    return validation_results
+    return stats, source_columns
+
+def ingest_all_files(uploaded_files: Dict, stream_threshold: int = STREAM_THRESHOLD_BYTES) -> Dict[str, Dict[str, Any]]:
+    """
+    Ingest all uploaded files in a single parse per file
+
+    Product-related files of at least stream_threshold bytes are streamed
+    chunk by chunk into the ProductID-partitioned store (stream_ingest_file)
+    instead of being loaded whole; their results carry 'store_path' instead
+    of 'data'.
+
+    Args:
+        uploaded_files: Dictionary of file names to uploaded file objects
+        stream_threshold: Upload size in bytes from which files are streamed
+            (None never streams)
+
+    Returns:
+        Dictionary of validation results (carrying the parsed data) for each file
+    """
+
+    results = {}
+
+    for file_name, uploaded_file in uploaded_files.items():
+        if (stream_threshold is not None and file_name in PRODUCT_RELATED_FILES
+                and get_upload_size(uploaded_file) >= stream_threshold):
+            logger.info(f"Streaming {file_name} into the partitioned store")
+            results[file_name] = stream_ingest_file(uploaded_file, file_name)
+        else:
+            results[file_name] = ingest_file(uploaded_file, file_name)
 
-def process_validated_files(uploaded_files: Dict) -> Dict[str, pd.DataFrame]:
+    return results
+
+def get_upload_size(source) -> int:
+    """Get the size in bytes of an uploaded file object or path"""
+
+    if hasattr(source, 'size'):
+        return source.size
+
+    if hasattr(source, 'seek'):
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+
+    return os.path.getsize(source)
+
+def process_validated_files(uploaded_files: Dict, validation_results: Dict[str, Dict[str, Any]] = None) -> Dict[str, pd.DataFrame]:
     """
     Process validated files and return cleaned DataFrames
     
     Args:
         uploaded_files: Dictionary of file names to uploaded file objects
+        validation_results: Optional results from ingest_all_files; files whose
+            parsed data is available are reused instead of being parsed again,
+            and files streamed to the partitioned store are attached by path
     
     Returns:
-        Dictionary of file names to cleaned DataFrames
+        IngestedDatasets mapping file names to cleaned DataFrames, indexed by ProductID
     """
     
-    processed_data = {}
+    processed_data = IngestedDatasets()
+    validation_results = validation_results or {}
     
     for file_name, uploaded_file in uploaded_files.items():
         try:
-            # Reset file pointer
-            uploaded_file.seek(0)
+            # Streamed datasets stay on disk and are read one product at a time
+            store_path = validation_results.get(file_name, {}).get('store_path')
+            if store_path:
+                processed_data.attach_stored_dataset(file_name, store_path)
+                logger.info(f"Processed {file_name}: stored at {store_path}")
+                continue
+            
+            # Reuse the frame parsed during validation when available
+            df = validation_results.get(file_name, {}).get('data')
             
-            # Read and clean the data
-            df = pd.read_csv(uploaded_file)
+            if df is None:
+                df = ingest_file(uploaded_file, file_name)['data']
             
-            # Basic cleaning
-            df = clean_dataframe(df, file_name)
+            if df is None:
+                continue
             
             processed_data[file_name] = df
             logger.info(f"Processed {file_name}: {len(df)} rows")
@@ -166,15 +597,30 @@ def process_validated_files(uploaded_files: Dict) -> Dict[str, pd.DataFrame]:
             logger.error(f"Error processing {file_name}: {str(e)}")
             # Don't add to processed_data if there's an error
     
+    # Datasets built from the same file contents share a version, so cached
+    # product slices stay valid across re-uploads of identical files
+    content_hashes = {
+        file_name: validation_results.get(file_name, {}).get('content_hash') for file_name in processed_data
+    }
+    if content_hashes and all(content_hashes.values()):
+        processed_data.version = get_dataset_version(content_hashes)
+    
     return processed_data
 
-def clean_dataframe(df: pd.DataFrame, file_name: str) -> pd.DataFrame:
+def get_dataset_version(content_hashes: Dict[str, str]) -> str:
+    """Derive a dataset version from the content hashes of its files"""
+    
+    return hashlib.sha256(json.dumps(content_hashes, sort_keys=True).encode('utf-8')).hexdigest()
+
+def clean_dataframe(df: pd.DataFrame, file_name: str, use_arrow_strings: bool = None) -> pd.DataFrame:
     """
     Clean a DataFrame by handling common data quality issues
     
     Args:
         df: DataFrame to clean
         file_name: Name of the file for specific cleaning rules
+        use_arrow_strings: Store text columns as Arrow-backed strings
+            (defaults to USE_ARROW_STRINGS)
     
     Returns:
         Cleaned DataFrame
@@ -183,94 +629,652 @@ def clean_dataframe(df: pd.DataFrame, file_name: str) -> pd.DataFrame:
     # Remove completely empty rows
     df = df.dropna(how='all')
     
-    # Strip whitespace from string columns
-    string_columns = df.select_dtypes(include=['object']).columns
-    for col in string_columns:
-        df[col] = df[col].astype(str).str.strip()
-        df[col] = df[col].replace('nan', None)
+    # Strip whitespace and null-coerce blank values in text columns
+    df = normalize_string_columns(df, use_arrow_strings)
+    
+    # Normalise ProductID to its canonical text form once, at ingest, so
+    # lookups never need to re-cast it
+    if 'ProductID' in df.columns:
+        df['ProductID'] = canonical_product_ids(df['ProductID'])
     
     # File-specific cleaning
     if file_name == 'Products.csv':
-        # Ensure ProductID is treated as string
         if 'ProductID' in df.columns:
-            df['ProductID'] = df['ProductID'].astype(str)
-            logger.info(f"Products.csv - ProductIDs: {df['ProductID'].unique().tolist()}")
-            logger.info(f"Products.csv - ProductIDs: {df['ProductID'].unique().tolist()}")
             logger.info(f"Products.csv - ProductIDs: {df['ProductID'].unique().tolist()}")
     
     elif file_name == 'AdverseEvents.csv':
         # Clean age column
-        if 'PatientAge' in df.columns:
+        if 'PatientAge' in df.columns and not pd.api.types.is_numeric_dtype(df['PatientAge']):
             df['PatientAge'] = pd.to_numeric(df['PatientAge'], errors='coerce')
         
         # Standardize gender values
         if 'Gender' in df.columns:
-            df['Gender'] = df['Gender'].str.upper()
-            df['Gender'] = df['Gender'].replace({
+            gender_map = {
                 'M': 'Male',
                 'F': 'Female',
                 'MALE': 'Male',
                 'FEMALE': 'Female'
-            })
+            }
+            if isinstance(df['Gender'].dtype, pd.CategoricalDtype):
+                df['Gender'] = map_categories(df['Gender'], lambda categories: categories.str.upper().map(
+                    lambda value: gender_map.get(value, value)))
+            else:
+                df['Gender'] = df['Gender'].str.upper()
+                df['Gender'] = df['Gender'].replace(gender_map)
     
     elif file_name == 'ExposureEstimates.csv':
         # Ensure EstimatedPatients is numeric
-        if 'EstimatedPatients' in df.columns:
+        if 'EstimatedPatients' in df.columns and not pd.api.types.is_numeric_dtype(df['EstimatedPatients']):
             df['EstimatedPatients'] = pd.to_numeric(df['EstimatedPatients'], errors='coerce')
     
-    # Convert date columns to datetime where applicable
-    date_columns = [col for col in df.columns if 'Date' in col]
+    # Convert date columns not already parsed by the typed reader. Schema date
+    # columns keep their fixed format, so one bad value never changes how the
+    # valid values are read
+    spec = SCHEMA_SPECS.get(file_name, {})
+    date_columns = [col for col in df.columns if 'Date' in col and not pd.api.types.is_datetime64_any_dtype(df[col])]
     for col in date_columns:
         try:
-            df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
+            if spec.get(col) == 'date':
+                df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce')
+            else:
+                df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
         except:
             logger.warning(f"Could not convert {col} to datetime in {file_name}")
     
     return df
 
-def get_product_data(product_id: str, data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+def normalize_string_columns(df: pd.DataFrame, use_arrow_strings: bool = None) -> pd.DataFrame:
     """
-    Extract all data related to a specific product
+    Strip whitespace from text columns and turn blank values into missing values
+    
+    Missing values are kept as missing throughout, so no column is round-tripped
+    through astype(str). Categorical columns are normalised on their categories.
+    
+    Args:
+        df: DataFrame to normalise
+        use_arrow_strings: Store text columns as Arrow-backed strings
+            (defaults to USE_ARROW_STRINGS)
+    
+    Returns:
+        DataFrame with normalised text columns
+    """
+    
+    if use_arrow_strings is None:
+        use_arrow_strings = USE_ARROW_STRINGS
+    
+    normalized = {}
+    
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        normalized[col] = normalize_string_column(df[col], use_arrow_strings)
+    
+    for col in df.select_dtypes(include=['category']).columns:
+        normalized[col] = map_categories(df[col], lambda categories: categories.str.strip())
+    
+    if not normalized:
+        return df
+    
+    return df.assign(**normalized)
+
+def normalize_string_column(series: pd.Series, use_arrow_strings: bool = False) -> pd.Series:
+    """Strip a text column and mark empty strings as missing in a single vectorized pass"""
+    
+    # Mixed object columns (e.g. numbers among text) need their non-null values as text first
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+        series = series.where(series.isna(), series.astype(str))
+    
+    if use_arrow_strings:
+        series = series.astype('string[pyarrow]')
+    
+    stripped = series.str.strip()
+    return stripped.where(stripped.ne('').fillna(True))
+
+def canonical_product_ids(product_ids: pd.Series) -> pd.Series:
+    """
+    Convert ProductIDs to their canonical form: text, with missing values kept missing
+    
+    Columns that already hold only text are returned unchanged. Whole-number floats
+    (e.g. 101.0 from a numeric column with gaps) become '101'.
+    
+    Args:
+        product_ids: ProductID column as read from a file
+    
+    Returns:
+        ProductID column as text
+    """
+    
+    if isinstance(product_ids.dtype, pd.CategoricalDtype):
+        product_ids = product_ids.astype(object)
+    
+    if pd.api.types.is_string_dtype(product_ids) and pd.api.types.infer_dtype(product_ids, skipna=True) in ('string', 'empty'):
+        return product_ids
+    
+    if pd.api.types.is_float_dtype(product_ids):
+        whole = product_ids.dropna()
+        if (whole == whole.round()).all():
+            product_ids = product_ids.astype('Int64')
+    
+    return product_ids.astype(str).where(product_ids.notna())
+
+def map_categories(series: pd.Series, func: Callable[[pd.Index], pd.Index]) -> pd.Series:
+    """
+    Apply a transformation to the categories of a categorical Series
+    
+    The function runs once per distinct category rather than once per row.
+    Categories that map to the same value are merged and categories that map
+    to an empty or missing value become missing.
+    
+    Args:
+        series: Categorical Series to transform
+        func: Function taking and returning an Index of category values
+    
+    Returns:
+        Categorical Series with the transformed categories
+    """
+    
+    mapped = pd.Index(func(series.cat.categories), dtype=object)
+    mapped = mapped.where(mapped != '', None)
+    new_codes, new_categories = pd.factorize(mapped)
+    
+    codes = series.cat.codes.to_numpy()
+    remapped = np.where(codes >= 0, new_codes[codes], -1) if len(new_codes) else codes
+    
+    return pd.Series(pd.Categorical.from_codes(remapped, categories=new_categories),
+                     index=series.index, name=series.name)
+
+def age_band_index(ages, bands: List[Tuple[str, float]]) -> np.ndarray:
+    """
+    Assign each patient age to an age band
+    
+    Args:
+        ages: Ages in years (array or Series, may contain missing values)
+        bands: (label, lower bound) pairs in ascending order, e.g. AGE_BAND_PRESETS['ich']
+    
+    Returns:
+        Band position of each age; missing ages get len(bands)
+    """
+    
+    ages = pd.Series(ages).to_numpy(dtype='float64', na_value=np.nan)
+    lower_bounds = np.array([lower for _, lower in bands[1:]], dtype='float64')
+    
+    # Ages below the first lower bound are counted in the first band
+    index = np.searchsorted(lower_bounds, ages, side='right')
+    index[np.isnan(ages)] = len(bands)
+    return index
+
+def count_age_bands(ages, bands: List[Tuple[str, float]] = None, include_unknown: bool = True) -> Dict[str, int]:
+    """
+    Count patient ages per age band
+    
+    Args:
+        ages: Ages in years (array or Series, may contain missing values)
+        bands: (label, lower bound) pairs (defaults to AGE_BAND_PRESETS['summary'])
+        include_unknown: Add an 'Unknown' count of missing ages
+    
+    Returns:
+        Count per band label, in band order
+    """
+    
+    bands = bands or AGE_BAND_PRESETS['summary']
+    counts = np.bincount(age_band_index(ages, bands), minlength=len(bands) + 1)
+    
+    age_counts = {label: int(count) for (label, _), count in zip(bands, counts)}
+    if include_unknown:
+        age_counts['Unknown'] = int(counts[len(bands)])
+    return age_counts
+
+class IngestedDatasets(dict):
+    """
+    Dictionary of cleaned DataFrames by file name with a ProductID index per dataset
+    
+    Each dataset is stored with its rows grouped by ProductID, and the index
+    maps every ProductID to the (start, stop) row range holding its rows, so
+    a product's rows are a positional slice instead of a boolean mask scan.
+    Datasets with a reporting period date column also get a DateIndex
+    (date_index) answering date range counts and slices by binary search.
+    
+    The stored frames are shared by every lookup and must be treated as
+    immutable: slices are views, so callers derive new columns on local
+    copies instead of assigning into them.
+    
+    Datasets ingested in streaming mode are not held in memory: they are
+    listed in stored_datasets (file name to partitioned store directory)
+    and get_product_rows reads them one product at a time.
+    """
+    
+    def __init__(self, frames: Dict[str, pd.DataFrame] = None, product_index: Dict[str, Dict[str, Tuple[int, int]]] = None,
+                 version: str = None, stored_datasets: Dict[str, str] = None):
+        super().__init__()
+        self.product_index = {}
+        self.date_index = {}
+        self.stored_datasets = dict(stored_datasets or {})
+        
+        for file_name, df in (frames or {}).items():
+            if product_index is not None and file_name in product_index:
+                super().__setitem__(file_name, df)
+                self.product_index[file_name] = product_index[file_name]
+                self.index_dates(file_name, df)
+            else:
+                self[file_name] = df
+        
+        # Identifies this exact set of datasets; product slices are cached per version
+        self.version = version or uuid.uuid4().hex
+    
+    def __setitem__(self, file_name: str, df: pd.DataFrame):
+        if 'ProductID' in df.columns:
+            df = sort_by_product(df, file_name)
+            self.product_index[file_name] = build_product_index(df)
+        else:
+            self.product_index.pop(file_name, None)
+        super().__setitem__(file_name, df)
+        self.index_dates(file_name, df)
+        self.version = uuid.uuid4().hex
+    
+    def __delitem__(self, file_name: str):
+        self.product_index.pop(file_name, None)
+        self.date_index.pop(file_name, None)
+        super().__delitem__(file_name)
+        self.version = uuid.uuid4().hex
+    
+    def __reduce__(self):
+        return (self.__class__, (dict(self), self.product_index, self.version, self.stored_datasets))
+    
+    def attach_stored_dataset(self, file_name: str, store_path: str):
+        """Register a dataset streamed to the ProductID-partitioned store (see stream_ingest_file)"""
+        
+        if file_name in self:
+            del self[file_name]
+        self.stored_datasets[file_name] = str(store_path)
+        self.version = uuid.uuid4().hex
+    
+    def has_dataset(self, file_name: str) -> bool:
+        """Check whether a dataset is available, in memory or in the partitioned store"""
+        
+        return file_name in self or file_name in self.stored_datasets
+    
+    def index_dates(self, file_name: str, df: pd.DataFrame):
+        """Build the DateIndex of a dataset with a reporting period date column"""
+        
+        date_column = PERIOD_DATE_COLUMNS.get(file_name)
+        if file_name in self.product_index and date_column in df.columns:
+            self.date_index[file_name] = DateIndex.from_frame(df, date_column, self.product_index[file_name])
+        else:
+            self.date_index.pop(file_name, None)
+
+class DateIndex:
+    """
+    Sorted (ProductID, date) index of one dataset for interval queries
+    
+    Rows are grouped by ProductID and sorted by date within each product
+    (undated rows last, see sort_by_product), so the rows of a product in
+    any date range are found with two binary searches instead of a scan.
+    The date column is converted to a NumPy array once, when the index is
+    built. Undated rows never fall within a range.
+    """
+    
+    def __init__(self, dates: np.ndarray, product_index: Dict[str, Tuple[int, int]]):
+        self.dates = dates
+        self.product_index = product_index
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, date_column: str, product_index: Dict[str, Tuple[int, int]] = None) -> 'DateIndex':
+        """
+        Build the index of a DataFrame
+        
+        Args:
+            df: DataFrame grouped by ProductID and sorted by date_column within
+                each product, as left by sort_by_product
+            date_column: Datetime column to index
+            product_index: ProductID index of df (built if not given)
+        
+        Returns:
+            DateIndex over df
+        """
+        
+        if product_index is None:
+            product_index = build_product_index(df)
+        return cls(get_date_values(df[date_column]), product_index)
+    
+    def bounds(self, product_id: str, start: pd.Timestamp = None, end: pd.Timestamp = None) -> Tuple[int, int]:
+        """
+        Get the row positions of a product's rows dated within [start, end)
+        
+        Args:
+            product_id: Product ID
+            start: First date of the range (open if None)
+            end: Exclusive end of the range (open if None)
+        
+        Returns:
+            (first, last) row positions in the indexed DataFrame
+        """
+        
+        row_start, row_stop = self.product_index.get(str(product_id), (0, 0))
+        return self.search(row_start, row_stop, start, end)
+    
+    def search(self, row_start: int, row_stop: int, start: pd.Timestamp = None, end: pd.Timestamp = None) -> Tuple[int, int]:
+        """Narrow a product's (start, stop) row range to the rows dated within [start, end)"""
+        
+        # NaT sorts after every date, so an open end stops at the first undated row
+        bounds = np.array([
+            np.datetime64('NaT') if start is None else pd.Timestamp(start).to_datetime64(),
+            np.datetime64('NaT') if end is None else pd.Timestamp(end).to_datetime64()
+        ], dtype=self.dates.dtype)
+        
+        first, last = np.searchsorted(self.dates[row_start:row_stop], bounds, side='left')
+        if start is None:
+            first = 0
+        return row_start + int(first), row_start + int(last)
+    
+    def count(self, product_id: str, start: pd.Timestamp = None, end: pd.Timestamp = None) -> int:
+        """Count a product's rows dated within [start, end)"""
+        
+        first, last = self.bounds(product_id, start, end)
+        return last - first
+    
+    def counts(self, start: pd.Timestamp = None, end: pd.Timestamp = None) -> Dict[str, int]:
+        """Count the rows dated within [start, end) for every product"""
+        
+        return {product_id: last - first for product_id, (first, last) in self.ranges(start, end).items()}
+    
+    def ranges(self, start: pd.Timestamp = None, end: pd.Timestamp = None) -> Dict[str, Tuple[int, int]]:
+        """Get the row positions of the rows dated within [start, end) for every product"""
+        
+        return {product_id: self.search(row_start, row_stop, start, end)
+                for product_id, (row_start, row_stop) in self.product_index.items()}
+    
+    def slice(self, df: pd.DataFrame, product_id: str, start: pd.Timestamp = None, end: pd.Timestamp = None) -> pd.DataFrame:
+        """Get a product's rows dated within [start, end) as a view of the indexed DataFrame"""
+        
+        first, last = self.bounds(product_id, start, end)
+        return df.iloc[first:last]
+
+class ProductSlice(Mapping):
+    """
+    Rows of every dataset that belong to one product
+    
+    Keys are dataset names without the file extension ('AdverseEvents');
+    lookups by file name ('AdverseEvents.csv') are accepted as well.
+    Values are views into the shared datasets and must not be modified.
+    date_index holds the DateIndex of the unfiltered in-memory datasets by
+    name, shared with IngestedDatasets, so range counts on the slice reuse
+    the index built at ingest.
+    """
+    
+    def __init__(self, product_id: str, frames: Dict[str, pd.DataFrame], period: Tuple[pd.Timestamp, pd.Timestamp] = None,
+                 date_index: Dict[str, 'DateIndex'] = None):
+        self.product_id = str(product_id)
+        self.frames = frames
+        self.period = period
+        self.date_index = date_index or {}
+    
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self.frames[dataset_name(name)]
+    
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and dataset_name(name) in self.frames
+    
+    def __iter__(self):
+        return iter(self.frames)
+    
+    def __len__(self) -> int:
+        return len(self.frames)
+    
+    def row_counts(self) -> Dict[str, int]:
+        """Number of rows per dataset for this product"""
+        return {name: len(df) for name, df in self.frames.items()}
+
+def sort_by_product(df: pd.DataFrame, file_name: str = None) -> pd.DataFrame:
+    """
+    Group the rows of a DataFrame by ProductID, keeping the original order within each product
+    
+    Datasets with a reporting period date column (PERIOD_DATE_COLUMNS) are
+    also sorted by that date within each product, undated rows last.
+    """
+    
+    if 'ProductID' not in df.columns:
+        return df
+    
+    date_column = PERIOD_DATE_COLUMNS.get(file_name)
+    if date_column not in df.columns:
+        date_column = None
+    
+    if is_grouped_by_product(df, date_column):
+        return df
+    
+    sort_columns = ['ProductID', date_column] if date_column else 'ProductID'
+    return df.sort_values(sort_columns, kind='stable', na_position='last').reset_index(drop=True)
+
+def get_date_values(dates: pd.Series) -> np.ndarray:
+    """
+    Get a date column as a NumPy datetime64 array in the column's own unit
+    
+    Dates outside the nanosecond range (e.g. year 23) are parsed to coarser
+    units by pandas, and casting them to datetime64[ns] would silently
+    overflow them into unrelated dates.
+    """
+    
+    values = dates.to_numpy()
+    if values.dtype.kind != 'M':
+        values = values.astype('datetime64[ns]')
+    return values
+
+def is_grouped_by_product(df: pd.DataFrame, date_column: str = None) -> bool:
+    """Check whether the rows of each ProductID are contiguous (and sorted by date_column within each product)"""
+    
+    codes, _ = pd.factorize(df['ProductID'])
+    
+    # factorize numbers products in order of first appearance, so grouped rows
+    # give non-decreasing codes; missing ProductIDs (-1) must come last
+    codes = np.where(codes < 0, len(codes), codes)
+    if not np.all(np.diff(codes) >= 0):
+        return False
+    
+    if date_column is None:
+        return True
+    
+    # Within a product, dates must not decrease; undated rows (NaT) come last
+    dates = get_date_values(df[date_column]).view('int64')
+    dates = np.where(df[date_column].isna().to_numpy(), np.iinfo('int64').max, dates)
+    same_product = np.diff(codes) == 0
+    return bool(np.all(np.diff(dates)[same_product] >= 0))
+
+def build_product_index(df: pd.DataFrame) -> Dict[str, Tuple[int, int]]:
+    """
+    Build the ProductID index of a DataFrame whose rows are grouped by ProductID
+    
+    Args:
+        df: DataFrame with a ProductID column, grouped by sort_by_product
+    
+    Returns:
+        Dictionary of ProductID to the (start, stop) row positions of its rows
+    """
+    
+    codes, product_ids = pd.factorize(df['ProductID'])
+    if len(codes) == 0:
+        return {}
+    
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(codes)]))
+    
+    return {
+        str(product_ids[codes[start]]): (int(start), int(stop))
+        for start, stop in zip(starts, stops) if codes[start] >= 0
+    }
+
+def get_product_rows(data: Dict[str, pd.DataFrame], file_name: str, product_id: str,
+                     period: Tuple[pd.Timestamp, pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Get the rows of one dataset that belong to a product
+    
+    With IngestedDatasets this is a positional slice (a view, no mask scan),
+    narrowed to the reporting period by binary search in the DateIndex;
+    datasets in the partitioned store are read for this product only, and
+    plain dictionaries fall back to filtering on ProductID and date.
     
     Args:
+        data: Dictionary of all loaded data
+        file_name: Dataset to take rows from
         product_id: Product ID to filter for
+        period: Optional (start, end) reporting period from normalize_period;
+            applied to datasets listed in PERIOD_DATE_COLUMNS
+    
+    Returns:
+        DataFrame with the product's rows
+    """
+    
+    stored_path = getattr(data, 'stored_datasets', {}).get(file_name)
+    if stored_path is not None and file_name not in data:
+        return get_stored_product_rows(stored_path, file_name, product_id, period)
+    
+    df = data[file_name]
+    index = getattr(data, 'product_index', {}).get(file_name)
+    date_column = PERIOD_DATE_COLUMNS.get(file_name) if period is not None else None
+    if date_column not in df.columns:
+        date_column = None
+    
+    if index is not None:
+        if date_column:
+            return data.date_index[file_name].slice(df, product_id, *period)
+        start, stop = index.get(str(product_id), (0, 0))
+        return df.iloc[start:stop]
+    
+    mask = canonical_product_ids(df['ProductID']) == str(product_id)
+    if date_column:
+        mask &= (df[date_column] >= period[0]) & (df[date_column] < period[1])
+    return df[mask]
+
+def get_stored_product_rows(store_path: str, file_name: str, product_id: str,
+                            period: Tuple[pd.Timestamp, pd.Timestamp] = None) -> pd.DataFrame:
+    """Read a product's rows from a dataset in the partitioned store, in schema column order and sorted by date"""
+    
+    import dataset_store
+    
+    df = dataset_store.load_product_rows(Path(store_path), product_id)
+    
+    spec_columns = [col for col in SCHEMA_SPECS.get(file_name, {}) if col in df.columns]
+    df = sort_by_product(df[spec_columns + [col for col in df.columns if col not in spec_columns]], file_name)
+    
+    date_column = PERIOD_DATE_COLUMNS.get(file_name)
+    if period is not None and date_column in df.columns:
+        df = df[(df[date_column] >= period[0]) & (df[date_column] < period[1])]
+    return df
+
+def normalize_period(start_date, end_date) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Convert an inclusive reporting period to (start, exclusive end) timestamps
+    
+    Args:
+        start_date: First day of the period
+        end_date: Last day of the period (inclusive)
+    
+    Returns:
+        Tuple of the period start and the day after the period end
+    """
+    
+    return pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+
+def get_period_rows(data: Dict[str, pd.DataFrame], file_name: str, period: Tuple[pd.Timestamp, pd.Timestamp]) -> pd.DataFrame:
+    """
+    Get the rows of every product in one dataset that fall within a reporting period
+    
+    Args:
+        data: Dictionary of all loaded data
+        file_name: Dataset to take rows from
+        period: (start, end) reporting period from normalize_period
+    
+    Returns:
+        DataFrame with the rows dated within the period (the whole dataset
+        if it has no period date column)
+    """
+    
+    df = data[file_name]
+    date_column = PERIOD_DATE_COLUMNS.get(file_name)
+    if period is None or date_column not in df.columns:
+        return df
+    
+    date_index = getattr(data, 'date_index', {}).get(file_name)
+    if date_index is None:
+        return df[(df[date_column] >= period[0]) & (df[date_column] < period[1])]
+    
+    ranges = date_index.ranges(*period).values()
+    positions = np.concatenate([np.arange(start, stop) for start, stop in ranges]) if ranges else np.array([], dtype='int64')
+    return df.take(positions)
+
+def dataset_name(file_name: str) -> str:
+    """Get the dataset name used as a ProductSlice key ('AdverseEvents.csv' -> 'AdverseEvents')"""
+    
+    return file_name[:-4] if file_name.endswith('.csv') else file_name
+
+def get_product_slice(product_id: str, data: Dict[str, pd.DataFrame],
+                      period: Tuple[pd.Timestamp, pd.Timestamp] = None) -> ProductSlice:
+    """
+    Get the rows of every dataset that belong to a product
+    
+    This is the single product extraction used by the UI and the report
+    generator. Slices of IngestedDatasets are memoised per (dataset version,
+    product, period) in an LRU cache, so repeated lookups during a rerun
+    share one extraction.
+    
+    Args:
+        product_id: Product ID to extract
         data: Dictionary of all loaded data
+        period: Optional (start, end) reporting period from normalize_period
     
     Returns:
-        Dictionary of filtered DataFrames for the specific product
+        ProductSlice for the product
     """
     
-    product_data = {}
+    version = getattr(data, 'version', None)
+    cache_key = (version, str(product_id), period)
+    
+    if version is not None:
+        with product_slice_lock:
+            if cache_key in product_slice_cache:
+                product_slice_cache.move_to_end(cache_key)
+                return product_slice_cache[cache_key]
+    
+    frames = {}
+    date_index = {dataset_name(file_name): index for file_name, index in getattr(data, 'date_index', {}).items()}
     
     try:
-        # Get product information
-        if 'Products.csv' in data:
-            # Ensure ProductID is string for comparison
-            data['Products.csv']['ProductID'] = data['Products.csv']['ProductID'].astype(str)
-            product_info = data['Products.csv'][data['Products.csv']['ProductID'] == str(product_id)]
-            product_data['Products.csv'] = product_info
-            logger.info(f"Filtered Products.csv for product {product_id}: {len(product_info)} rows")
-        
-        # Get related data for this product
-        product_related_files = [
-            'Authorizations.csv', 'AdverseEvents.csv', 'RegulatoryActions.csv',
-            'ExposureEstimates.csv', 'ClinicalStudies.csv'
-        ]
-        
-        for file_name in product_related_files:
-            if file_name in data:
-                # Ensure ProductID is string for comparison
-                data[file_name]['ProductID'] = data[file_name]['ProductID'].astype(str)
-                filtered_df = data[file_name][data[file_name]['ProductID'] == str(product_id)]
-                product_data[file_name] = filtered_df
+        # Get product information and related data for this product
+        stored_datasets = getattr(data, 'stored_datasets', {})
+        for file_name in ['Products.csv'] + PRODUCT_RELATED_FILES:
+            if file_name in data or file_name in stored_datasets:
+                filtered_df = get_product_rows(data, file_name, product_id, period)
+                frames[dataset_name(file_name)] = filtered_df
                 logger.info(f"Filtered {file_name} for product {product_id}: {len(filtered_df)} rows")
         
         logger.info(f"Extracted data for product {product_id}")
         
     except Exception as e:
         logger.error(f"Error extracting product data for {product_id}: {str(e)}")
+        return ProductSlice(product_id, frames, period, date_index)
+    
+    product_slice = ProductSlice(product_id, frames, period, date_index)
+    
+    if version is not None:
+        with product_slice_lock:
+            product_slice_cache[cache_key] = product_slice
+            while len(product_slice_cache) > PRODUCT_SLICE_CACHE_SIZE:
+                product_slice_cache.popitem(last=False)
+    
+    return product_slice
+
+def get_product_data(product_id: str, data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Extract all data related to a specific product
+    
+    Args:
+        product_id: Product ID to filter for
+        data: Dictionary of all loaded data
+    
+    Returns:
+        Dictionary of filtered DataFrames for the specific product, keyed by file name
+    """
     
-    return product_data
+    product_slice = get_product_slice(product_id, data)
+    return {f"{name}.csv": df for name, df in product_slice.items()}
 
 def validate_product_relationships(data: Dict[str, pd.DataFrame]) -> Dict[str, List[str]]:
     """
@@ -291,12 +1295,12 @@ def validate_product_relationships(data: Dict[str, pd.DataFrame]) -> Dict[str, L
             return issues
         
         # Get all valid ProductIDs
-        valid_product_ids = set(data['Products.csv']['ProductID'].dropna().astype(str))
+        valid_product_ids = set(canonical_product_ids(data['Products.csv']['ProductID']).dropna().unique())
         
         # Check ProductID references in other files
         for file_name, df in data.items():
             if file_name != 'Products.csv' and 'ProductID' in df.columns:
-                file_product_ids = set(df['ProductID'].dropna().astype(str))
+                file_product_ids = set(canonical_product_ids(df['ProductID']).dropna().unique())
                 invalid_refs = file_product_ids - valid_product_ids
                 
                 if invalid_refs:
@@ -306,6 +1310,16 @@ def validate_product_relationships(data: Dict[str, pd.DataFrame]) -> Dict[str, L
                         f"Found {len(invalid_refs)} invalid ProductID references: {', '.join(list(invalid_refs)[:5])}{'...' if len(invalid_refs) > 5 else ''}"
                     )
         
+        # Streamed datasets are checked against their ProductID partitions
+        for file_name, store_path in getattr(data, 'stored_datasets', {}).items():
+            import dataset_store
+            
+            invalid_refs = set(dataset_store.list_stored_products(Path(store_path))) - valid_product_ids
+            if invalid_refs:
+                issues.setdefault(file_name, []).append(
+                    f"Found {len(invalid_refs)} invalid ProductID references: {', '.join(sorted(invalid_refs)[:5])}{'...' if len(invalid_refs) > 5 else ''}"
+                )
+        
         logger.info("Product relationship validation completed")
         
     except Exception as e:
@@ -0,0 +1,250 @@
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, date
+from typing import Dict, Any, List, Callable, Tuple
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import backend
+import report_generator
+import docx_pdf_exporter
+import llm_engine
+
+logger = logging.getLogger(__name__)
+
+# Concurrent report generations (Gemini requests kept in flight)
+GENERATION_WORKERS = llm_engine.MAX_CONCURRENCY
+
+# Supported export formats and the exporter used for each
+EXPORTERS = {
+    'docx': docx_pdf_exporter.generate_docx,
+    'pdf': docx_pdf_exporter.generate_pdf
+}
+
+# Progress statuses reported as each report is generated (before its exports
+# finish); every other status is reported once the product is finished
+GENERATION_STATUSES = ('generated', 'generated (fallback)')
+
+def load_datasets_from_dir(data_dir: str) -> Dict[str, pd.DataFrame]:
+    """
+    Ingest the six required CSV files from a directory
+
+    Args:
+        data_dir: Directory containing Products.csv, AdverseEvents.csv, etc.
+
+    Returns:
+        IngestedDatasets with the cleaned data
+
+    Raises:
+        Exception: If a file is missing or fails validation
+    """
+
+    data_dir = Path(data_dir)
+    file_paths = {file_name: data_dir / file_name for file_name in backend.REQUIRED_SCHEMAS}
+
+    missing = [file_name for file_name, path in file_paths.items() if not path.exists()]
+    if missing:
+        raise Exception(f"Missing data files in {data_dir}: {', '.join(missing)}")
+
+    validation_results = backend.ingest_all_files({file_name: str(path) for file_name, path in file_paths.items()})
+
+    invalid = {file_name: result['errors'] for file_name, result in validation_results.items() if not result['valid']}
+    if invalid:
+        raise Exception(f"Validation failed: {json.dumps(invalid)}")
+
+    return backend.process_validated_files(file_paths, validation_results)
+
+def partition_products(data: Dict[str, pd.DataFrame], product_ids: List[str],
+                       reporting_period: Tuple = None) -> Dict[str, backend.ProductSlice]:
+    """Slice the datasets by ProductID (and reporting period) once for every product in the batch"""
+
+    return {product_id: report_generator.extract_product_data(product_id, data, reporting_period)
+            for product_id in product_ids}
+
+def save_markdown_report(product_id: str, report_content: str, output_dir: Path) -> str:
+    """Save report markdown where the reviewer page looks for it"""
+
+    report_file = output_dir / f"report_{product_id}.md"
+    report_file.write_text(report_content, encoding='utf-8')
+    return str(report_file)
+
+def run_batch(data: Dict[str, pd.DataFrame], product_ids: List[str] = None, formats: List[str] = None,
+              workers: int = None, generation_workers: int = GENERATION_WORKERS, output_dir: str = "output",
+              progress_callback: Callable[[int, int, str, str], None] = None,
+              reporting_period: Tuple = None) -> Dict[str, Any]:
+    """
+    Generate and export PSUR reports for many products in one run
+
+    Summaries of all products are prepared in one grouped pass. Reports are then
+    generated with concurrent Gemini calls (see llm_engine), and each
+    finished report is exported while the remaining reports are still being
+    generated.
+
+    Args:
+        data: Ingested datasets
+        product_ids: Products to report on (defaults to every product in Products.csv)
+        formats: Export formats ('docx', 'pdf'); defaults to both
+        workers: Worker processes for exports (defaults to the CPU count)
+        generation_workers: Concurrent report generations
+        output_dir: Directory for reports and the manifest
+        progress_callback: Called as (count, total, product_id, status) when a
+            report is generated (status in GENERATION_STATUSES, count of
+            reports generated so far) and when a product is finished (status
+            'completed', 'partial', 'fallback' or 'failed', count of products
+            finished so far)
+        reporting_period: Optional (start_date, end_date) of the PSUR period, both inclusive
+
+    Returns:
+        Batch manifest (also written to output_dir); reports built by the
+        fallback generator because the model call failed get status
+        'fallback' and do not count as completed
+    """
+
+    started = time.perf_counter()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
+
+    formats = formats or list(EXPORTERS)
+    if product_ids is None:
+        product_ids = data['Products.csv']['ProductID'].dropna().unique().tolist()
+    product_ids = [str(product_id) for product_id in product_ids]
+
+    logger.info(f"Starting batch PSUR generation for {len(product_ids)} products")
+
+    slices = partition_products(data, product_ids, reporting_period)
+    summaries = report_generator.prepare_portfolio_summaries(data, product_ids, reporting_period)
+
+    entries = {product_id: {'product_id': product_id, 'status': 'pending', 'files': {}} for product_id in product_ids}
+    progress = Counter()
+
+    def report_progress(product_id: str, status: str):
+        phase = 'generated' if status in GENERATION_STATUSES else 'finished'
+        progress[phase] += 1
+        if progress_callback:
+            progress_callback(progress[phase], len(product_ids), product_id, status)
+
+    with ProcessPoolExecutor(max_workers=workers) as export_pool:
+
+        export_futures = {}
+        generation_started = time.perf_counter()
+
+        def export_report(product_id: str, report_content: str):
+            entry = entries[product_id]
+
+            entry['generated_after_seconds'] = round(time.perf_counter() - generation_started, 3)
+            entry['fallback'] = report_generator.is_fallback_report(report_content)
+            report_progress(product_id, GENERATION_STATUSES[1] if entry['fallback'] else GENERATION_STATUSES[0])
+
+            try:
+                entry['files']['md'] = save_markdown_report(product_id, report_content, output_dir)
+
+                for export_format in formats:
+                    export_future = export_pool.submit(EXPORTERS[export_format], report_content, product_id,
+                                                       str(output_dir))
+                    export_futures[export_future] = (product_id, export_format)
+
+            except Exception as e:
+                # Drop the exports already submitted for this product
+                for export_future, (future_product_id, _) in list(export_futures.items()):
+                    if future_product_id == product_id:
+                        export_future.cancel()
+                        del export_futures[export_future]
+
+                entry['status'] = 'failed'
+                entry['error'] = str(e)
+                logger.error(f"Batch generation failed for {product_id}: {str(e)}")
+                report_progress(product_id, 'failed')
+
+        jobs = {product_id: (summaries[product_id], slices[product_id]) for product_id in product_ids}
+        report_generator.generate_ai_reports(jobs, on_report=export_report, max_concurrency=generation_workers)
+
+        pending_exports = Counter(product_id for product_id, _ in export_futures.values())
+        for future in as_completed(export_futures):
+            product_id, export_format = export_futures[future]
+            entry = entries[product_id]
+
+            try:
+                entry['files'][export_format] = future.result()
+            except Exception as e:
+                entry.setdefault('export_errors', {})[export_format] = str(e)
+                logger.error(f"Batch {export_format} export failed for {product_id}: {str(e)}")
+
+            pending_exports[product_id] -= 1
+            if pending_exports[product_id] == 0:
+                if 'export_errors' in entry:
+                    entry['status'] = 'partial'
+                elif entry['fallback']:
+                    entry['status'] = 'fallback'
+                else:
+                    entry['status'] = 'completed'
+                report_progress(product_id, entry['status'])
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'total_products': len(product_ids),
+        'completed': sum(1 for entry in entries.values() if entry['status'] == 'completed'),
+        'failed': sum(1 for entry in entries.values() if entry['status'] != 'completed'),
+        'fallback': sum(1 for entry in entries.values() if entry.get('fallback')),
+        'formats': formats,
+        'reporting_period': [str(date) for date in reporting_period] if reporting_period else None,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'reports': list(entries.values())
+    }
+
+    manifest_path = output_dir / f"batch_manifest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2, default=str))
+    manifest['manifest_path'] = str(manifest_path)
+
+    logger.info(f"Batch PSUR generation finished: {manifest['completed']}/{len(product_ids)} completed "
+                f"in {manifest['elapsed_seconds']}s, manifest: {manifest_path}")
+
+    return manifest
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point for batch PSUR generation"""
+
+    parser = argparse.ArgumentParser(description="Generate PSUR reports for all products in one run")
+    parser.add_argument('--data-dir', required=True, help="Directory containing the six required CSV files")
+    parser.add_argument('--products', nargs='*', help="ProductIDs to report on (default: all products)")
+    parser.add_argument('--formats', nargs='*', choices=list(EXPORTERS), help="Export formats (default: docx pdf)")
+    parser.add_argument('--workers', type=int, help="Worker processes for exports")
+    parser.add_argument('--generation-workers', type=int, default=GENERATION_WORKERS, help="Concurrent report generations")
+    parser.add_argument('--output-dir', default="output", help="Directory for reports and the manifest")
+    parser.add_argument('--start-date', type=date.fromisoformat, help="First day of the PSUR period (YYYY-MM-DD)")
+    parser.add_argument('--end-date', type=date.fromisoformat, help="Last day of the PSUR period (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    if (args.start_date is None) != (args.end_date is None):
+        parser.error("--start-date and --end-date must be given together")
+    reporting_period = (args.start_date, args.end_date) if args.start_date else None
+
+    from utils import setup_logging
+    setup_logging()
+
+    def print_progress(count: int, total: int, product_id: str, status: str):
+        phase = 'generated' if status in GENERATION_STATUSES else 'finished'
+        print(f"[{count}/{total} {phase}] {product_id}: {status}", flush=True)
+
+    try:
+        data = load_datasets_from_dir(args.data_dir)
+        manifest = run_batch(data, product_ids=args.products, formats=args.formats, workers=args.workers,
+                             generation_workers=args.generation_workers, output_dir=args.output_dir,
+                             progress_callback=print_progress, reporting_period=reporting_period)
+    except Exception as e:
+        logger.error(f"Batch PSUR generation failed: {str(e)}")
+        print(f"Batch PSUR generation failed: {str(e)}", file=sys.stderr)
+        return 1
+
+    print(f"Completed {manifest['completed']}/{manifest['total_products']} reports. Manifest: {manifest['manifest_path']}")
+    if manifest['fallback']:
+        print(f"{manifest['fallback']} reports fell back to the template because the model call failed", file=sys.stderr)
+    return 0 if manifest['failed'] == 0 else 2
+
+if __name__ == '__main__':
+    sys.exit(main())
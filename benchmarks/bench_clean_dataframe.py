@@ -0,0 +1,139 @@
+"""
+Benchmark clean_dataframe against the legacy per-column implementation
+
+Builds an AdverseEvents-like frame with padded and blank text values and
+times the legacy astype(str).str.strip() round trip, the vectorized
+clean_dataframe and clean_dataframe with Arrow-backed strings.
+
+Usage:
+    python benchmarks/bench_clean_dataframe.py --rows 5000000
+"""
+
+import os
+import sys
+import time
+import logging
+import warnings
+import argparse
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend
+
+GENDERS = np.array(['M', 'F', ' male', 'FEMALE ', 'f', ''], dtype=object)
+OUTCOMES = np.array(['Recovered', ' Fatal', 'Recovering ', 'Unknown', ''], dtype=object)
+EVENTS = np.array(['Nausea', ' Headache', 'Rash  ', 'Dizziness', 'Fatigue', ''], dtype=object)
+
+def legacy_clean_dataframe(df: pd.DataFrame, file_name: str) -> pd.DataFrame:
+    """clean_dataframe as it was before text normalisation was vectorized"""
+    
+    df = df.dropna(how='all')
+    
+    string_columns = df.select_dtypes(include=['object']).columns
+    for col in string_columns:
+        df[col] = df[col].astype(str).str.strip()
+        df[col] = df[col].replace('nan', None)
+    
+    if file_name == 'AdverseEvents.csv':
+        if 'PatientAge' in df.columns:
+            df['PatientAge'] = pd.to_numeric(df['PatientAge'], errors='coerce')
+        
+        if 'Gender' in df.columns:
+            df['Gender'] = df['Gender'].str.upper()
+            df['Gender'] = df['Gender'].replace({'M': 'Male', 'F': 'Female', 'MALE': 'Male', 'FEMALE': 'Female'})
+    
+    date_columns = [col for col in df.columns if 'Date' in col]
+    for col in date_columns:
+        df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
+    
+    return df
+
+def build_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Build an AdverseEvents-like frame with the dtypes pd.read_csv infers without a schema"""
+    
+    rng = np.random.default_rng(seed)
+    ages = rng.uniform(0, 95, rows)
+    ages[rng.random(rows) < 0.05] = np.nan
+    
+    def text(values: np.ndarray) -> np.ndarray:
+        column = values[rng.integers(0, len(values), rows)]
+        column[rng.random(rows) < 0.02] = np.nan
+        return column
+    
+    return pd.DataFrame({
+        'AEID': np.arange(rows).astype(str).astype(object),
+        'ProductID': rng.integers(100, 150, rows).astype(str).astype(object),
+        'ReportedDate': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, rows), unit='D'),
+        'PatientAge': ages,
+        'Gender': text(GENDERS),
+        'EventDescription': text(EVENTS),
+        'Outcome': text(OUTCOMES)
+    })
+
+def apply_schema(df: pd.DataFrame, file_name: str) -> pd.DataFrame:
+    """Give a frame the text and categorical dtypes read_typed_csv applies at parse time"""
+    
+    spec = backend.SCHEMA_SPECS[file_name]
+    return df.astype({col: spec[col] for col in df.columns if spec.get(col) in ('str', 'category')})
+
+def time_call(func, df: pd.DataFrame, repeat: int) -> float:
+    """Best wall-clock time in seconds of func over repeat runs on fresh copies of df"""
+    
+    timings = []
+    for _ in range(repeat):
+        frame = df.copy()
+        started = time.perf_counter()
+        func(frame)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def run_benchmark(rows: int, repeat: int) -> Dict[str, float]:
+    """
+    Time each clean_dataframe variant on the same frame
+    
+    Args:
+        rows: Rows in the generated frame
+        repeat: Runs per variant (the best is reported)
+    
+    Returns:
+        Seconds per variant
+    """
+    
+    untyped = build_frame(rows)
+    typed = apply_schema(untyped, 'AdverseEvents.csv')
+    
+    # Each variant gets the frame its read path produces: the legacy code ran
+    # on untyped reads, clean_dataframe runs on read_typed_csv output
+    variants = {
+        'legacy': (untyped, lambda frame: legacy_clean_dataframe(frame, 'AdverseEvents.csv')),
+        'vectorized': (typed, lambda frame: backend.clean_dataframe(frame, 'AdverseEvents.csv', use_arrow_strings=False)),
+        'vectorized_arrow': (typed, lambda frame: backend.clean_dataframe(frame, 'AdverseEvents.csv', use_arrow_strings=True))
+    }
+    
+    return {name: time_call(func, df, repeat) for name, (df, func) in variants.items()}
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point for the clean_dataframe benchmark"""
+    
+    parser = argparse.ArgumentParser(description="Benchmark clean_dataframe against the legacy implementation")
+    parser.add_argument('--rows', type=int, default=5_000_000, help="Rows in the generated AdverseEvents frame")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per variant; the best is reported")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    # The legacy code relies on select_dtypes('object') matching text columns
+    warnings.simplefilter('ignore', DeprecationWarning)
+    
+    print(f"pandas {pd.__version__}, {args.rows} rows")
+    results = run_benchmark(args.rows, args.repeat)
+    for name, seconds in results.items():
+        print(f"{name:>18}: {seconds:.2f}s ({results['legacy'] / seconds:.2f}x legacy)")
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
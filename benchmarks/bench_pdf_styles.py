@@ -0,0 +1,124 @@
+"""
+Benchmark PDF style allocation per exported report
+
+Renders many small reports with render_pdf, which shares the cached
+get_pdf_styles, and with the style set rebuilt for every report as the
+exporter did before the styles were cached. Counts ParagraphStyle
+allocations (calls to ParagraphStyle.__init__) and time per report.
+
+Usage:
+    python benchmarks/bench_pdf_styles.py --reports 200
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import contextlib
+from io import BytesIO
+from typing import Callable, Dict, List
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_pdf_exporter
+
+SMALL_REPORT = """# PSUR Report
+
+## 1. Introduction
+
+### Scope
+
+Adverse events were **reviewed** for the *reporting period*.
+
+---
+
+| Country | Status |
+|---|---|
+| DE | Approved |
+| FR | Pending |
+
+### Conclusion
+
+No new safety signals were identified.
+
+---
+"""
+
+def legacy_render_pdf(report_content: str, product_id: str) -> bytes:
+    """render_pdf with the style set rebuilt for every report"""
+    
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=docx_pdf_exporter.PDF_MARGIN,
+        leftMargin=docx_pdf_exporter.PDF_MARGIN,
+        topMargin=docx_pdf_exporter.PDF_MARGIN,
+        bottomMargin=docx_pdf_exporter.PDF_MARGIN
+    )
+    styles = docx_pdf_exporter.get_pdf_styles.__wrapped__()
+    doc.build(docx_pdf_exporter.parse_markdown_to_pdf(report_content, styles))
+    return buffer.getvalue()
+
+@contextlib.contextmanager
+def count_style_allocations():
+    """Count calls to ParagraphStyle.__init__ while the context is active"""
+    
+    counter = {'calls': 0}
+    original_init = ParagraphStyle.__init__
+    
+    def counting_init(self, *args, **kwargs):
+        counter['calls'] += 1
+        original_init(self, *args, **kwargs)
+    
+    ParagraphStyle.__init__ = counting_init
+    try:
+        yield counter
+    finally:
+        ParagraphStyle.__init__ = original_init
+
+def run_variant(render: Callable[[str, str], bytes], reports: int) -> Dict[str, float]:
+    """Render distinct small reports, returning ms and ParagraphStyle allocations per report"""
+    
+    # Warm up caches (styles, fonts) outside the measurement
+    render(SMALL_REPORT, 'warmup')
+    
+    with count_style_allocations() as counter:
+        started = time.perf_counter()
+        for number in range(reports):
+            render(f"{SMALL_REPORT}\nReport {number}\n", str(number))
+        elapsed = time.perf_counter() - started
+    
+    return {'ms_per_report': elapsed / reports * 1000, 'styles_per_report': counter['calls'] / reports}
+
+def run_benchmark(reports: int) -> Dict[str, Dict[str, float]]:
+    """Run the legacy and cached style variants"""
+    
+    return {
+        'rebuilt styles': run_variant(legacy_render_pdf, reports),
+        'cached styles': run_variant(docx_pdf_exporter.render_pdf, reports)
+    }
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point for the PDF style benchmark"""
+    
+    parser = argparse.ArgumentParser(description="Benchmark PDF style allocation per exported report")
+    parser.add_argument('--reports', type=int, default=200, help="Small reports to render per variant")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    print(f"{args.reports} small reports per variant")
+    for name, result in run_benchmark(args.reports).items():
+        print(f"{name:>15}: {result['ms_per_report']:.2f} ms/report, "
+              f"{result['styles_per_report']:.1f} ParagraphStyle allocations/report")
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
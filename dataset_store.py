@@ -0,0 +1,286 @@
+import os
+import json
+import hashlib
+import logging
+import shutil
+import time
+import uuid
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+logger = logging.getLogger(__name__)
+
+# Root directory of the on-disk columnar store
+STORE_DIR = Path("data_store")
+
+# Block size used when hashing uploads
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Upper bound on distinct ProductIDs written by a single chunk
+MAX_PRODUCT_PARTITIONS = 100_000
+
+# Partitioned datasets older than this many days are removed by cleanup_old_datasets
+STORE_RETENTION_DAYS = 7
+
+# Arrow types for the dtypes used in backend.SCHEMA_SPECS
+ARROW_TYPES = {
+    'str': pa.string(),
+    'category': pa.string(),
+    'float64': pa.float64(),
+    'Int64': pa.int64(),
+    'date': pa.timestamp('us')
+}
+
+PRODUCT_PARTITIONING = ds.partitioning(pa.schema([('ProductID', pa.string())]), flavor='hive')
+
+def arrow_schema(spec: Dict[str, str], columns: List[str]) -> pa.Schema:
+    """
+    Build an Arrow schema for a set of columns from a typed column specification
+
+    Args:
+        spec: Column name to dtype mapping (see backend.SCHEMA_SPECS)
+        columns: Columns to include, in order
+
+    Returns:
+        Arrow schema with one field per column
+    """
+
+    return pa.schema([(col, ARROW_TYPES.get(spec.get(col), pa.string())) for col in columns])
+
+def get_partitioned_dir(store_dir: Path = None) -> Path:
+    """Get the directory holding every partitioned dataset of the store"""
+
+    return Path(store_dir or STORE_DIR) / "partitioned"
+
+def create_dataset_dir(name: str, store_dir: Path = None) -> Path:
+    """
+    Create the directory for one streamed ingest of a dataset
+
+    Every ingest gets its own directory (dataset name plus a random id), so
+    re-uploading a file, or another session uploading a file with the same
+    name, never touches partitions that loaded datasets still read.
+
+    Args:
+        name: Dataset file name (e.g. 'AdverseEvents.csv')
+        store_dir: Root directory of the store (defaults to STORE_DIR)
+
+    Returns:
+        New, empty dataset directory
+    """
+
+    dataset_dir = get_partitioned_dir(store_dir) / f"{Path(name).stem}-{uuid.uuid4().hex}"
+    dataset_dir.mkdir(parents=True)
+    return dataset_dir
+
+def reset_dataset(dataset_dir: Path):
+    """Remove the partitions written so far by an ingest into its own dataset directory"""
+
+    remove_dataset(dataset_dir)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+
+def remove_dataset(dataset_dir: Path):
+    """Remove a partitioned dataset directory"""
+
+    if dataset_dir.exists():
+        shutil.rmtree(dataset_dir)
+
+def cleanup_old_datasets(days_old: int = STORE_RETENTION_DAYS, store_dir: Path = None) -> int:
+    """
+    Remove partitioned datasets last written more than days_old days ago
+
+    Args:
+        days_old: Age in days after which a dataset is removed
+        store_dir: Root directory of the store (defaults to STORE_DIR)
+
+    Returns:
+        Number of datasets removed
+    """
+
+    partitioned_dir = get_partitioned_dir(store_dir)
+    if not partitioned_dir.exists():
+        return 0
+
+    cutoff = time.time() - days_old * 24 * 60 * 60
+    removed = 0
+
+    for dataset_dir in partitioned_dir.iterdir():
+        try:
+            if dataset_dir.is_dir() and dataset_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(dataset_dir)
+                removed += 1
+                logger.info(f"Removed old partitioned dataset: {dataset_dir}")
+        except Exception as e:
+            logger.error(f"Error removing old partitioned dataset {dataset_dir}: {str(e)}")
+
+    return removed
+
+def append_product_partitions(df: pd.DataFrame, dataset_dir: Path, chunk_number: int, schema: pa.Schema):
+    """
+    Append a chunk of rows to a dataset partitioned by ProductID
+
+    Each chunk writes one Parquet file per ProductID it contains, under
+    ProductID=<id>/ directories, so a single product can later be read
+    without scanning the other products.
+
+    Args:
+        df: Cleaned chunk to write (must contain ProductID)
+        dataset_dir: Dataset directory from create_dataset_dir
+        chunk_number: Sequence number of the chunk, used in file names
+        schema: Arrow schema of the chunk columns
+    """
+
+    # Categoricals differ between chunks, so they are stored as plain strings
+    category_columns = df.select_dtypes(include=['category']).columns
+    if len(category_columns):
+        df = df.astype({col: object for col in category_columns})
+
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    ds.write_dataset(
+        table,
+        dataset_dir,
+        format='parquet',
+        partitioning=PRODUCT_PARTITIONING,
+        basename_template=f"chunk-{chunk_number:05d}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        max_partitions=MAX_PRODUCT_PARTITIONS
+    )
+
+def load_product_rows(dataset_dir: Path, product_id: str, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Load the rows of one product from a dataset partitioned by ProductID
+
+    Args:
+        dataset_dir: Dataset directory from create_dataset_dir
+        product_id: Product ID to load
+        columns: Optional subset of columns to read
+
+    Returns:
+        DataFrame with the product's rows (empty if the product has none)
+    """
+
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning=PRODUCT_PARTITIONING)
+    table = dataset.to_table(columns=columns, filter=ds.field('ProductID') == str(product_id))
+
+    logger.info(f"Loaded {table.num_rows} rows for product {product_id} from {dataset_dir}")
+    return table.to_pandas()
+
+def list_stored_products(dataset_dir: Path) -> List[str]:
+    """List the ProductIDs present in a dataset partitioned by ProductID"""
+
+    if not dataset_dir.exists():
+        return []
+
+    return sorted(
+        unquote(path.name.split('=', 1)[1])
+        for path in dataset_dir.iterdir() if path.is_dir() and path.name.startswith('ProductID=')
+    )
+
+def hash_upload(source, salt: str = "") -> str:
+    """
+    Compute a content hash for an uploaded file
+
+    Args:
+        source: Uploaded file object or path to hash
+        salt: Extra text mixed into the hash (e.g. file name and schema version)
+
+    Returns:
+        Hex SHA-256 digest of the salt and the file bytes
+    """
+
+    digest = hashlib.sha256(salt.encode('utf-8'))
+
+    if hasattr(source, 'read'):
+        source.seek(0)
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block if isinstance(block, bytes) else block.encode('utf-8'))
+        source.seek(0)
+    else:
+        with open(source, 'rb') as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+
+    return digest.hexdigest()
+
+def get_cache_paths(content_hash: str, store_dir: Path = None):
+    """Get the Arrow data file and validation report paths for a cached dataset"""
+
+    cache_dir = Path(store_dir or STORE_DIR) / "cleaned"
+    return cache_dir / f"{content_hash}.arrow", cache_dir / f"{content_hash}.json"
+
+def get_temp_path(path: Path) -> Path:
+    """Get a temporary file name next to path that is unique to this process and thread"""
+
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def save_cleaned_dataset(content_hash: str, df: pd.DataFrame, validation_result: Dict[str, Any],
+                         store_dir: Path = None):
+    """
+    Persist a cleaned dataset and its validation report under its content hash
+
+    The data is written as an uncompressed Arrow IPC file so it can be
+    memory-mapped on reload. Both files are written to temporary files and
+    renamed into place, so concurrent writers of the same content never
+    share a file and readers never see a partial one.
+
+    Args:
+        content_hash: Hash from hash_upload
+        df: Cleaned DataFrame to store
+        validation_result: Validation report for the file (without the data)
+        store_dir: Root directory of the store (defaults to STORE_DIR)
+    """
+
+    try:
+        data_path, report_path = get_cache_paths(content_hash, store_dir)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        tmp_path = get_temp_path(data_path)
+        with pa.OSFile(str(tmp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, data_path)
+
+        report = {key: value for key, value in validation_result.items() if key != 'data'}
+        tmp_path = get_temp_path(report_path)
+        tmp_path.write_text(json.dumps(report, default=str))
+        os.replace(tmp_path, report_path)
+
+        logger.info(f"Cached cleaned dataset {content_hash[:12]} ({len(df)} rows)")
+
+    except Exception as e:
+        logger.error(f"Error caching cleaned dataset {content_hash[:12]}: {str(e)}")
+
+def load_cleaned_dataset(content_hash: str, store_dir: Path = None) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Load a cached cleaned dataset by content hash, memory-mapping the Arrow file
+
+    Args:
+        content_hash: Hash from hash_upload
+        store_dir: Root directory of the store (defaults to STORE_DIR)
+
+    Returns:
+        Tuple of the DataFrame and its validation report, or None if not cached
+    """
+
+    data_path, report_path = get_cache_paths(content_hash, store_dir)
+    if not data_path.exists() or not report_path.exists():
+        return None
+
+    try:
+        table = pa.ipc.open_file(pa.memory_map(str(data_path), 'r')).read_all()
+        validation_result = json.loads(report_path.read_text())
+
+        logger.info(f"Loaded cached dataset {content_hash[:12]} ({table.num_rows} rows)")
+        return table.to_pandas(split_blocks=True), validation_result
+
+    except Exception as e:
+        logger.error(f"Error loading cached dataset {content_hash[:12]}: {str(e)}")
+        return None
@@ -1,6 +1,10 @@
 import os
+import time
 import logging
-from typing import Dict, Any
+import functools
+import threading
+import multiprocessing
+from typing import Dict, Any, Callable, List, Sequence, Tuple, Union
 import re
 from datetime import datetime
 from pathlib import Path
@@ -10,40 +14,236 @@ from docx import Document
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.table import _Cell
+from copy import deepcopy
 
 # PDF generation
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib import colors
-import markdown
 from io import BytesIO
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 logger = logging.getLogger(__name__)
 
-def generate_docx(report_content: str, product_id: str) -> str:
+# Parsed reports kept in the parse_report cache
+REPORT_AST_CACHE_SIZE = 16
+
+# Inline markdown: **bold**, *italic* and `code`
+INLINE_PATTERN = re.compile(r'\*\*(.+?)\*\*|\*(.+?)\*|`(.+?)`')
+
+# Page margins of PDF exports (points) and the resulting content width
+PDF_MARGIN = 72
+PDF_CONTENT_WIDTH = A4[0] - 2 * PDF_MARGIN
+
+# Font size of table cells
+TABLE_FONT_SIZE = 9
+
+# Body rows per PDF table flowable. ReportLab copies the remaining rows of a
+# table at every page split, so long listings are split into chunks (each
+# with the header row) to keep rendering time linear in the row count
+TABLE_CHUNK_ROWS = 1000
+
+# Table cell padding (points), as set in the PDF table style
+TABLE_CELL_PADDING_X = 4
+TABLE_CELL_PADDING_Y = 2
+
+# Column widths are proportional to the longest cell text of each column,
+# clamped to this many characters
+MIN_COLUMN_CHARS = 4
+MAX_COLUMN_CHARS = 40
+
+# Table separator row cells, e.g. "---", ":---:"
+TABLE_SEPARATOR_PATTERN = re.compile(r'^:?-+:?$')
+
+# Report AST: a tuple of (kind, content) blocks. Text blocks ('title',
+# 'heading', 'subheading', 'paragraph') hold a tuple of (text, style) spans
+# with style '', 'bold', 'italic' or 'code'; 'table' holds a tuple of rows,
+# each a tuple of cell spans; 'rule' and 'blank' hold None.
+Spans = Tuple[Tuple[str, str], ...]
+Block = Tuple[str, Any]
+
+def parse_inline(text: str) -> Spans:
+    """Split a line of markdown into (text, style) spans"""
+    
+    spans = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        if match.start() > position:
+            spans.append((text[position:match.start()], ''))
+        bold, italic, code = match.groups()
+        if bold is not None:
+            spans.append((bold, 'bold'))
+        elif italic is not None:
+            spans.append((italic, 'italic'))
+        else:
+            spans.append((code, 'code'))
+        position = match.end()
+    
+    if position < len(text):
+        spans.append((text[position:], ''))
+    return tuple(spans)
+
+def parse_table_row(line: str) -> Tuple[Spans, ...]:
+    """Split a markdown table row into cell spans"""
+    
+    cells = line.strip('|').split('|')
+    return tuple(parse_inline(cell.strip()) for cell in cells)
+
+def is_table_separator(line: str) -> bool:
+    """Check whether a table row is the header separator (|---|---|)"""
+    
+    cells = [cell.strip() for cell in line.strip('|').split('|')]
+    return all(TABLE_SEPARATOR_PATTERN.match(cell) for cell in cells if cell) and any(cells)
+
+@functools.lru_cache(maxsize=REPORT_AST_CACHE_SIZE)
+def parse_report(report_content: str) -> Tuple[Block, ...]:
     """
-    Generate a Word document from the PSUR report content
+    Parse report markdown into the block/inline AST walked by the DOCX and PDF renderers
+    
+    Results are cached by report content, so repeated exports of the same
+    report revision share one parse; export_report parses in the parent and
+    sends the blocks to the export workers. The returned tuples are shared
+    and immutable.
     
     Args:
         report_content: Markdown formatted report content
-        product_id: Product ID for file naming
     
     Returns:
-        Path to the generated DOCX file
+        Tuple of (kind, content) blocks
     """
     
-    try:
-        # Create output directory if it doesn't exist
-        output_dir = Path("output")
-        output_dir.mkdir(exist_ok=True)
+    blocks = []
+    table_rows = []
+    
+    def flush_table():
+        if table_rows:
+            blocks.append(('table', tuple(table_rows)))
+            table_rows.clear()
+    
+    for line in report_content.split('\n'):
+        line = line.strip()
         
-        # Create filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"PSUR_Report_{product_id}_{timestamp}.docx"
-        file_path = output_dir / filename
+        # Consecutive table rows form one table
+        if line.startswith('|') and '|' in line[1:]:
+            if not is_table_separator(line):
+                table_rows.append(parse_table_row(line))
+            continue
+        flush_table()
         
+        if not line:
+            blocks.append(('blank', None))
+        elif line.startswith('# '):
+            blocks.append(('title', parse_inline(line[2:].strip())))
+        elif line.startswith('## '):
+            blocks.append(('heading', parse_inline(line[3:].strip())))
+        elif line.startswith('### '):
+            blocks.append(('subheading', parse_inline(line[4:].strip())))
+        elif line.startswith('---'):
+            blocks.append(('rule', None))
+        else:
+            blocks.append(('paragraph', parse_inline(line)))
+    
+    flush_table()
+    return tuple(blocks)
+
+def get_report_blocks(report: Union[str, Tuple[Block, ...]]) -> Tuple[Block, ...]:
+    """Get the parsed blocks of a report given as markdown or as parse_report blocks"""
+    
+    return parse_report(report) if isinstance(report, str) else report
+
+def spans_text(spans: Spans) -> str:
+    """Get the plain text of inline spans"""
+    
+    return ''.join(text for text, _ in spans)
+
+def spans_markup(spans: Spans) -> str:
+    """Get inline spans as ReportLab paragraph markup"""
+    
+    tags = {'bold': ('<b>', '</b>'), 'italic': ('<i>', '</i>'), 'code': ('<font face="Courier">', '</font>')}
+    parts = []
+    for text, style in spans:
+        open_tag, close_tag = tags.get(style, ('', ''))
+        parts.append(f"{open_tag}{escape(text)}{close_tag}")
+    return ''.join(parts)
+
+def table_cell_texts(rows: Sequence[Tuple[Spans, ...]]) -> List[List[str]]:
+    """Get the plain text of every table cell, padding short rows to the widest row"""
+    
+    column_count = max(len(row) for row in rows)
+    return [[spans_text(cell) for cell in row] + [''] * (column_count - len(row)) for row in rows]
+
+def compute_column_widths(texts: Sequence[Sequence[str]], total_width: float,
+                          measure: Callable[[str], float] = len) -> List[float]:
+    """
+    Split the available width between table columns
+    
+    Each column's share is proportional to its longest cell text, clamped
+    to MIN_COLUMN_CHARS..MAX_COLUMN_CHARS so one long free-text column
+    cannot squeeze the others. This is a single pass over the cell texts,
+    so layout time grows linearly with the number of rows; the renderers
+    never measure cells themselves.
+    
+    Args:
+        texts: Cell texts by row, all rows the same length
+        total_width: Width available to the table
+        measure: Length of a cell text in characters (defaults to len; the
+            PDF renderer measures the rendered text width instead)
+    
+    Returns:
+        Width of each column
+    """
+    
+    longest = [MIN_COLUMN_CHARS] * len(texts[0])
+    for row in texts:
+        for column, text in enumerate(row):
+            length = measure(text)
+            if length > longest[column]:
+                longest[column] = length
+    
+    weights = [min(length, MAX_COLUMN_CHARS) for length in longest]
+    total_weight = sum(weights)
+    return [total_width * weight / total_weight for weight in weights]
+
+# Directory where exports rendered for download also keep a copy
+# (PHARMA_PULSE_EXPORT_DIR; unset keeps downloads in memory only)
+EXPORT_COPY_DIR = os.environ.get("PHARMA_PULSE_EXPORT_DIR") or None
+
+def save_export(content: bytes, product_id: str, extension: str, output_dir: str = "output") -> str:
+    """Write rendered export bytes to a timestamped file and return its path"""
+    
+    # Create output directory if it doesn't exist
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
+    
+    # Create filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    file_path = output_dir / f"PSUR_Report_{product_id}_{timestamp}.{extension}"
+    file_path.write_bytes(content)
+    
+    return str(file_path)
+
+def render_docx(report_content: Union[str, Tuple[Block, ...]], product_id: str, output_dir: str = None) -> bytes:
+    """
+    Render a Word document from the PSUR report content in memory
+    
+    Args:
+        report_content: Markdown formatted report content, or its parse_report blocks
+        product_id: Product ID for document properties and file naming
+        output_dir: Also save a copy to this directory (not saved if None)
+    
+    Returns:
+        DOCX file content
+    """
+    
+    try:
         # Create new document
         document = Document()
         
@@ -58,11 +258,42 @@ def generate_docx(report_content: str, product_id: str) -> str:
         # Parse markdown content and add to document
         parse_markdown_to_docx(document, report_content)
         
-        # Save document
-        document.save(str(file_path))
+        # Save document to memory
+        buffer = BytesIO()
+        document.save(buffer)
+        content = buffer.getvalue()
+        
+        if output_dir is not None:
+            file_path = save_export(content, product_id, "docx", output_dir)
+            logger.info(f"DOCX report generated: {file_path}")
+        else:
+            logger.info(f"DOCX report rendered for product {product_id} ({len(content)} bytes)")
+        
+        return content
         
+    except Exception as e:
+        logger.error(f"Error generating DOCX: {str(e)}")
+        raise Exception(f"Failed to generate Word document: {str(e)}")
+
+def generate_docx(report_content: str, product_id: str, output_dir: str = "output") -> str:
+    """
+    Generate a Word document from the PSUR report content
+    
+    Args:
+        report_content: Markdown formatted report content
+        product_id: Product ID for file naming
+        output_dir: Directory to write the file to
+    
+    Returns:
+        Path to the generated DOCX file
+    """
+    
+    content = render_docx(report_content, product_id)
+    
+    try:
+        file_path = save_export(content, product_id, "docx", output_dir)
         logger.info(f"DOCX report generated: {file_path}")
-        return str(file_path)
+        return file_path
         
     except Exception as e:
         logger.error(f"Error generating DOCX: {str(e)}")
@@ -101,248 +332,507 @@ def add_custom_styles(document: Document):
         normal_font.size = Pt(11)
         normal_style.paragraph_format.space_after = Pt(6)
 
-def parse_markdown_to_docx(document: Document, markdown_content: str):
-    """Parse markdown content and add formatted content to Word document"""
+def add_docx_runs(paragraph, spans: Spans):
+    """Add inline spans to a Word paragraph as formatted runs"""
     
-    lines = markdown_content.split('\n')
+    for text, style in spans:
+        run = paragraph.add_run(text)
+        if style == 'bold':
+            run.bold = True
+        elif style == 'italic':
+            run.italic = True
+        elif style == 'code':
+            run.font.name = 'Courier New'
+
+def add_docx_table(document: Document, rows: Tuple[Tuple[Spans, ...], ...]):
+    """Add a parsed table to a Word document, repeating the header row on every page"""
     
-    for line in lines:
-        line = line.strip()
+    texts = table_cell_texts(rows)
+    section = document.sections[-1]
+    widths = compute_column_widths(texts, section.page_width - section.left_margin - section.right_margin)
+    
+    table = document.add_table(rows=1, cols=len(widths))
+    table.style = 'Table Grid'
+    table.autofit = False
+    
+    # Grid widths are set before rows are added so new cells take them over
+    for column, width in zip(table.columns, widths):
+        column.width = int(width)
+    
+    header = table.rows[0]
+    header_properties = header._tr.get_or_add_trPr()
+    header_flag = OxmlElement('w:tblHeader')
+    header_flag.set(qn('w:val'), 'true')
+    header_properties.append(header_flag)
+    
+    for cell, spans in zip(header.cells, rows[0]):
+        run = cell.paragraphs[0].add_run(spans_text(spans))
+        run.bold = True
+    
+    # Body rows are copies of one template row built by python-docx (cell
+    # widths, empty paragraph); plain text is appended as a single run, since
+    # the per-cell python-docx helpers dominate the time of long listings
+    template = table.add_row()._tr
+    table._tbl.remove(template)
+    
+    for row, row_texts in zip(rows[1:], texts[1:]):
+        tr = deepcopy(template)
+        table._tbl.append(tr)
+        for column, tc in enumerate(tr.tc_lst):
+            spans = row[column] if column < len(row) else ()
+            if any(style for _, style in spans):
+                add_docx_runs(_Cell(tc, table).paragraphs[0], spans)
+            elif row_texts[column]:
+                run = OxmlElement('w:r')
+                text = OxmlElement('w:t')
+                text.set(qn('xml:space'), 'preserve')
+                text.text = row_texts[column]
+                run.append(text)
+                tc.p_lst[0].append(run)
+
+def parse_markdown_to_docx(document: Document, markdown_content: Union[str, Tuple[Block, ...]]):
+    """Add the parsed report (see parse_report) to a Word document as formatted content"""
+    
+    for kind, content in get_report_blocks(markdown_content):
         
-        if not line:
+        if kind == 'blank':
             # Add empty paragraph for spacing
             document.add_paragraph()
-            continue
         
-        # Main title (single #)
-        if line.startswith('# ') and not line.startswith('## '):
-            title_text = line[2:].strip()
-            p = document.add_paragraph(title_text, style='CustomTitle')
-            
-        # Section headings (##)
-        elif line.startswith('## '):
-            heading_text = line[3:].strip()
-            p = document.add_paragraph(heading_text, style='CustomHeading')
-            
-        # Sub-headings (###)
-        elif line.startswith('### '):
-            subheading_text = line[4:].strip()
-            p = document.add_paragraph(subheading_text)
-            p.style.font.bold = True
-            p.style.font.size = Pt(12)
-            
-        # Table rows
-        elif line.startswith('|') and '|' in line[1:]:
-            # Handle table - this is simplified, real implementation would need table parsing
-            table_text = line.replace('|', ' | ').strip()
-            p = document.add_paragraph(table_text, style='CustomNormal')
-            
-        # Bold text
-        elif line.startswith('**') and line.endswith('**'):
-            text = line[2:-2]
-            p = document.add_paragraph()
-            run = p.add_run(text)
+        elif kind == 'title':
+            document.add_paragraph(spans_text(content), style='CustomTitle')
+        
+        elif kind == 'heading':
+            document.add_paragraph(spans_text(content), style='CustomHeading')
+        
+        elif kind == 'subheading':
+            run = document.add_paragraph().add_run(spans_text(content))
             run.bold = True
-            
-        # Horizontal rule
-        elif line.startswith('---'):
+            run.font.size = Pt(12)
+        
+        elif kind == 'table':
+            add_docx_table(document, content)
+        
+        elif kind == 'rule':
             document.add_paragraph('_' * 50, style='CustomNormal')
-            
-        # Regular text
-        else:
-            # Remove markdown formatting for simple implementation
-            clean_text = clean_markdown_text(line)
-            if clean_text:
-                document.add_paragraph(clean_text, style='CustomNormal')
-
-def clean_markdown_text(text: str) -> str:
-    """Clean markdown formatting from text"""
-    
-    # Remove bold formatting
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    
-    # Remove italic formatting
-    text = re.sub(r'\*(.*?)\*', r'\1', text)
-    
-    # Remove code formatting
-    text = re.sub(r'`(.*?)`', r'\1', text)
-    
-    return text.strip()
+        
+        elif spans_text(content).strip():
+            add_docx_runs(document.add_paragraph(style='CustomNormal'), content)
 
-def generate_pdf(report_content: str, product_id: str) -> str:
+@functools.lru_cache(maxsize=None)
+def get_pdf_styles() -> Dict[str, ParagraphStyle]:
     """
-    Generate a PDF document from the PSUR report content
+    Get the paragraph styles of PDF exports
     
-    Args:
-        report_content: Markdown formatted report content
-        product_id: Product ID for file naming
+    The styles are built on first use and shared by every export in the
+    process (export worker processes build them once each); callers must
+    not modify them.
     
     Returns:
-        Path to the generated PDF file
+        ParagraphStyle by name: 'title', 'heading', 'subheading', 'normal',
+        'separator', 'table_cell' and 'table_header'
     """
     
-    try:
-        # Create output directory if it doesn't exist
-        output_dir = Path("output")
-        output_dir.mkdir(exist_ok=True)
-        
-        # Create filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"PSUR_Report_{product_id}_{timestamp}.pdf"
-        file_path = output_dir / filename
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(
-            str(file_path),
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
-        )
-        
-        # Get styles
-        styles = getSampleStyleSheet()
-        
-        # Create custom styles
-        title_style = ParagraphStyle(
+    sample = getSampleStyleSheet()
+    
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=sample['Normal'],
+        fontSize=11,
+        spaceAfter=6,
+        fontName='Helvetica'
+    )
+    
+    table_cell_style = ParagraphStyle(
+        'TableCell',
+        parent=normal_style,
+        fontSize=TABLE_FONT_SIZE,
+        leading=TABLE_FONT_SIZE + 2,
+        spaceAfter=0
+    )
+    
+    return {
+        'title': ParagraphStyle(
             'CustomTitle',
-            parent=styles['Heading1'],
+            parent=sample['Heading1'],
             fontSize=18,
             spaceAfter=30,
             alignment=1,  # Center alignment
             fontName='Helvetica-Bold'
-        )
-        
-        heading_style = ParagraphStyle(
+        ),
+        'heading': ParagraphStyle(
             'CustomHeading',
-            parent=styles['Heading2'],
+            parent=sample['Heading2'],
             fontSize=14,
             spaceBefore=12,
             spaceAfter=6,
             fontName='Helvetica-Bold'
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=6,
-            fontName='Helvetica'
+        ),
+        'subheading': ParagraphStyle(
+            'SubHeading',
+            parent=normal_style,
+            fontSize=12,
+            fontName='Helvetica-Bold',
+            spaceBefore=8,
+            spaceAfter=4
+        ),
+        'normal': normal_style,
+        'separator': ParagraphStyle(
+            'Separator',
+            parent=normal_style,
+            alignment=1
+        ),
+        'table_cell': table_cell_style,
+        'table_header': ParagraphStyle('TableHeader', parent=table_cell_style, fontName='Helvetica-Bold')
+    }
+
+def clean_markdown_text(text: str) -> str:
+    """Clean markdown formatting from text"""
+    
+    return spans_text(parse_inline(text)).strip()
+
+def render_pdf(report_content: Union[str, Tuple[Block, ...]], product_id: str, output_dir: str = None) -> bytes:
+    """
+    Render a PDF document from the PSUR report content in memory
+    
+    Args:
+        report_content: Markdown formatted report content, or its parse_report blocks
+        product_id: Product ID for file naming
+        output_dir: Also save a copy to this directory (not saved if None)
+    
+    Returns:
+        PDF file content
+    """
+    
+    try:
+        # Create PDF document in memory
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=PDF_MARGIN,
+            leftMargin=PDF_MARGIN,
+            topMargin=PDF_MARGIN,
+            bottomMargin=PDF_MARGIN
         )
         
         # Parse content and create flowables
-        story = []
-        story.extend(parse_markdown_to_pdf(report_content, title_style, heading_style, normal_style))
+        story = parse_markdown_to_pdf(report_content)
         
         # Build PDF
         doc.build(story)
+        content = buffer.getvalue()
+        
+        if output_dir is not None:
+            file_path = save_export(content, product_id, "pdf", output_dir)
+            logger.info(f"PDF report generated: {file_path}")
+        else:
+            logger.info(f"PDF report rendered for product {product_id} ({len(content)} bytes)")
+        
+        return content
         
+    except Exception as e:
+        logger.error(f"Error generating PDF: {str(e)}")
+        raise Exception(f"Failed to generate PDF document: {str(e)}")
+
+def generate_pdf(report_content: str, product_id: str, output_dir: str = "output") -> str:
+    """
+    Generate a PDF document from the PSUR report content
+    
+    Args:
+        report_content: Markdown formatted report content
+        product_id: Product ID for file naming
+        output_dir: Directory to write the file to
+    
+    Returns:
+        Path to the generated PDF file
+    """
+    
+    content = render_pdf(report_content, product_id)
+    
+    try:
+        file_path = save_export(content, product_id, "pdf", output_dir)
         logger.info(f"PDF report generated: {file_path}")
-        return str(file_path)
+        return file_path
         
     except Exception as e:
         logger.error(f"Error generating PDF: {str(e)}")
         raise Exception(f"Failed to generate PDF document: {str(e)}")
 
-def parse_markdown_to_pdf(content: str, title_style, heading_style, normal_style) -> list:
-    """Parse markdown content and return list of PDF flowables"""
+def parse_markdown_to_pdf(content: Union[str, Tuple[Block, ...]], styles: Dict[str, ParagraphStyle] = None,
+                          available_width: float = PDF_CONTENT_WIDTH) -> list:
+    """Convert the parsed report (see parse_report) to a list of PDF flowables"""
     
+    styles = styles or get_pdf_styles()
     story = []
-    lines = content.split('\n')
     
-    for line in lines:
-        line = line.strip()
+    for kind, content in get_report_blocks(content):
         
-        if not line:
+        if kind == 'blank':
             story.append(Spacer(1, 6))
-            continue
         
-        # Main title (single #)
-        if line.startswith('# ') and not line.startswith('## '):
-            title_text = line[2:].strip()
-            story.append(Paragraph(title_text, title_style))
+        elif kind == 'title':
+            story.append(Paragraph(spans_markup(content), styles['title']))
             story.append(Spacer(1, 12))
-            
-        # Section headings (##)
-        elif line.startswith('## '):
-            heading_text = line[3:].strip()
-            story.append(Paragraph(heading_text, heading_style))
-            
-        # Sub-headings (###)
-        elif line.startswith('### '):
-            subheading_text = line[4:].strip()
-            sub_style = ParagraphStyle(
-                'SubHeading',
-                parent=normal_style,
-                fontSize=12,
-                fontName='Helvetica-Bold',
-                spaceBefore=8,
-                spaceAfter=4
-            )
-            story.append(Paragraph(subheading_text, sub_style))
-            
-        # Tables (simplified)
-        elif line.startswith('|') and '|' in line[1:]:
-            # Convert table row to paragraph for simplicity
-            table_text = line.replace('|', ' | ').strip()
-            story.append(Paragraph(table_text, normal_style))
-            
-        # Horizontal rule
-        elif line.startswith('---'):
+        
+        elif kind == 'heading':
+            story.append(Paragraph(spans_markup(content), styles['heading']))
+        
+        elif kind == 'subheading':
+            story.append(Paragraph(spans_markup(content), styles['subheading']))
+        
+        elif kind == 'table':
+            story.extend(create_pdf_tables(content, available_width, styles))
+        
+        elif kind == 'rule':
             story.append(Spacer(1, 6))
-            separator_style = ParagraphStyle(
-                'Separator',
-                parent=normal_style,
-                alignment=1
-            )
-            story.append(Paragraph('_' * 50, separator_style))
+            story.append(Paragraph('_' * 50, styles['separator']))
             story.append(Spacer(1, 6))
-            
-        # Regular text
-        else:
-            clean_text = clean_markdown_text(line)
-            if clean_text:
-                # Handle bold text in PDF
-                if '**' in clean_text:
-                    clean_text = clean_text.replace('**', '<b>').replace('**', '</b>')
-                story.append(Paragraph(clean_text, normal_style))
+        
+        elif spans_text(content).strip():
+            story.append(Paragraph(spans_markup(content), styles['normal']))
     
     return story
 
-def create_table_from_markdown(table_lines: list) -> Table:
-    """Create a ReportLab table from markdown table lines"""
+def measure_pdf_text(text: str) -> float:
+    """Width of a table cell text in average characters (half the font size)"""
     
-    data = []
+    return stringWidth(text, 'Helvetica', TABLE_FONT_SIZE) / (TABLE_FONT_SIZE / 2)
+
+def create_pdf_tables(rows: Tuple[Tuple[Spans, ...], ...], available_width: float,
+                      styles: Dict[str, ParagraphStyle] = None) -> List[LongTable]:
+    """
+    Create ReportLab tables from parsed table rows, one per TABLE_CHUNK_ROWS body rows
     
-    for line in table_lines:
-        if line.startswith('|') and line.endswith('|'):
-            # Remove leading and trailing pipes, split by pipes
-            cells = [cell.strip() for cell in line[1:-1].split('|')]
-            data.append(cells)
+    Every chunk starts with the header row and shares the same column widths.
+    """
     
-    if not data:
-        return None
+    header, body = rows[0], rows[1:]
+    if len(body) <= TABLE_CHUNK_ROWS:
+        return [create_pdf_table(rows, available_width, styles)]
+    
+    widths = compute_column_widths(table_cell_texts(rows), available_width, measure_pdf_text)
+    return [create_pdf_table((header,) + body[start:start + TABLE_CHUNK_ROWS], available_width, styles, widths)
+            for start in range(0, len(body), TABLE_CHUNK_ROWS)]
+
+def create_pdf_table(rows: Tuple[Tuple[Spans, ...], ...], available_width: float,
+                     styles: Dict[str, ParagraphStyle] = None, widths: List[float] = None) -> LongTable:
+    """
+    Create a ReportLab table from parsed table rows
+    
+    Column widths come from compute_column_widths, so ReportLab does not
+    measure every cell, and LongTable splits across pages without
+    re-laying out the remaining rows; the header row repeats on each page.
+    Cells are plain strings unless they carry formatting or are too long
+    for their column, which keeps Paragraph wrapping to the cells that need it.
+    
+    Args:
+        rows: Table rows from parse_report, the first being the header
+        available_width: Width available to the table
+        styles: PDF styles (defaults to get_pdf_styles()); wrapped cells use
+            'table_cell' and 'table_header'
+        widths: Column widths (computed from the rows if not given)
+    
+    Returns:
+        LongTable flowable
+    """
+    
+    texts = table_cell_texts(rows)
+    widths = widths or compute_column_widths(texts, available_width, measure_pdf_text)
+    text_widths = [width - 2 * TABLE_CELL_PADDING_X for width in widths]
+    styles = styles or get_pdf_styles()
+    cell_style = styles['table_cell']
+    header_style = styles['table_header']
     
-    # Create table
-    table = Table(data)
+    # Row heights are computed here in one pass (wrapping only Paragraph
+    # cells, once each) so ReportLab never sizes the rows itself: its own
+    # row sizing rescans the remaining rows at every page split
+    line_height = cell_style.leading + 2 * TABLE_CELL_PADDING_Y
+    data = []
+    row_heights = []
+    for index, (row, row_texts) in enumerate(zip(rows, texts)):
+        style = header_style if index == 0 else cell_style
+        font_name = 'Helvetica-Bold' if index == 0 else 'Helvetica'
+        cells = []
+        height = line_height
+        for column, text in enumerate(row_texts):
+            spans = row[column] if column < len(row) else ()
+            if any(span_style for _, span_style in spans) or \
+                    stringWidth(text, font_name, TABLE_FONT_SIZE) > text_widths[column]:
+                paragraph = Paragraph(spans_markup(spans), style)
+                _, paragraph_height = paragraph.wrap(text_widths[column], 1e9)
+                height = max(height, paragraph_height + 2 * TABLE_CELL_PADDING_Y)
+                cells.append(paragraph)
+            else:
+                cells.append(text)
+        data.append(cells)
+        row_heights.append(height)
+    
+    table = LongTable(data, colWidths=widths, rowHeights=row_heights, repeatRows=1)
     
     # Apply table style
     table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
         ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ('FONTSIZE', (0, 0), (-1, -1), TABLE_FONT_SIZE),
+        ('LEADING', (0, 0), (-1, -1), cell_style.leading),
+        ('LEFTPADDING', (0, 0), (-1, -1), TABLE_CELL_PADDING_X),
+        ('RIGHTPADDING', (0, 0), (-1, -1), TABLE_CELL_PADDING_X),
+        ('TOPPADDING', (0, 0), (-1, -1), TABLE_CELL_PADDING_Y),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), TABLE_CELL_PADDING_Y),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
     ]))
     
     return table
 
+def create_table_from_markdown(table_lines: list) -> Table:
+    """Create a ReportLab table from markdown table lines"""
+    
+    rows = [parse_table_row(line) for line in table_lines
+            if line.startswith('|') and not is_table_separator(line)]
+    
+    if not rows:
+        return None
+    
+    return create_pdf_table(tuple(rows), PDF_CONTENT_WIDTH)
+
+def render_markdown(report_content: str, product_id: str, output_dir: str = None) -> bytes:
+    """Encode the report markdown for download (and save a copy if output_dir is given)"""
+    
+    content = report_content.encode('utf-8')
+    if output_dir is not None:
+        file_path = save_export(content, product_id, "md", output_dir)
+        logger.info(f"Markdown report saved: {file_path}")
+    return content
+
+# Export formats: renderer, file extension and MIME type
+EXPORT_FORMATS = {
+    'docx': (render_docx, 'docx', "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    'pdf': (render_pdf, 'pdf', "application/pdf"),
+    'md': (render_markdown, 'md', "text/markdown")
+}
+
+# Formats rendered in the export process pool (CPU bound); others render in-process
+POOLED_EXPORT_FORMATS = {'docx', 'pdf'}
+
+# Worker processes of the shared export pool
+EXPORT_WORKERS = min(len(POOLED_EXPORT_FORMATS), os.cpu_count() or 1)
+
+# Start method of export workers. The app process is multi-threaded, and
+# forking it can deadlock a child on a lock held by another thread
+EXPORT_START_METHOD = 'forkserver'
+
+export_pool = None
+export_pool_lock = threading.Lock()
+
+def get_export_pool() -> ProcessPoolExecutor:
+    """Get the shared export process pool, starting it on first use"""
+    
+    global export_pool
+    with export_pool_lock:
+        if export_pool is None:
+            # Workers build the PDF styles once at startup, not per export
+            export_pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, initializer=get_pdf_styles,
+                                              mp_context=multiprocessing.get_context(EXPORT_START_METHOD))
+        return export_pool
+
+def discard_export_pool(pool: ProcessPoolExecutor):
+    """Drop a broken export pool, so the next export starts a fresh shared pool"""
+    
+    global export_pool
+    with export_pool_lock:
+        if export_pool is pool:
+            export_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def render_export(export_format: str, report_content: Union[str, Tuple[Block, ...]], product_id: str,
+                  output_dir: str = None) -> Tuple[bytes, float]:
+    """Render one export format, returning its content and the render time in seconds"""
+    
+    started = time.perf_counter()
+    renderer = EXPORT_FORMATS[export_format][0]
+    content = renderer(report_content, product_id, output_dir)
+    return content, time.perf_counter() - started
+
+def export_report(report_content: str, product_id: str, formats: list = None, output_dir: str = None,
+                  pool: ProcessPoolExecutor = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Render a report to several formats at once
+    
+    DOCX and PDF rendering is CPU bound and holds the GIL, so those formats
+    are rendered concurrently in worker processes; the Markdown export is
+    encoded in-process while they run. The report is parsed once here and
+    the workers receive the parsed blocks. If the pool breaks (a worker
+    died), it is discarded and the affected formats are rendered in-process.
+    
+    Args:
+        report_content: Final markdown report content
+        product_id: Product ID for file naming
+        formats: Formats to render (defaults to every format in EXPORT_FORMATS)
+        output_dir: Also save a copy of each export to this directory
+        pool: Process pool to render in (defaults to the shared export pool)
+    
+    Returns:
+        {'artifacts': format to {'content', 'file_name', 'mime', 'seconds'}
+        (or {'error'} if that format failed), 'elapsed_seconds': wall time
+        of the whole job}
+    """
+    
+    started = time.perf_counter()
+    formats = formats or list(EXPORT_FORMATS)
+    
+    unknown = [export_format for export_format in formats if export_format not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown export formats: {', '.join(unknown)}")
+    
+    blocks = parse_report(report_content)
+    pool = pool or get_export_pool()
+    futures = {}
+    for export_format in formats:
+        if export_format in POOLED_EXPORT_FORMATS:
+            try:
+                futures[export_format] = pool.submit(render_export, export_format, blocks, product_id, output_dir)
+            except BrokenProcessPool as e:
+                logger.warning(f"Export pool is broken, rendering {export_format} in-process: {str(e)}")
+                discard_export_pool(pool)
+            except Exception as e:
+                logger.warning(f"Could not submit {export_format} export, rendering in-process: {str(e)}")
+    
+    artifacts = {}
+    for export_format in formats:
+        report = blocks if export_format in POOLED_EXPORT_FORMATS else report_content
+        try:
+            if export_format in futures:
+                try:
+                    content, seconds = futures[export_format].result()
+                except BrokenProcessPool as e:
+                    logger.warning(f"Export pool broke while rendering {export_format}, rendering in-process: {str(e)}")
+                    discard_export_pool(pool)
+                    content, seconds = render_export(export_format, report, product_id, output_dir)
+            else:
+                content, seconds = render_export(export_format, report, product_id, output_dir)
+            
+            _, extension, mime = EXPORT_FORMATS[export_format]
+            artifacts[export_format] = {
+                'content': content,
+                'file_name': f"PSUR_Report_{product_id}.{extension}",
+                'mime': mime,
+                'seconds': round(seconds, 3)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error exporting {export_format} for {product_id}: {str(e)}")
+            artifacts[export_format] = {'error': str(e)}
+    
+    elapsed = round(time.perf_counter() - started, 3)
+    timings = {export_format: artifact.get('seconds') for export_format, artifact in artifacts.items()}
+    logger.info(f"Exported report for {product_id} in {elapsed}s (render seconds: {timings})")
+    
+    return {'artifacts': artifacts, 'elapsed_seconds': elapsed}
+
 def get_export_statistics() -> Dict[str, int]:
     """Get statistics about exported files"""
     
@@ -0,0 +1,276 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import dataset_store
+
+logger = logging.getLogger(__name__)
+
+# Directory holding cached LLM responses
+CACHE_DIR = dataset_store.STORE_DIR / "llm_responses"
+
+# Total size of cached responses before least recently used entries are evicted
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Age after which a cached response is no longer used (seconds)
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Interval between full scans of the cache directory that remove expired
+# entries and resynchronise the tracked size (seconds)
+EVICTION_INTERVAL_SECONDS = 60 * 60
+
+# Fraction of the size limit a full cache is trimmed to, so writes at the
+# limit do not each trigger a scan
+EVICTION_TARGET_RATIO = 0.9
+
+# Set PHARMA_PULSE_LLM_CACHE=0 to always call the model
+CACHE_ENABLED = os.environ.get("PHARMA_PULSE_LLM_CACHE", "1") != "0"
+
+def make_cache_key(model: str, contents: str, config: Any = None) -> str:
+    """
+    Compute the cache key of a generate_content call
+
+    Args:
+        model: Model name
+        contents: Prompt text
+        config: Generation config (system instruction, temperature and
+            max_output_tokens are part of the key)
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+
+    key = {
+        'model': model,
+        'system_instruction': getattr(config, 'system_instruction', None),
+        'prompt': contents,
+        'temperature': getattr(config, 'temperature', None),
+        'max_output_tokens': getattr(config, 'max_output_tokens', None)
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    On-disk cache of LLM responses with LRU eviction and a TTL
+
+    Each response is stored as a JSON file named by its cache key. Both
+    lookups and eviction use the file's timestamps: the modification time
+    records when the entry was written (entries older than ttl_seconds
+    expire) and the access time, set on every hit, when it was last used
+    (eviction removes the least recently used files once the cache exceeds
+    max_bytes).
+    
+    The total size is tracked as entries are written, so the directory is
+    only scanned when the cache grows past max_bytes or every
+    EVICTION_INTERVAL_SECONDS (which also picks up entries written by
+    other processes), not on every write.
+    """
+
+    def __init__(self, cache_dir: Path = None, max_bytes: int = MAX_CACHE_BYTES, ttl_seconds: float = CACHE_TTL_SECONDS,
+                 eviction_interval: float = EVICTION_INTERVAL_SECONDS):
+        self.cache_dir = Path(cache_dir or CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.eviction_interval = eviction_interval
+        self.lock = threading.Lock()
+        
+        # Bytes of cached responses, unknown until the first scan
+        self.size_bytes = None
+        self.scanned_at = 0.0
+
+    def get_path(self, key: str) -> Path:
+        """Get the file holding a cached response"""
+
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response
+
+        Args:
+            key: Key from make_cache_key
+
+        Returns:
+            Cached response text, or None if missing or expired
+        """
+
+        path = self.get_path(key)
+
+        try:
+            written_at = path.stat().st_mtime
+            entry = json.loads(path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading cached response {key[:12]}: {str(e)}")
+            return None
+
+        now = time.time()
+        if now - written_at > self.ttl_seconds:
+            logger.info(f"Cached response {key[:12]} expired")
+            self.remove(path)
+            return None
+
+        # Mark as recently used, keeping the write time
+        try:
+            os.utime(path, (now, written_at))
+        except OSError:
+            pass
+
+        logger.info(f"Using cached response {key[:12]}")
+        return entry['text']
+
+    def put(self, key: str, text: str):
+        """Store a response and evict least recently used entries if the cache is too large"""
+
+        if not text:
+            return
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.get_path(key)
+            previous_size = get_file_size(path)
+            data = json.dumps({'text': text}).encode('utf-8')
+
+            # Write to a temporary file first so readers never see a partial entry
+            tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+            with self.lock:
+                if self.size_bytes is not None:
+                    self.size_bytes += len(data) - previous_size
+                scan_due = (self.size_bytes is None or self.size_bytes > self.max_bytes
+                            or time.time() - self.scanned_at > self.eviction_interval)
+
+            if scan_due:
+                self.evict()
+
+        except Exception as e:
+            logger.error(f"Error caching response {key[:12]}: {str(e)}")
+
+    def remove(self, path: Path):
+        """Remove one cached response and deduct it from the tracked size"""
+
+        size = get_file_size(path)
+        path.unlink(missing_ok=True)
+        with self.lock:
+            if self.size_bytes is not None:
+                self.size_bytes = max(0, self.size_bytes - size)
+
+    def evict(self):
+        """
+        Scan the cache, removing entries written longer than the TTL ago and, if the
+        cache exceeds max_bytes, least recently used entries until it is back
+        under EVICTION_TARGET_RATIO of the limit
+        """
+
+        with self.lock:
+            now = time.time()
+            entries = []
+            for path in self.cache_dir.glob('*.json'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_mtime, stat.st_size, path))
+
+            total_bytes = sum(size for _, _, size, _ in entries)
+            limit = self.max_bytes if total_bytes <= self.max_bytes else int(self.max_bytes * EVICTION_TARGET_RATIO)
+            evicted = 0
+
+            for _, written_at, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total_bytes <= limit and now - written_at <= self.ttl_seconds:
+                    continue
+                path.unlink(missing_ok=True)
+                total_bytes -= size
+                evicted += 1
+
+            self.size_bytes = total_bytes
+            self.scanned_at = now
+
+            if evicted:
+                logger.info(f"Evicted {evicted} cached responses ({total_bytes} bytes remaining)")
+
+    def clear(self):
+        """Remove every cached response"""
+
+        with self.lock:
+            for path in self.cache_dir.glob('*.json'):
+                path.unlink(missing_ok=True)
+            self.size_bytes = 0
+
+def get_file_size(path: Path) -> int:
+    """Get the size of a file in bytes (0 if it does not exist)"""
+
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+# Directory holding the last generated sections of each product's report
+SECTIONS_DIR = dataset_store.STORE_DIR / "report_sections"
+
+# Characters replaced when a ProductID is used in a file name
+UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9_-]')
+
+def get_sections_path(product_id: str, sections_dir: Path = None) -> Path:
+    """
+    Get the file holding the stored sections of a product's report
+
+    The file name keeps the filename-safe characters of the ProductID for
+    readability and adds a hash of the full ID, so IDs containing path
+    separators or other special characters cannot escape the directory or
+    collide after sanitising.
+    """
+
+    product_id = str(product_id)
+    safe_id = UNSAFE_FILENAME_CHARS.sub('_', product_id)[:64]
+    id_hash = hashlib.sha256(product_id.encode('utf-8')).hexdigest()[:16]
+    return Path(sections_dir or SECTIONS_DIR) / f"{safe_id}-{id_hash}.json"
+
+def load_report_sections(product_id: str, sections_dir: Path = None) -> Dict[int, Dict[str, str]]:
+    """
+    Load the stored sections of a product's last report
+
+    Args:
+        product_id: Product ID
+        sections_dir: Directory of stored sections (defaults to SECTIONS_DIR)
+
+    Returns:
+        Dict of section number to {'fingerprint', 'content'} (empty if none stored)
+    """
+
+    path = get_sections_path(product_id, sections_dir)
+
+    try:
+        stored = json.loads(path.read_text(encoding='utf-8'))
+        return {int(number): section for number, section in stored.items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Error loading stored sections for {product_id}: {str(e)}")
+        return {}
+
+def save_report_sections(product_id: str, sections: Dict[int, Dict[str, str]], sections_dir: Path = None):
+    """Store the sections of a product's report with the fingerprints they were generated from"""
+
+    try:
+        path = get_sections_path(product_id, sections_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp_path.write_text(json.dumps(sections), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    except Exception as e:
+        logger.error(f"Error storing sections for {product_id}: {str(e)}")
+
+# Shared cache used by report generation (None when disabled)
+response_cache = ResponseCache() if CACHE_ENABLED else None
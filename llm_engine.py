@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, Iterator
+
+import llm_cache
+
+logger = logging.getLogger(__name__)
+
+# Default Gemini model used for report generation
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# LLM backend used for report generation: "gemini" (Google Gemini API) or
+# "http" (a generate_content HTTP server such as llm_stub_server)
+LLM_BACKEND = os.environ.get("PHARMA_PULSE_LLM_BACKEND", "gemini")
+
+# Base URL of the HTTP backend
+LLM_SERVER_URL = os.environ.get("PHARMA_PULSE_LLM_URL", "http://127.0.0.1:8765")
+
+# Requests kept in flight at once
+MAX_CONCURRENCY = 4
+
+# Sustained request rate and burst size allowed by the token bucket
+REQUESTS_PER_MINUTE = 60
+RATE_LIMIT_BURST = 4
+
+# Per-request timeout in seconds
+REQUEST_TIMEOUT = 120
+
+# Retry policy for throttled (429) and server (5xx) errors
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Status code of throttled requests
+THROTTLED_STATUS_CODE = 429
+
+class TokenBucket:
+    """
+    Async token bucket limiting the rate at which requests are started
+
+    pause() stops handing out tokens for a while and empties the bucket, so
+    after a throttled request every request sharing the bucket backs off
+    instead of only the one that was rejected.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the given number of seconds, then refill from empty"""
+
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+class ConcurrencyLimit:
+    """
+    Async bound on requests in flight that adapts to server throttling
+
+    Works like a semaphore with up to maximum slots. When a request is
+    throttled, the limit drops to the number of requests then in flight
+    minus one (the server accepted no more); after limit successes in a
+    row it grows by one again, probing back towards maximum.
+    """
+
+    def __init__(self, maximum: int):
+        self.maximum = maximum
+        self.limit = maximum
+        self.active = 0
+        self.successes = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        """Wait until fewer than limit requests are in flight and take a slot"""
+
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self, throttled: bool = False, succeeded: bool = False):
+        """Give back a slot, lowering the limit after a throttled request and raising it after successes"""
+
+        async with self.condition:
+            if throttled:
+                limit = max(1, min(self.limit, self.active - 1))
+                if limit < self.limit:
+                    logger.warning(f"Requests throttled, lowering concurrency from {self.limit} to {limit}")
+                self.limit = limit
+                self.successes = 0
+            elif succeeded:
+                self.successes += 1
+                if self.limit < self.maximum and self.successes >= self.limit:
+                    self.limit += 1
+                    self.successes = 0
+
+            self.active -= 1
+            self.condition.notify_all()
+
+def get_status_code(error: Exception):
+    """Get the HTTP status code carried by an API error, if any"""
+
+    return getattr(error, 'code', None) or getattr(error, 'status_code', None)
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether a failed request should be retried"""
+
+    return isinstance(error, asyncio.TimeoutError) or get_status_code(error) in RETRYABLE_STATUS_CODES
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, maximum: float = BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter for the given retry attempt"""
+
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+class GenerationEngine:
+    """
+    Asyncio engine running many Gemini generate_content calls concurrently
+
+    Keeps up to max_concurrency requests in flight, starts them no faster
+    than the token bucket allows, applies a timeout to every request and
+    retries 429/5xx errors and timeouts with jittered exponential backoff.
+    A 429 also pauses the shared token bucket for the backoff delay and
+    lowers the concurrency limit (see ConcurrencyLimit), so the whole run
+    slows down rather than each request retrying on its own.
+    Responses found in the response cache are returned without a request.
+    """
+
+    def __init__(self, client, model: str = DEFAULT_MODEL, max_concurrency: int = MAX_CONCURRENCY,
+                 requests_per_minute: float = REQUESTS_PER_MINUTE, burst: int = RATE_LIMIT_BURST,
+                 timeout: float = REQUEST_TIMEOUT, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX,
+                 cache: llm_cache.ResponseCache = None):
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+
+    async def generate(self, contents: str, config: Any, limiter: TokenBucket, concurrency: ConcurrencyLimit,
+                       key: str = "") -> str:
+        """
+        Run one generate_content call with rate limiting, timeout and retries
+
+        Args:
+            contents: Prompt text
+            config: Generation config passed through to the client
+            limiter: Token bucket shared by the run
+            concurrency: Limit on requests in flight shared by the run
+            key: Identifier used in log messages
+
+        Returns:
+            Generated text
+        """
+
+        cache_key = llm_cache.make_cache_key(self.model, contents, config) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        attempt = 0
+        while True:
+            await concurrency.acquire()
+            throttled = False
+            succeeded = False
+            try:
+                await limiter.acquire()
+                response = await asyncio.wait_for(
+                    self.client.aio.models.generate_content(model=self.model, contents=contents, config=config),
+                    timeout=self.timeout
+                )
+                text = response.text or ""
+                succeeded = True
+
+            except Exception as e:
+                throttled = get_status_code(e) == THROTTLED_STATUS_CODE
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                error = e
+
+            finally:
+                await concurrency.release(throttled, succeeded)
+
+            if succeeded:
+                if cache_key:
+                    self.cache.put(cache_key, text)
+                return text
+
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            if throttled:
+                limiter.pause(delay)
+            attempt += 1
+            reason = 'timeout' if isinstance(error, asyncio.TimeoutError) else f"status {get_status_code(error)}"
+            logger.warning(f"Generation request {key} failed ({reason}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def generate_all(self, requests: Dict[str, Dict[str, Any]],
+                           on_result: Callable[[str, Any], None] = None) -> Dict[str, Any]:
+        """
+        Run many generation requests concurrently
+
+        Args:
+            requests: Requests by key, each a dict with 'contents' and 'config'
+            on_result: Called as (key, text or exception) as each request finishes
+
+        Returns:
+            Generated text (or the exception raised) by key
+        """
+
+        limiter = TokenBucket(self.requests_per_minute / 60, self.burst)
+        concurrency = ConcurrencyLimit(self.max_concurrency)
+        results = {}
+
+        async def run_request(key: str, request: Dict[str, Any]):
+            try:
+                result = await self.generate(request['contents'], request.get('config'), limiter, concurrency, key)
+            except Exception as e:
+                logger.error(f"Generation request {key} failed: {str(e) or type(e).__name__}")
+                result = e
+
+            results[key] = result
+            if on_result:
+                try:
+                    on_result(key, result)
+                except Exception as e:
+                    logger.error(f"Error handling generation result {key}: {str(e)}")
+
+        await asyncio.gather(*(run_request(key, request) for key, request in requests.items()))
+        return {key: results[key] for key in requests}
+
+    def run(self, requests: Dict[str, Dict[str, Any]], on_result: Callable[[str, Any], None] = None) -> Dict[str, Any]:
+        """Synchronous wrapper around generate_all"""
+
+        return asyncio.run(self.generate_all(requests, on_result))
+
+def create_client(backend: str = None):
+    """
+    Create the client of an LLM backend
+
+    Every backend exposes the part of the genai.Client interface used for
+    report generation: models.generate_content, models.generate_content_stream
+    and aio.models.generate_content.
+
+    Args:
+        backend: "gemini" or "http" (defaults to LLM_BACKEND)
+
+    Returns:
+        Client for the backend
+    """
+
+    backend = backend or LLM_BACKEND
+
+    if backend == "gemini":
+        from google import genai
+        return genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+    if backend == "http":
+        return HttpLLMClient(LLM_SERVER_URL)
+
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+llm_client = None
+llm_client_lock = threading.Lock()
+
+def get_client():
+    """Get the shared LLM client, creating it for LLM_BACKEND on first use"""
+
+    global llm_client
+    with llm_client_lock:
+        if llm_client is None:
+            llm_client = create_client()
+            logger.info(f"Created {LLM_BACKEND} LLM client")
+        return llm_client
+
+def set_client(client):
+    """Replace the shared LLM client (e.g. with a stub for offline runs)"""
+
+    global llm_client
+    with llm_client_lock:
+        llm_client = client
+
+def serialize_config(config: Any) -> Dict[str, Any]:
+    """Get the generation settings of a config as JSON-serializable values"""
+
+    return {
+        'system_instruction': getattr(config, 'system_instruction', None),
+        'max_output_tokens': getattr(config, 'max_output_tokens', None),
+        'temperature': getattr(config, 'temperature', None)
+    }
+
+class HttpModels:
+    """generate_content calls sent to an HTTP server (see llm_stub_server)"""
+
+    def __init__(self, base_url: str, timeout: float = REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, path: str, model: str, contents: str, config: Any):
+        """Send a generation request and return the open HTTP response"""
+
+        body = json.dumps({'model': model, 'contents': contents, 'config': serialize_config(config)}, default=str)
+        request = urllib.request.Request(f"{self.base_url}{path}", data=body.encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            raise StubAPIError(e.code, e.read().decode('utf-8', errors='replace') or e.reason)
+
+    def generate_content(self, model: str, contents: str, config: Any = None) -> 'StubResponse':
+        with self.post('/generate', model, contents, config) as response:
+            return StubResponse(json.loads(response.read())['text'])
+
+    def generate_content_stream(self, model: str, contents: str, config: Any = None) -> Iterator['StubResponse']:
+        with self.post('/stream', model, contents, config) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if 'error' in chunk:
+                    raise StubAPIError(chunk.get('code', 500), chunk['error'])
+                yield StubResponse(chunk['text'])
+
+class AsyncHttpModels:
+    """Async wrapper running HttpModels requests in worker threads"""
+
+    def __init__(self, models: HttpModels):
+        self.models = models
+
+    async def generate_content(self, model: str, contents: str, config: Any = None) -> 'StubResponse':
+        return await asyncio.to_thread(self.models.generate_content, model=model, contents=contents, config=config)
+
+class HttpLLMClient:
+    """Client with the genai.Client interface for a generate_content HTTP server"""
+
+    def __init__(self, base_url: str = LLM_SERVER_URL, timeout: float = REQUEST_TIMEOUT):
+        self.models = HttpModels(base_url, timeout)
+        self.aio = SimpleNamespace(models=AsyncHttpModels(self.models))
+
+class StubAPIError(Exception):
+    """Error raised by the stub clients, carrying an HTTP status code like google.genai.errors.APIError"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class StubResponse:
+    """Minimal generate_content response"""
+
+    def __init__(self, text: str):
+        self.text = text
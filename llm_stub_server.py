@@ -0,0 +1,210 @@
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults of the simulated model
+DEFAULT_PORT = 8765
+DEFAULT_LATENCY = 0.5
+DEFAULT_TOKENS_PER_SECOND = 400.0
+DEFAULT_OUTPUT_TOKENS = 800
+
+# Tokens sent per streamed chunk
+STREAM_CHUNK_TOKENS = 20
+
+FILLER_WORDS = ("safety", "profile", "reported", "events", "patients", "exposure", "assessment", "signal",
+                "monitoring", "benefit", "risk", "authorization", "review", "data", "period", "analysis")
+
+SECTION_PATTERN = re.compile(r'Write section (\d+) "([^"]+)"')
+
+class StubModel:
+    """
+    Simulated generate_content model with configurable latency, token rate and errors
+
+    Every request waits latency seconds (plus jitter) before its first token
+    and then produces output at tokens_per_second. Requests beyond
+    max_in_flight concurrent calls are rejected with 429, and error_rate of
+    the remaining calls fail with 503 before any output.
+    """
+
+    def __init__(self, latency: float = DEFAULT_LATENCY, jitter: float = 0.1,
+                 tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND, output_tokens: int = DEFAULT_OUTPUT_TOKENS,
+                 error_rate: float = 0.0, max_in_flight: int = None, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.max_in_flight = max_in_flight
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0}
+
+    def admit(self) -> Tuple[int, str]:
+        """Decide whether a new request is served; returns (status code, message)"""
+
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                self.stats['throttled'] += 1
+                return 429, "RESOURCE_EXHAUSTED"
+            if self.random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 503, "UNAVAILABLE"
+            self.in_flight += 1
+            return 200, "OK"
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def first_token_delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def output_limit(self, config: Dict[str, Any]) -> int:
+        """Number of tokens to produce, capped by the request's max_output_tokens"""
+
+        max_output_tokens = (config or {}).get('max_output_tokens')
+        return min(self.output_tokens, max_output_tokens) if max_output_tokens else self.output_tokens
+
+    def render(self, contents: str, token_count: int) -> str:
+        """Produce markdown shaped like a PSUR report (or a single section) of about token_count words"""
+
+        match = SECTION_PATTERN.search(contents)
+        if match:
+            headings = [f"## {match.group(1)}. {match.group(2)}"]
+        else:
+            headings = [f"## {number}. Section {number}" for number in range(1, 13)]
+
+        words_per_section = max(1, token_count // len(headings))
+        parts = []
+        for index, heading in enumerate(headings):
+            words = ' '.join(FILLER_WORDS[(index + i) % len(FILLER_WORDS)] for i in range(words_per_section))
+            parts.append(f"{heading}\n\n{words.capitalize()}.")
+        return '\n\n'.join(parts)
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """Serves POST /generate (JSON response) and POST /stream (newline-delimited JSON chunks)"""
+
+    model: StubModel = None
+
+    def log_message(self, format: str, *args):
+        logger.debug(format % args)
+
+    def send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path not in ('/generate', '/stream'):
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except Exception as e:
+            self.send_json(400, {'error': f"Invalid request: {str(e)}"})
+            return
+
+        status, message = self.model.admit()
+        if status != 200:
+            self.send_json(status, {'error': message})
+            return
+
+        try:
+            token_count = self.model.output_limit(request.get('config'))
+            text = self.model.render(request.get('contents', ''), token_count)
+            time.sleep(self.model.first_token_delay())
+
+            if self.path == '/generate':
+                time.sleep(token_count / self.model.tokens_per_second)
+                self.send_json(200, {'text': text})
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.end_headers()
+
+            # Split the text into chunks of about STREAM_CHUNK_TOKENS words, paced at the token rate
+            words = text.split(' ')
+            for start in range(0, len(words), STREAM_CHUNK_TOKENS):
+                chunk = ' '.join(words[start:start + STREAM_CHUNK_TOKENS])
+                if start + STREAM_CHUNK_TOKENS < len(words):
+                    chunk += ' '
+                self.wfile.write((json.dumps({'text': chunk}) + '\n').encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(STREAM_CHUNK_TOKENS / self.model.tokens_per_second)
+
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client disconnected")
+        finally:
+            self.model.release()
+
+def start_server(model: StubModel = None, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """
+    Start the stub server in a background thread
+
+    Args:
+        model: Simulated model (defaults to StubModel())
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+
+    Returns:
+        Running server; its URL is http://host:server.server_address[1]
+        and server.shutdown() stops it
+    """
+
+    handler = type('BoundStubRequestHandler', (StubRequestHandler,), {'model': model or StubModel()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    threading.Thread(target=server.serve_forever, name='llm-stub-server', daemon=True).start()
+    logger.info(f"LLM stub server listening on http://{host}:{server.server_address[1]}")
+    return server
+
+def main(argv=None) -> int:
+    """Command line entry point running the stub server in the foreground"""
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generate_content API")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY, help="Seconds before the first token")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Random variation of the latency in seconds")
+    parser.add_argument('--tokens-per-second', type=float, default=DEFAULT_TOKENS_PER_SECOND, help="Output token rate")
+    parser.add_argument('--output-tokens', type=int, default=DEFAULT_OUTPUT_TOKENS, help="Tokens per response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests failing with 503")
+    parser.add_argument('--max-in-flight', type=int, help="Concurrent requests served before returning 429")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    model = StubModel(latency=args.latency, jitter=args.jitter, tokens_per_second=args.tokens_per_second,
+                      output_tokens=args.output_tokens, error_rate=args.error_rate,
+                      max_in_flight=args.max_in_flight, seed=args.seed)
+    server = start_server(model, args.host, args.port)
+
+    print(f"Serving on http://{args.host}:{server.server_address[1]} "
+          f"(set PHARMA_PULSE_LLM_BACKEND=http PHARMA_PULSE_LLM_URL=http://{args.host}:{server.server_address[1]})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import llm_cache
+import llm_engine
+import llm_stub_server
+import report_generator
+import batch_generator
+
+logger = logging.getLogger(__name__)
+
+def run_load_test(data: Dict[str, pd.DataFrame], product_ids: List[str], report_count: int,
+                  concurrency: int) -> Dict[str, Any]:
+    """
+    Generate reports concurrently with generate_psur_report and measure throughput and latency
+
+    Args:
+        data: Ingested datasets
+        product_ids: Products to generate reports for, used in turn
+        report_count: Reports to generate
+        concurrency: Reports generated at once (worker threads)
+
+    Returns:
+        Successful (model-generated) reports per minute, p50/p95/max latency
+        of the successful reports in seconds, fallback reports, fallback rate
+        and failures. Fallback reports are counted separately and never as
+        throughput, so an unreachable model cannot look like a speedup.
+    """
+
+    def generate(index: int) -> Dict[str, Any]:
+        product_id = product_ids[index % len(product_ids)]
+        started = time.perf_counter()
+        try:
+            report = report_generator.generate_psur_report(product_id, data, section_mode=False)
+            fallback = report_generator.is_fallback_report(report)
+            failed = False
+        except Exception as e:
+            logger.error(f"Load test report {index} for {product_id} failed: {str(e)}")
+            fallback = False
+            failed = True
+        return {'latency': time.perf_counter() - started, 'fallback': fallback, 'failed': failed}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(generate, range(report_count)))
+    elapsed = time.perf_counter() - started
+
+    successful = [result for result in results if not result['fallback'] and not result['failed']]
+    fallback_reports = sum(result['fallback'] for result in results)
+    latencies = np.array([result['latency'] for result in successful])
+
+    def latency_percentile(percentile: float):
+        return round(float(np.percentile(latencies, percentile)), 3) if len(latencies) else None
+
+    return {
+        'concurrency': concurrency,
+        'reports': report_count,
+        'elapsed_seconds': round(elapsed, 3),
+        'successful_reports': len(successful),
+        'successful_reports_per_minute': round(len(successful) / elapsed * 60, 1),
+        'p50_latency_seconds': latency_percentile(50),
+        'p95_latency_seconds': latency_percentile(95),
+        'max_latency_seconds': latency_percentile(100),
+        'fallback_reports': fallback_reports,
+        'fallback_rate': round(fallback_reports / report_count, 3),
+        'failed': sum(result['failed'] for result in results)
+    }
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point for the generation load test"""
+
+    parser = argparse.ArgumentParser(description="Load test PSUR generation against a local stub LLM server")
+    parser.add_argument('--data-dir', required=True, help="Directory containing the six required CSV files")
+    parser.add_argument('--products', nargs='*', help="ProductIDs to generate reports for (default: all products)")
+    parser.add_argument('--reports', type=int, default=40, help="Reports generated per concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='*', default=[1, 4, 8], help="Concurrency levels to test")
+    parser.add_argument('--url', help="Use a running server (llm_stub_server) instead of starting one")
+    parser.add_argument('--latency', type=float, default=llm_stub_server.DEFAULT_LATENCY, help="Seconds before the first token")
+    parser.add_argument('--tokens-per-second', type=float, default=llm_stub_server.DEFAULT_TOKENS_PER_SECOND,
+                        help="Output token rate")
+    parser.add_argument('--output-tokens', type=int, default=llm_stub_server.DEFAULT_OUTPUT_TOKENS, help="Tokens per response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests failing with 503")
+    parser.add_argument('--max-in-flight', type=int, help="Concurrent requests served before returning 429")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    server = None
+    url = args.url
+    if url is None:
+        model = llm_stub_server.StubModel(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                          output_tokens=args.output_tokens, error_rate=args.error_rate,
+                                          max_in_flight=args.max_in_flight, seed=0)
+        server = llm_stub_server.start_server(model, port=0)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Every request must reach the server
+    llm_cache.response_cache = None
+    llm_engine.set_client(llm_engine.HttpLLMClient(url))
+
+    try:
+        data = batch_generator.load_datasets_from_dir(args.data_dir)
+        product_ids = [str(product_id) for product_id in
+                       (args.products or data['Products.csv']['ProductID'].dropna().unique().tolist())]
+
+        results = []
+        for concurrency in args.concurrency:
+            result = run_load_test(data, product_ids, args.reports, concurrency)
+            print(json.dumps(result), flush=True)
+            results.append(result)
+
+    except Exception as e:
+        print(f"Load test failed: {str(e)}", file=sys.stderr)
+        return 1
+
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
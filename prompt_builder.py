@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import logging
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Estimated tokens allowed for the data summary embedded in a prompt
+# (PHARMA_PULSE_PROMPT_TOKEN_BUDGET overrides it)
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PHARMA_PULSE_PROMPT_TOKEN_BUDGET", "2000"))
+
+# Values kept from each high-cardinality count or list before the rest are
+# bucketed into "Other"; halved until the summary fits the budget
+PROMPT_TOP_K = 10
+
+# Label of the bucket holding the values beyond the top K
+OTHER_LABEL = "Other"
+
+# Approximate characters per token of words (subword tokenizers split long words)
+CHARS_PER_TOKEN = 4
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\n\s*")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text
+
+    Words count one token per CHARS_PER_TOKEN characters (at least one),
+    every punctuation character and every line break with its indentation
+    count as one token, which matches JSON far better than a flat
+    characters-per-token ratio.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Estimated token count
+    """
+
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        length = match.end() - match.start()
+        tokens += -(-length // CHARS_PER_TOKEN)
+    return tokens
+
+def compact_json(value: Any) -> str:
+    """Serialize a value as JSON without indentation or padding"""
+
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
+
+def bucket_counts(counts: Dict[str, int], top_k: int) -> Dict[str, int]:
+    """Keep the top_k largest counts and sum the rest into an "Other (N values)" bucket"""
+
+    if len(counts) <= top_k:
+        return counts
+
+    ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    bucketed = dict(ranked[:top_k])
+    rest = ranked[top_k:]
+    bucketed[f"{OTHER_LABEL} ({len(rest)} values)"] = sum(count for _, count in rest)
+    return bucketed
+
+def bucket_values(values: List[Any], top_k: int) -> List[Any]:
+    """Keep the first top_k values of a list and replace the rest with an "Other (N values)" entry"""
+
+    if len(values) <= top_k:
+        return values
+
+    return list(values[:top_k]) + [f"{OTHER_LABEL} ({len(values) - top_k} values)"]
+
+def is_count_dict(value: Any) -> bool:
+    """Check whether a value is a dictionary of category counts"""
+
+    return isinstance(value, dict) and bool(value) and all(
+        isinstance(count, int) and not isinstance(count, bool) for count in value.values()
+    )
+
+def compact_value(value: Any, top_k: int) -> Any:
+    """Bucket every high-cardinality count dictionary and list within a summary value"""
+
+    if is_count_dict(value):
+        return bucket_counts(value, top_k)
+    if isinstance(value, dict):
+        return {key: compact_value(item, top_k) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return bucket_values(list(value), top_k)
+    return value
+
+def build_prompt_data(data_summary: Dict[str, Any], fields: List[str] = None, budget: int = PROMPT_TOKEN_BUDGET,
+                      top_k: int = PROMPT_TOP_K, label: str = "report") -> Tuple[str, int]:
+    """
+    Serialize the data summary for a prompt within a token budget
+
+    The summary is written as compact JSON. If it exceeds the budget,
+    count dictionaries and lists are cut to their top K entries plus an
+    "Other" bucket, halving K until the summary fits (or K reaches 1).
+
+    Args:
+        data_summary: Data summary from report_generator.prepare_data_summary
+        fields: Summary fields to include (defaults to every field except
+            the section fingerprints)
+        budget: Estimated token budget of the serialized summary
+        top_k: Largest number of values kept per count dictionary or list
+        label: Name of the prompt in log messages (e.g. "section 4")
+
+    Returns:
+        Tuple of the JSON text and its estimated token count
+    """
+
+    if fields is None:
+        fields = [field for field in data_summary if field != 'section_fingerprints']
+    section_data = {field: data_summary.get(field, {}) for field in fields}
+
+    data_json = compact_json(section_data)
+    tokens = estimate_tokens(data_json)
+    original_tokens = tokens
+    applied_k = None
+
+    while tokens > budget and top_k >= 1:
+        applied_k = top_k
+        compacted = {field: compact_value(value, top_k) for field, value in section_data.items()}
+        data_json = compact_json(compacted)
+        tokens = estimate_tokens(data_json)
+        if top_k == 1:
+            break
+        top_k = max(1, top_k // 2)
+
+    field_tokens = {field: estimate_tokens(compact_json(value)) for field, value in section_data.items()}
+    if applied_k is None:
+        logger.info(f"Prompt data for {label}: ~{tokens} tokens ({len(data_json)} chars), by field {field_tokens}")
+    else:
+        logger.info(f"Prompt data for {label}: ~{tokens} tokens ({len(data_json)} chars) after top-{applied_k} "
+                    f"bucketing, ~{original_tokens} before; by field before bucketing {field_tokens}")
+
+    if tokens > budget:
+        logger.warning(f"Prompt data for {label} exceeds the token budget ({tokens} > {budget})")
+
+    return data_json, tokens
@@ -8,6 +8,7 @@ import os
 import backend
 import report_generator
 import docx_pdf_exporter
+import batch_generator
 import utils
 
 logger = logging.getLogger(__name__)
@@ -225,15 +226,19 @@ def show_data_upload_page():
         
         if st.button("🚀 Validate All Files", type="primary"):
             with st.spinner("Validating uploaded files..."):
-                validation_results = backend.validate_all_files(uploaded_files)
-                st.session_state.validation_results = validation_results
-                
+                # Parse each file once; the validation results carry the cleaned data
+                validation_results = backend.ingest_all_files(uploaded_files)
+                st.session_state.validation_results = {
+                    file_name: {key: value for key, value in result.items() if key != 'data'}
+                    for file_name, result in validation_results.items()
+                }
+
                 # Display validation results
                 display_validation_results(validation_results)
                 
                 # If all validations pass, store data
                 if all(result['valid'] for result in validation_results.values()):
-                    st.session_state.uploaded_data = backend.process_validated_files(uploaded_files)
+                    st.session_state.uploaded_data = backend.process_validated_files(uploaded_files, validation_results)
                     st.success("✅ All files validated successfully! You can now proceed to report generation.")
                     logger.info("All files validated successfully")
         
@@ -247,6 +252,8 @@ def display_validation_results(validation_results):
     for file_name, result in validation_results.items():
         if result['valid']:
             st.success(f"✅ {file_name}: Valid ({result['rows']} rows)")
+            if result.get('store_path'):
+                st.info(f"   • Large file streamed to the product-partitioned store; rows are read per product")
         else:
             st.error(f"❌ {file_name}: Invalid")
             for error in result['errors']:
@@ -379,6 +386,7 @@ def show_report_generation_page():
                             if report_content:
                                 st.session_state.generated_report = report_content
                                 st.session_state.report_product_id = review_product_id
+                                st.session_state.pop('report_period', None)
                                 
                                 # Load reviewer notes to get associated report
                                 load_reviewer_notes_from_file(review_product_id)
@@ -447,6 +455,7 @@ def show_report_generation_page():
                     del st.session_state.edited_report_content
                 if 'final_reviewer_notes' in st.session_state:
                     del st.session_state.final_reviewer_notes
+                st.session_state.pop('report_period', None)
                 st.session_state.report_product_id = product_id
                 logger.info(f"Switched to product {product_id}, cleared previous report data")
                 st.info(f"🔄 Product changed to {product_id}. Previous report cleared - generate new report below.")
@@ -498,7 +507,9 @@ def show_report_generation_page():
             # Debug information
             with st.expander("🔍 Debug Information", expanded=False):
                 st.markdown("**Product Data Summary:**")
-                product_debug_data = backend.get_product_data(product_id, st.session_state.uploaded_data)
+                product_debug_data = report_generator.extract_product_data(
+                    product_id, st.session_state.uploaded_data, (start_date, end_date) if start_date <= end_date else None
+                )
                 for file_name, df in product_debug_data.items():
                     st.markdown(f"- **{file_name}:** {len(df) if df is not None else 0} rows")
                     if df is not None and len(df) > 0:
@@ -506,21 +517,38 @@ def show_report_generation_page():
             
             # Generate report button - only show if date range is valid
             if start_date <= end_date:
+                section_mode = st.checkbox(
+                    "⚡ Generate sections in parallel",
+                    value=report_generator.SECTION_GENERATION,
+                    help="Generate each of the 12 ICH E2C(R2) sections as a separate concurrent request"
+                )
+                
                 if st.button("🤖 Generate PSUR Report", type="primary"):
                     with st.spinner("Generating AI-powered PSUR report..."):
                         try:
                             # Debug: Show what data is being passed
-                            debug_data = backend.get_product_data(product_id, st.session_state.uploaded_data)
+                            reporting_period = (start_date, end_date)
+                            debug_data = report_generator.extract_product_data(product_id, st.session_state.uploaded_data, reporting_period)
                             logger.info(f"Generating report for product {product_id} with data: {[(k, len(v) if v is not None else 0) for k, v in debug_data.items()]}")
                             
-                            # Generate the report
-                            report_content = report_generator.generate_psur_report(
-                                product_id, 
-                                st.session_state.uploaded_data
-                            )
+                            # Generate the report, rendering it as it streams in
+                            section_info = {}
+                            if section_mode:
+                                report_content, section_info = report_generator.generate_psur_report(
+                                    product_id, 
+                                    st.session_state.uploaded_data,
+                                    section_mode=True,
+                                    reporting_period=reporting_period,
+                                    return_info=True
+                                )
+                            else:
+                                report_content = render_report_stream(
+                                    report_generator.stream_psur_report(product_id, st.session_state.uploaded_data, reporting_period)
+                                )
                             
                             st.session_state.generated_report = report_content
                             st.session_state.report_product_id = product_id
+                            st.session_state.report_period = reporting_period
                             
                             # Save report content to file for reviewer access
                             save_report_to_file(product_id, report_content)
@@ -531,6 +559,12 @@ def show_report_generation_page():
                             logger.info(f"PSUR report generated for product: {product_id}")
                             st.success("✅ PSUR report generated successfully!")
                             
+                            # Report which sections were reused from the previous generation
+                            if section_mode:
+                                if section_info.get('reused'):
+                                    st.info(f"♻️ Reused unchanged sections: {', '.join(map(str, section_info['reused']))}. "
+                                            f"Regenerated: {', '.join(map(str, section_info['regenerated'])) or 'none'}")
+                            
                         except Exception as e:
                             logger.error(f"Error generating report: {str(e)}")
                             st.error(f"❌ Error generating report: {str(e)}")
@@ -538,10 +572,86 @@ def show_report_generation_page():
             # Display generated report
             if 'generated_report' in st.session_state:
                 display_generated_report()
+        
+        # Admin-only batch generation for every product
+        if st.session_state.get('role', '') == 'admin':
+            show_batch_generation_section(len(product_options))
     
     else:
         st.error("❌ No products data available. Please check your uploaded files.")
 
+def show_batch_generation_section(product_count: int):
+    """Display the admin-only batch generation action for all products"""
+    
+    with st.expander("🗂️ Batch Generation (All Products)", expanded=False):
+        st.markdown(f"Generate and export PSUR reports for all **{product_count}** products in one run. "
+                    "Reports, Word and PDF files and a batch manifest are written to the output folder.")
+        
+        if st.button("🚀 Generate All PSUR Reports", type="secondary"):
+            progress_bar = st.progress(0.0)
+            status_text = st.empty()
+            
+            progress_counts = {}
+            
+            def update_progress(count: int, total: int, product_id: str, status: str):
+                # Generation and exports each make up half of the progress bar
+                phase = 'generated' if status in batch_generator.GENERATION_STATUSES else 'finished'
+                progress_counts[phase] = count
+                progress_bar.progress(sum(progress_counts.values()) / (2 * total))
+                status_text.markdown(f"**{count}/{total} {phase}** - Product {product_id}: {status}")
+            
+            try:
+                reporting_period = None
+                if 'report_start_date' in st.session_state and 'report_end_date' in st.session_state:
+                    reporting_period = (st.session_state.report_start_date, st.session_state.report_end_date)
+                
+                manifest = batch_generator.run_batch(
+                    st.session_state.uploaded_data,
+                    progress_callback=update_progress,
+                    reporting_period=reporting_period
+                )
+                
+                st.session_state.batch_manifest = manifest
+                logger.info(f"Batch generation completed: {manifest['completed']}/{manifest['total_products']} reports")
+                
+            except Exception as e:
+                logger.error(f"Error in batch generation: {str(e)}")
+                st.error(f"❌ Error in batch generation: {str(e)}")
+        
+        manifest = st.session_state.get('batch_manifest')
+        if manifest:
+            if manifest['failed'] == 0:
+                st.success(f"✅ Generated {manifest['completed']} reports in {manifest['elapsed_seconds']}s")
+            else:
+                fallback_note = f" ({manifest['fallback']} fell back to the template)" if manifest.get('fallback') else ""
+                st.warning(f"⚠️ {manifest['completed']} of {manifest['total_products']} reports completed, "
+                           f"{manifest['failed']} need attention{fallback_note}")
+            
+            st.dataframe(pd.DataFrame([
+                {
+                    'ProductID': entry['product_id'],
+                    'Status': entry['status'],
+                    'Files': ', '.join(os.path.basename(path) for path in entry['files'].values()),
+                    'Error': entry.get('error') or '; '.join(entry.get('export_errors', {}).values())
+                }
+                for entry in manifest['reports']
+            ]))
+            st.caption(f"Manifest: {manifest['manifest_path']}")
+
+def render_report_stream(chunks) -> str:
+    """Render streamed report markdown as it arrives and return the full report"""
+    
+    report_placeholder = st.empty()
+    report_content = ""
+    
+    for chunk in chunks:
+        report_content += chunk
+        report_placeholder.markdown(report_content, unsafe_allow_html=True)
+    
+    # The finished report is shown by display_generated_report
+    report_placeholder.empty()
+    return report_content
+
 def display_generated_report():
     """Display the generated PSUR report with download options"""
     
@@ -564,53 +674,47 @@ def display_generated_report():
     # Export options
     st.markdown("### 📥 Export Options")
     
-    col1, col2 = st.columns(2)
+    # Use final report content with edits and notes
+    final_content = get_final_report_content()
+    product_id = st.session_state.report_product_id
     
-    with col1:
-        if st.button("📄 Download as Word (.docx)", type="secondary"):
+    # Exports are rendered once per content revision and kept for the
+    # download buttons, which rerun the page when clicked
+    exports = st.session_state.get('report_exports')
+    if exports and exports['content'] != final_content:
+        exports = st.session_state.report_exports = None
+    
+    if exports is None:
+        if st.button("📦 Prepare DOCX, PDF & Markdown", type="secondary"):
             try:
-                # Use final report content with edits and notes
-                final_content = get_final_report_content()
-                docx_file = docx_pdf_exporter.generate_docx(
-                    final_content,
-                    st.session_state.report_product_id
-                )
-                
-                with open(docx_file, "rb") as file:
-                    st.download_button(
-                        label="⬇️ Download DOCX",
-                        data=file.read(),
-                        file_name=f"PSUR_Report_{st.session_state.report_product_id}.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-                logger.info(f"DOCX report generated for product: {st.session_state.report_product_id}")
+                with st.spinner("Rendering exports..."):
+                    job = docx_pdf_exporter.export_report(final_content, product_id,
+                                                          output_dir=docx_pdf_exporter.EXPORT_COPY_DIR)
+                exports = st.session_state.report_exports = {'content': final_content, **job}
+                logger.info(f"Exports generated for product: {product_id} in {job['elapsed_seconds']}s")
                 
             except Exception as e:
-                logger.error(f"Error generating DOCX: {str(e)}")
-                st.error(f"❌ Error generating DOCX: {str(e)}")
+                logger.error(f"Error generating exports: {str(e)}")
+                st.error(f"❌ Error generating exports: {str(e)}")
     
-    with col2:
-        if st.button("📄 Download as PDF", type="secondary"):
-            try:
-                # Use final report content with edits and notes
-                final_content = get_final_report_content()
-                pdf_file = docx_pdf_exporter.generate_pdf(
-                    final_content,
-                    st.session_state.report_product_id
-                )
-                
-                with open(pdf_file, "rb") as file:
-                    st.download_button(
-                        label="⬇️ Download PDF",
-                        data=file.read(),
-                        file_name=f"PSUR_Report_{st.session_state.report_product_id}.pdf",
-                        mime="application/pdf"
-                    )
-                logger.info(f"PDF report generated for product: {st.session_state.report_product_id}")
+    if exports:
+        labels = {'docx': "⬇️ Download DOCX", 'pdf': "⬇️ Download PDF", 'md': "⬇️ Download Markdown"}
+        columns = st.columns(len(exports['artifacts']))
+        
+        for column, (export_format, artifact) in zip(columns, exports['artifacts'].items()):
+            with column:
+                if 'error' in artifact:
+                    st.error(f"❌ Error generating {export_format.upper()}: {artifact['error']}")
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Error generating PDF: {str(e)}")
-                st.error(f"❌ Error generating PDF: {str(e)}")
+                st.download_button(
+                    label=labels.get(export_format, f"⬇️ Download {export_format.upper()}"),
+                    data=artifact['content'],
+                    file_name=artifact['file_name'],
+                    mime=artifact['mime'],
+                    key=f"download_{export_format}"
+                )
+                st.caption(f"Rendered in {artifact['seconds']}s")
     
     # Optional data visualization section
     show_data_visualization()
@@ -791,44 +895,45 @@ def show_data_visualization():
     """Show optional data visualization section"""
     
     with st.expander("📊 Data Analytics & Visualization", expanded=False):
-        if st.session_state.uploaded_data:
+        if st.session_state.uploaded_data and 'report_product_id' in st.session_state:
+            
+            # Same extraction (product and reporting period) as the debug view and generation
+            product_data = report_generator.extract_product_data(
+                st.session_state.report_product_id,
+                st.session_state.uploaded_data,
+                st.session_state.get('report_period')
+            )
             
             # Adverse Events Summary
-            ae_df = st.session_state.uploaded_data.get('AdverseEvents.csv')
-            if ae_df is not None and not ae_df.empty:
+            product_ae = product_data.get('AdverseEvents')
+            if product_ae is not None:
                 st.markdown("#### 📈 Adverse Events Summary")
                 
-                # Filter for current product
-                if 'report_product_id' in st.session_state:
-                    product_ae = ae_df[ae_df['ProductID'] == st.session_state.report_product_id]
+                if not product_ae.empty:
+                    # Outcome distribution
+                    outcome_counts = product_ae['Outcome'].value_counts()
+                    outcome_counts = outcome_counts[outcome_counts > 0]
+                    st.bar_chart(outcome_counts)
                     
-                    if not product_ae.empty:
-                        # Outcome distribution
-                        outcome_counts = product_ae['Outcome'].value_counts()
-                        st.bar_chart(outcome_counts)
-                        
-                        # Summary table
-                        st.dataframe(outcome_counts.reset_index())
-                    else:
-                        st.info("No adverse events data available for this product.")
+                    # Summary table
+                    st.dataframe(outcome_counts.reset_index())
+                else:
+                    st.info("No adverse events data available for this product.")
             
             # Exposure Estimates Summary
-            exposure_df = st.session_state.uploaded_data.get('ExposureEstimates.csv')
-            if exposure_df is not None and not exposure_df.empty:
+            product_exposure = product_data.get('ExposureEstimates')
+            if product_exposure is not None:
                 st.markdown("#### 📊 Exposure Estimates by Region")
                 
-                if 'report_product_id' in st.session_state:
-                    product_exposure = exposure_df[exposure_df['ProductID'] == st.session_state.report_product_id]
+                if not product_exposure.empty:
+                    # Regional exposure chart
+                    regional_exposure = product_exposure.groupby('Region', observed=True)['EstimatedPatients'].sum().reset_index()
+                    st.bar_chart(regional_exposure.set_index('Region'))
                     
-                    if not product_exposure.empty:
-                        # Regional exposure chart
-                        regional_exposure = product_exposure.groupby('Region')['EstimatedPatients'].sum().reset_index()
-                        st.bar_chart(regional_exposure.set_index('Region'))
-                        
-                        # Summary table
-                        st.dataframe(regional_exposure)
-                    else:
-                        st.info("No exposure estimates data available for this product.")
+                    # Summary table
+                    st.dataframe(regional_exposure)
+                else:
+                    st.info("No exposure estimates data available for this product.")
 
 def show_account_page():
     """Display account information and settings with enhanced PwC styling"""
@@ -1,90 +1,357 @@
 import os
+import re
+import hashlib
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Tuple, Union, Iterator, List
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import json
 
-# Gemini AI integration
-from google import genai
+import backend
+import llm_engine
+import llm_cache
+import prompt_builder
+
+# Gemini AI integration (the client is created on first use, see llm_engine.get_client)
 from google.genai import types
 
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini client
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+# System instruction for Gemini
+SYSTEM_INSTRUCTION = """You are a specialized PSUR (Periodic Safety Update Report) generation assistant with expertise in Indian CDSCO pharmacovigilance standards and ICH E2C(R2) guidelines. 
+
+Generate comprehensive, professional PSUR reports that are compliant with regulatory requirements. Use proper medical terminology, maintain professional tone, and ensure all sections are thoroughly documented.
+
+Format the output in clean markdown with proper headers, tables, and formatting. Include all 12 ICH E2C(R2) sections as specified."""
+
+def get_generation_config() -> types.GenerateContentConfig:
+    """Get the Gemini generation config used for PSUR reports"""
+    
+    return types.GenerateContentConfig(
+        system_instruction=SYSTEM_INSTRUCTION,
+        max_output_tokens=4000,
+        temperature=0.3
+    )
+
+# ICH E2C(R2) sections generated one request each in section mode:
+# (title, data summary fields the section needs, what the section covers)
+PSUR_SECTIONS = [
+    ("Title Page", ['product', 'reporting_period'],
+     ["Product name, INN, dosage form, strength", "PSUR period covered", "Company information"]),
+    ("Executive Summary", ['product', 'reporting_period', 'authorizations', 'adverse_events', 'regulatory_actions', 'exposure', 'clinical_studies'],
+     ["Key safety findings", "Regulatory actions taken", "Overall benefit-risk assessment"]),
+    ("Introduction", ['product', 'authorizations'],
+     ["Product description and therapeutic indication", "Marketing authorization status"]),
+    ("Worldwide Marketing Authorization Status", ['authorizations'],
+     ["Countries where authorized", "Marketing statuses by region"]),
+    ("Update on Actions Taken for Safety Reasons", ['regulatory_actions'],
+     ["Regulatory actions during the reporting period", "Safety-related changes to product information"]),
+    ("Changes to Reference Safety Information", ['regulatory_actions', 'adverse_events'],
+     ["Updates to safety profile", "New contraindications or warnings"]),
+    ("Estimated Patient Exposure", ['exposure'],
+     ["Patient exposure data by region", "Estimation methodology"]),
+    ("Presentation of Individual Case Histories", ['adverse_events'],
+     ["Adverse event case summaries", "Serious adverse events analysis"]),
+    ("Studies", ['clinical_studies'],
+     ["Clinical studies relevant to safety", "Post-marketing surveillance studies"]),
+    ("Other Information", ['adverse_events', 'clinical_studies'],
+     ["Literature review", "Additional safety data"]),
+    ("Overall Safety Evaluation", ['adverse_events', 'exposure', 'regulatory_actions'],
+     ["Benefit-risk analysis", "Emerging safety signals"]),
+    ("Conclusion and Appendices", ['product', 'authorizations', 'adverse_events', 'regulatory_actions', 'exposure', 'clinical_studies'],
+     ["Summary of findings", "Supporting documentation"])
+]
+
+# Days before the end of the reporting period counted as "recent" in the summary
+RECENT_WINDOW_DAYS = 90
+
+# Age bands used in the adverse event summary (see backend.AGE_BAND_PRESETS)
+SUMMARY_AGE_BANDS = backend.AGE_BAND_PRESETS['summary']
+
+# Output limit of a single section in section mode
+SECTION_MAX_OUTPUT_TOKENS = 1500
+
+# Prompt of a single section in section mode; part of the section fingerprints,
+# so editing it regenerates stored sections
+SECTION_PROMPT_TEMPLATE = """
+Write section {section_number} "{title}" of a PSUR (Periodic Safety Update Report) for Product ID: {product_id} following Indian CDSCO pharmacovigilance standards and ICH E2C(R2) guidelines.
+
+**Data Summary:**
+```json
+{data_json}
+```
+
+**Section Content:**
+{topic_lines}
 
-def generate_psur_report(product_id: str, data: Dict[str, pd.DataFrame]) -> str:
+**Instructions:**
+- Start with the heading "## {section_number}. {title}" and write only this section
+- Use professional medical terminology
+- Include data tables where appropriate
+- Mark the section as "Data not available" if no data exists
+- Highlight adverse event trends if ≥3 events reported
+- Format dates as DD-MMM-YYYY
+- Ensure CDSCO compliance throughout
+"""
+
+# Set PHARMA_PULSE_SECTION_GENERATION=1 to generate sections concurrently by default
+SECTION_GENERATION = os.environ.get("PHARMA_PULSE_SECTION_GENERATION", "0") == "1"
+
+def get_section_generation_config() -> types.GenerateContentConfig:
+    """Get the Gemini generation config used for single PSUR sections"""
+    
+    return types.GenerateContentConfig(
+        system_instruction=SYSTEM_INSTRUCTION,
+        max_output_tokens=SECTION_MAX_OUTPUT_TOKENS,
+        temperature=0.3
+    )
+
+def generate_psur_report(product_id: str, data: Dict[str, pd.DataFrame], section_mode: bool = None,
+                         reporting_period: Tuple = None, return_info: bool = False) -> Union[str, Tuple[str, Dict[str, List[int]]]]:
     """
     Generate a comprehensive PSUR report for a specific product using AI
     
     Args:
         product_id: Product ID to generate report for
         data: Dictionary containing all validated data
+        section_mode: Generate the 12 sections as concurrent requests
+            (defaults to SECTION_GENERATION)
+        reporting_period: Optional (start_date, end_date) of the PSUR period,
+            both inclusive; dated datasets are limited to this period
+        return_info: Also return which sections were reused, regenerated and
+            taken from the fallback report (empty outside section mode)
     
     Returns:
-        Generated PSUR report as markdown string
+        Generated PSUR report as markdown string, or a tuple of the report
+        and the section info if return_info is set
     """
     
     try:
         logger.info(f"Starting PSUR report generation for product: {product_id}")
         
         # Extract product-specific data
-        product_data = extract_product_data(product_id, data)
+        product_data = extract_product_data(product_id, data, reporting_period)
         
         # Prepare data summary for AI
         data_summary = prepare_data_summary(product_data)
         
         # Generate report using AI
-        report_content = generate_ai_report(product_id, data_summary, product_data)
+        section_info = {}
+        if SECTION_GENERATION if section_mode is None else section_mode:
+            report_content, section_info = generate_section_report(product_id, data_summary, product_data)
+        else:
+            report_content = generate_ai_report(product_id, data_summary, product_data)
         
         logger.info(f"PSUR report generated successfully for product: {product_id}")
-        return report_content
+        return (report_content, section_info) if return_info else report_content
         
     except Exception as e:
         logger.error(f"Error generating PSUR report for {product_id}: {str(e)}")
         raise Exception(f"Failed to generate PSUR report: {str(e)}")
 
-def extract_product_data(product_id: str, data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
-    """Extract all data related to a specific product"""
+def stream_psur_report(product_id: str, data: Dict[str, pd.DataFrame], reporting_period: Tuple = None) -> Iterator[str]:
+    """
+    Generate a PSUR report for a specific product, yielding markdown as it is generated
+    
+    Args:
+        product_id: Product ID to generate report for
+        data: Dictionary containing all validated data
+        reporting_period: Optional (start_date, end_date) of the PSUR period, both inclusive
     
-    product_data = {}
+    Returns:
+        Iterator of markdown chunks that join to the full report
+    """
     
-    # Get product information
-    if 'Products.csv' in data:
-        product_info = data['Products.csv'][data['Products.csv']['ProductID'] == product_id]
-        product_data['Products'] = product_info
+    logger.info(f"Starting streaming PSUR report generation for product: {product_id}")
     
-    # Get related data for this product
-    related_files = {
-        'Authorizations': 'Authorizations.csv',
-        'AdverseEvents': 'AdverseEvents.csv', 
-        'RegulatoryActions': 'RegulatoryActions.csv',
-        'ExposureEstimates': 'ExposureEstimates.csv',
-        'ClinicalStudies': 'ClinicalStudies.csv'
-    }
+    product_data = extract_product_data(product_id, data, reporting_period)
+    data_summary = prepare_data_summary(product_data)
     
-    for key, file_name in related_files.items():
-        if file_name in data:
-            filtered_df = data[file_name][data[file_name]['ProductID'] == product_id]
-            product_data[key] = filtered_df
+    yield from stream_ai_report(product_id, data_summary, product_data)
+
+def extract_product_data(product_id: str, data: Dict[str, pd.DataFrame], reporting_period: Tuple = None) -> backend.ProductSlice:
+    """Extract all data related to a specific product (shared, cached product slice), limited to the reporting period"""
     
-    return product_data
+    period = backend.normalize_period(*reporting_period) if reporting_period else None
+    return backend.get_product_slice(product_id, data, period)
 
 def prepare_data_summary(product_data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
     """Prepare a summary of the data for AI processing"""
     
-    summary = {}
-    
     try:
         # Debug logging
         logger.info(f"Preparing data summary for product data keys: {list(product_data.keys())}")
         for key, df in product_data.items():
             logger.info(f"Data for {key}: {len(df) if df is not None else 0} rows")
+        
+        product_id = getattr(product_data, 'product_id', None) or find_product_id(product_data)
+        period = getattr(product_data, 'period', None)
+        date_index = getattr(product_data, 'date_index', None)
+        return summarize_products(product_data, [product_id], period, date_index)[product_id]
+        
+    except Exception as e:
+        logger.error(f"Error preparing data summary: {str(e)}")
+        raise
+
+def prepare_portfolio_summaries(data: Dict[str, pd.DataFrame], product_ids: List[str] = None,
+                                reporting_period: Tuple = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Prepare the data summary of every product in one pass over the datasets
+    
+    Args:
+        data: Ingested datasets keyed by file name (e.g. 'AdverseEvents.csv')
+        product_ids: Products to summarize (defaults to every product in Products.csv)
+        reporting_period: Optional (start_date, end_date) of the PSUR period, both inclusive
+    
+    Returns:
+        Data summaries by ProductID, as returned by prepare_data_summary
+    """
+    
+    try:
+        if product_ids is None:
+            product_ids = data['Products.csv']['ProductID'].dropna().unique().tolist()
+        product_ids = [str(product_id) for product_id in product_ids]
+        
+        period = backend.normalize_period(*reporting_period) if reporting_period else None
+        
+        # Datasets streamed to the partitioned store do not fit in memory as a
+        # whole, so products are summarized one slice at a time instead
+        if getattr(data, 'stored_datasets', None):
+            summaries = {product_id: prepare_data_summary(backend.get_product_slice(product_id, data, period))
+                         for product_id in product_ids}
+            logger.info(f"Prepared portfolio summaries for {len(summaries)} products from product slices")
+            return summaries
+        
+        frames = {backend.dataset_name(file_name): backend.get_period_rows(data, file_name, period) for file_name in data}
+        date_index = {backend.dataset_name(file_name): index for file_name, index in getattr(data, 'date_index', {}).items()}
+        summaries = summarize_products(frames, product_ids, period, date_index)
+        
+        logger.info(f"Prepared portfolio summaries for {len(summaries)} products")
+        return summaries
+        
+    except Exception as e:
+        logger.error(f"Error preparing portfolio summaries: {str(e)}")
+        raise
+
+def find_product_id(product_data: Dict[str, pd.DataFrame]) -> str:
+    """Find the ProductID of a single product's data"""
+    
+    for df in product_data.values():
+        if df is not None and not df.empty and 'ProductID' in df.columns:
+            return df['ProductID'].iloc[0]
+    return 'N/A'
+
+def summarize_products(frames: Dict[str, pd.DataFrame], product_ids: List[str],
+                       period: Tuple[pd.Timestamp, pd.Timestamp] = None,
+                       date_index: Dict[str, backend.DateIndex] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Build data summaries for many products with one grouped aggregation per dataset
+    
+    Each dataset is grouped by ProductID once, so the summary of any single
+    product is a dictionary lookup into the grouped results.
+    
+    Args:
+        frames: Datasets keyed by name without extension (e.g. 'AdverseEvents'),
+            already limited to the reporting period
+        product_ids: Products to summarize
+        period: (start, end) reporting period from backend.normalize_period;
+            "recent" counts cover the last RECENT_WINDOW_DAYS before its end
+        date_index: DateIndex of the unfiltered datasets by name (e.g.
+            data.date_index of IngestedDatasets); built from the frames if missing
+    
+    Returns:
+        Data summaries by ProductID
+    """
+    
+    # Events and actions in the last RECENT_WINDOW_DAYS of the period (or since
+    # then, without a period) are range counts on the date index
+    period_end = period[1] if period else pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    recent_cutoff = period_end - pd.Timedelta(days=RECENT_WINDOW_DAYS)
+    if period:
+        recent_range = (max(recent_cutoff, period[0]), period[1])
+    else:
+        recent_range = (recent_cutoff, None)
+    recent_window = {
+        'days': RECENT_WINDOW_DAYS,
+        'start': recent_range[0].strftime('%d-%b-%Y'),
+        'end': (period[1] - pd.Timedelta(days=1)).strftime('%d-%b-%Y') if period else 'present'
+    }
+    
+    def count_recent(name: str, df: pd.DataFrame, date_column: str) -> Dict[str, int]:
+        index = (date_index or {}).get(name)
+        if index is None:
+            df = backend.sort_by_product(df, f"{name}.csv")
+            index = backend.DateIndex.from_frame(df, date_column)
+        return index.counts(*recent_range)
+    
+    def get_frame(name: str):
+        df = frames.get(name)
+        if df is None or df.empty or 'ProductID' not in df.columns:
+            return None
+        return df
+    
+    # Product information (first row of each product)
+    products_df = get_frame('Products')
+    product_rows = {}
+    if products_df is not None:
+        first_rows = products_df.drop_duplicates('ProductID')
+        product_rows = dict(zip(first_rows['ProductID'], first_rows.to_dict('records')))
+    
+    # Authorizations
+    auth_df = get_frame('Authorizations')
+    if auth_df is not None:
+        auth_groups = auth_df.groupby('ProductID', sort=False)
+        auth_sizes = auth_groups.size()
+        auth_countries = auth_groups['Country'].unique()
+        auth_statuses = group_value_counts(auth_df, 'MarketingStatus')
+        auth_latest = auth_groups['AuthorizationDate'].max() if 'AuthorizationDate' in auth_df.columns else None
+    
+    # Adverse events
+    ae_df = get_frame('AdverseEvents')
+    if ae_df is not None:
+        ae_groups = ae_df.groupby('ProductID', sort=False)
+        ae_sizes = ae_groups.size()
+        ae_outcomes = group_value_counts(ae_df, 'Outcome')
+        ae_genders = group_value_counts(ae_df, 'Gender') if 'Gender' in ae_df.columns else {}
+        if 'PatientAge' in ae_df.columns:
+            ae_mean_age = ae_groups['PatientAge'].mean()
+            ae_age_ranges = group_age_distribution(ae_df)
+        if 'ReportedDate' in ae_df.columns:
+            ae_recent = count_recent('AdverseEvents', ae_df, 'ReportedDate')
+    
+    # Regulatory actions
+    reg_df = get_frame('RegulatoryActions')
+    if reg_df is not None:
+        reg_groups = reg_df.groupby('ProductID', sort=False)
+        reg_sizes = reg_groups.size()
+        reg_action_types = group_value_counts(reg_df, 'ActionTaken')
+        reg_regions = reg_groups['Region'].unique()
+        if 'ActionDate' in reg_df.columns:
+            reg_recent = count_recent('RegulatoryActions', reg_df, 'ActionDate')
+    
+    # Exposure estimates
+    exp_df = get_frame('ExposureEstimates')
+    if exp_df is not None:
+        exp_groups = exp_df.groupby('ProductID', sort=False)
+        exp_sizes = exp_groups.size()
+        exp_regions = exp_groups['Region'].unique()
+        exp_patients = exp_groups['EstimatedPatients'].sum() if 'EstimatedPatients' in exp_df.columns else None
+        exp_methods = group_value_counts(exp_df, 'EstimationMethod') if 'EstimationMethod' in exp_df.columns else {}
+    
+    # Clinical studies
+    studies_df = get_frame('ClinicalStudies')
+    if studies_df is not None:
+        studies_sizes = studies_df.groupby('ProductID', sort=False).size()
+        studies_statuses = group_value_counts(studies_df, 'Status')
+    
+    summaries = {}
+    for product_id in product_ids:
+        summary = {}
+        
         # Product information
-        if 'Products' in product_data and not product_data['Products'].empty:
-            product_info = product_data['Products'].iloc[0]
+        product_info = product_rows.get(product_id)
+        if product_info is not None:
             summary['product'] = {
                 'id': product_info.get('ProductID', 'N/A'),
                 'name': product_info.get('ProductName', 'N/A'),
@@ -96,97 +363,133 @@ def prepare_data_summary(product_data: Dict[str, pd.DataFrame]) -> Dict[str, Any
             summary['product'] = {'id': 'N/A', 'name': 'N/A', 'inn': 'N/A', 'dosage_form': 'N/A', 'strength': 'N/A'}
         
         # Authorization summary
-        if 'Authorizations' in product_data and not product_data['Authorizations'].empty:
-            auth_df = product_data['Authorizations']
+        if auth_df is not None and product_id in auth_sizes.index:
+            countries = auth_countries[product_id].tolist()
             summary['authorizations'] = {
-                'total_countries': len(auth_df['Country'].unique()),
-                'countries': auth_df['Country'].unique().tolist(),
-                'marketing_statuses': auth_df['MarketingStatus'].value_counts().to_dict(),
-                'latest_authorization': auth_df['AuthorizationDate'].max() if 'AuthorizationDate' in auth_df.columns else 'N/A'
+                'total_countries': len(countries),
+                'countries': countries,
+                'marketing_statuses': auth_statuses.get(product_id, {}),
+                'latest_authorization': auth_latest[product_id] if auth_latest is not None else 'N/A'
             }
         else:
             summary['authorizations'] = {'total_countries': 0, 'countries': [], 'marketing_statuses': {}, 'latest_authorization': 'N/A'}
         
         # Adverse events summary
-        if 'AdverseEvents' in product_data and not product_data['AdverseEvents'].empty:
-            ae_df = product_data['AdverseEvents']
+        if ae_df is not None and product_id in ae_sizes.index:
             summary['adverse_events'] = {
-                'total_events': len(ae_df),
-                'outcomes': ae_df['Outcome'].value_counts().to_dict(),
+                'total_events': int(ae_sizes[product_id]),
+                'outcomes': ae_outcomes.get(product_id, {}),
                 'age_distribution': {
-                    'mean_age': ae_df['PatientAge'].mean() if 'PatientAge' in ae_df.columns else 0,
-                    'age_ranges': get_age_distribution(ae_df)
+                    'mean_age': ae_mean_age[product_id] if 'PatientAge' in ae_df.columns else 0,
+                    'age_ranges': ae_age_ranges[product_id] if 'PatientAge' in ae_df.columns else {}
                 },
-                'gender_distribution': ae_df['Gender'].value_counts().to_dict() if 'Gender' in ae_df.columns else {},
-                'recent_events': len(ae_df[ae_df['ReportedDate'] >= '2023-01-01']) if 'ReportedDate' in ae_df.columns else 0
+                'gender_distribution': ae_genders.get(product_id, {}),
+                'recent_events': ae_recent.get(product_id, 0) if 'ReportedDate' in ae_df.columns else 0
             }
         else:
             summary['adverse_events'] = {'total_events': 0, 'outcomes': {}, 'age_distribution': {}, 'gender_distribution': {}, 'recent_events': 0}
         
         # Regulatory actions summary
-        if 'RegulatoryActions' in product_data and not product_data['RegulatoryActions'].empty:
-            reg_df = product_data['RegulatoryActions']
+        if reg_df is not None and product_id in reg_sizes.index:
             summary['regulatory_actions'] = {
-                'total_actions': len(reg_df),
-                'action_types': reg_df['ActionTaken'].value_counts().to_dict(),
-                'regions': reg_df['Region'].unique().tolist(),
-                'recent_actions': len(reg_df[reg_df['ActionDate'] >= '2023-01-01']) if 'ActionDate' in reg_df.columns else 0
+                'total_actions': int(reg_sizes[product_id]),
+                'action_types': reg_action_types.get(product_id, {}),
+                'regions': reg_regions[product_id].tolist(),
+                'recent_actions': reg_recent.get(product_id, 0) if 'ActionDate' in reg_df.columns else 0
             }
         else:
             summary['regulatory_actions'] = {'total_actions': 0, 'action_types': {}, 'regions': [], 'recent_actions': 0}
         
         # Exposure estimates summary
-        if 'ExposureEstimates' in product_data and not product_data['ExposureEstimates'].empty:
-            exp_df = product_data['ExposureEstimates']
+        if exp_df is not None and product_id in exp_sizes.index:
             summary['exposure'] = {
-                'total_estimated_patients': exp_df['EstimatedPatients'].sum() if 'EstimatedPatients' in exp_df.columns else 0,
-                'regions': exp_df['Region'].unique().tolist(),
-                'estimation_methods': exp_df['EstimationMethod'].value_counts().to_dict() if 'EstimationMethod' in exp_df.columns else {}
+                'total_estimated_patients': int(exp_patients[product_id]) if exp_patients is not None else 0,
+                'regions': exp_regions[product_id].tolist(),
+                'estimation_methods': exp_methods.get(product_id, {})
             }
         else:
             summary['exposure'] = {'total_estimated_patients': 0, 'regions': [], 'estimation_methods': {}}
         
         # Clinical studies summary
-        if 'ClinicalStudies' in product_data and not product_data['ClinicalStudies'].empty:
-            studies_df = product_data['ClinicalStudies']
+        if studies_df is not None and product_id in studies_sizes.index:
+            statuses = studies_statuses.get(product_id, {})
             summary['clinical_studies'] = {
-                'total_studies': len(studies_df),
-                'study_statuses': studies_df['Status'].value_counts().to_dict(),
-                'completed_studies': len(studies_df[studies_df['Status'] == 'Completed']) if 'Status' in studies_df.columns else 0
+                'total_studies': int(studies_sizes[product_id]),
+                'study_statuses': statuses,
+                'completed_studies': statuses.get('Completed', 0)
             }
         else:
             summary['clinical_studies'] = {'total_studies': 0, 'study_statuses': {}, 'completed_studies': 0}
         
-    except Exception as e:
-        logger.error(f"Error preparing data summary: {str(e)}")
-        raise
+        # Reporting period covered by the dated datasets
+        if period:
+            summary['reporting_period'] = {
+                'start': period[0].strftime('%d-%b-%Y'),
+                'end': (period[1] - pd.Timedelta(days=1)).strftime('%d-%b-%Y')
+            }
+        
+        # Dates covered by recent_events and recent_actions
+        summary['recent_window'] = recent_window
+        
+        # Fingerprint of the inputs of each section, used for incremental regeneration
+        summary['section_fingerprints'] = get_section_fingerprints(summary)
+        
+        summaries[product_id] = summary
     
-    return summary
+    return summaries
 
-def get_age_distribution(ae_df: pd.DataFrame) -> Dict[str, int]:
-    """Get age distribution for adverse events"""
+def group_value_counts(df: pd.DataFrame, column: str) -> Dict[str, Dict[str, int]]:
+    """Count the values of a column per ProductID, most frequent first"""
     
-    if 'PatientAge' not in ae_df.columns:
-        return {}
+    counts = df.groupby(['ProductID', column], observed=True, sort=False).size()
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
     
-    age_ranges = {
-        '0-17': 0,
-        '18-64': 0,
-        '65+': 0,
-        'Unknown': 0
+    result = {}
+    for (product_id, value), count in counts.items():
+        result.setdefault(product_id, {})[value] = int(count)
+    return result
+
+def group_age_distribution(ae_df: pd.DataFrame, bands: List[Tuple[str, float]] = None) -> Dict[str, Dict[str, int]]:
+    """Get the adverse event age distribution of every ProductID"""
+    
+    bands = bands or SUMMARY_AGE_BANDS
+    band_count = len(bands) + 1
+    
+    product_codes, product_ids = pd.factorize(ae_df['ProductID'])
+    band_index = backend.age_band_index(ae_df['PatientAge'], bands)
+    
+    # One bincount over (product, band) pairs; rows without a ProductID are skipped
+    has_product = product_codes >= 0
+    counts = np.bincount(product_codes[has_product] * band_count + band_index[has_product],
+                         minlength=len(product_ids) * band_count).reshape(len(product_ids), band_count)
+    
+    labels = [label for label, _ in bands] + ['Unknown']
+    return {
+        product_id: {label: int(count) for label, count in zip(labels, row)}
+        for product_id, row in zip(product_ids, counts)
     }
+
+def get_section_fingerprints(data_summary: Dict[str, Any]) -> Dict[int, str]:
+    """Fingerprint the summary fields, prompt template and generation settings behind each PSUR section"""
     
-    for age in ae_df['PatientAge'].dropna():
-        if age < 18:
-            age_ranges['0-17'] += 1
-        elif age <= 64:
-            age_ranges['18-64'] += 1
-        else:
-            age_ranges['65+'] += 1
+    settings = [llm_engine.DEFAULT_MODEL, llm_engine.serialize_config(get_section_generation_config()),
+                SECTION_PROMPT_TEMPLATE, prompt_builder.PROMPT_TOKEN_BUDGET, prompt_builder.PROMPT_TOP_K]
+    fingerprints = {}
+    
+    for number, (title, fields, topics) in enumerate(PSUR_SECTIONS, start=1):
+        section_inputs = [settings, title, topics, {field: data_summary.get(field, {}) for field in fields}]
+        payload = json.dumps(section_inputs, sort_keys=True, default=str)
+        fingerprints[number] = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    return fingerprints
+
+def get_age_distribution(ae_df: pd.DataFrame, bands: List[Tuple[str, float]] = None) -> Dict[str, int]:
+    """Get age distribution for adverse events (defaults to SUMMARY_AGE_BANDS)"""
     
-    age_ranges['Unknown'] = ae_df['PatientAge'].isna().sum()
+    if 'PatientAge' not in ae_df.columns:
+        return {}
     
-    return age_ranges
+    return backend.count_age_bands(ae_df['PatientAge'], bands or SUMMARY_AGE_BANDS)
 
 def generate_ai_report(product_id: str, data_summary: Dict[str, Any], product_data: Dict[str, pd.DataFrame]) -> str:
     """Generate the actual PSUR report using Gemini AI"""
@@ -195,25 +498,24 @@ def generate_ai_report(product_id: str, data_summary: Dict[str, Any], product_da
         # Prepare the prompt for AI
         prompt = create_psur_prompt(product_id, data_summary, product_data)
         
-        # System instruction for Gemini
-        system_instruction = """You are a specialized PSUR (Periodic Safety Update Report) generation assistant with expertise in Indian CDSCO pharmacovigilance standards and ICH E2C(R2) guidelines. 
-
-Generate comprehensive, professional PSUR reports that are compliant with regulatory requirements. Use proper medical terminology, maintain professional tone, and ensure all sections are thoroughly documented.
-
-Format the output in clean markdown with proper headers, tables, and formatting. Include all 12 ICH E2C(R2) sections as specified."""
+        config = get_generation_config()
         
-        # Call Gemini API
-        response = gemini_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                max_output_tokens=4000,
-                temperature=0.3
-            )
-        )
+        # Return the cached response when the prompt and config are unchanged
+        cache = llm_cache.response_cache
+        cache_key = llm_cache.make_cache_key(llm_engine.DEFAULT_MODEL, prompt, config) if cache else None
+        report_content = cache.get(cache_key) if cache_key else None
         
-        report_content = response.text
+        if report_content is None:
+            # Call Gemini API
+            response = llm_engine.get_client().models.generate_content(
+                model=llm_engine.DEFAULT_MODEL,
+                contents=prompt,
+                config=config
+            )
+            
+            report_content = response.text
+            if cache_key:
+                cache.put(cache_key, report_content)
         
         # Post-process the report
         final_report = post_process_report(report_content or "", data_summary)
@@ -226,11 +528,211 @@ Format the output in clean markdown with proper headers, tables, and formatting.
         logger.info("Gemini API error, using enhanced fallback report with actual data")
         return generate_enhanced_fallback_report(product_id, data_summary, product_data)
 
+def stream_ai_report(product_id: str, data_summary: Dict[str, Any], product_data: Dict[str, pd.DataFrame]) -> Iterator[str]:
+    """
+    Stream the PSUR report from Gemini as post-processed markdown chunks
+    
+    The report header is yielded with the first generated text and the
+    footer after the last, so the joined chunks equal post_process_report
+    applied to the full response. If the request fails before any text
+    arrives, the enhanced fallback report is yielded instead.
+    """
+    
+    prompt = create_psur_prompt(product_id, data_summary, product_data)
+    config = get_generation_config()
+    
+    cache = llm_cache.response_cache
+    cache_key = llm_cache.make_cache_key(llm_engine.DEFAULT_MODEL, prompt, config) if cache else None
+    cached = cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        yield post_process_report(cached, data_summary)
+        return
+    
+    chunks = []
+    try:
+        for chunk in llm_engine.get_client().models.generate_content_stream(
+            model=llm_engine.DEFAULT_MODEL,
+            contents=prompt,
+            config=config
+        ):
+            text = chunk.text
+            if not text:
+                continue
+            if not chunks:
+                yield get_report_header(data_summary)
+            chunks.append(text)
+            yield text
+        
+    except Exception as e:
+        logger.error(f"Error streaming from Gemini API: {str(e)}")
+        if not chunks:
+            logger.info("Gemini API error, using enhanced fallback report with actual data")
+            yield generate_enhanced_fallback_report(product_id, data_summary, product_data)
+            return
+        
+        yield f"\n\n*Report generation was interrupted: {str(e)}*"
+        yield get_report_footer()
+        return
+    
+    if not chunks:
+        yield get_report_header(data_summary)
+    elif cache_key:
+        cache.put(cache_key, ''.join(chunks))
+    
+    yield get_report_footer()
+
+def generate_ai_reports(jobs: Dict[str, Tuple[Dict[str, Any], Dict[str, pd.DataFrame]]],
+                        on_report: Callable[[str, str], None] = None,
+                        max_concurrency: int = llm_engine.MAX_CONCURRENCY, client=None) -> Dict[str, str]:
+    """
+    Generate PSUR reports for many products with concurrent Gemini calls
+    
+    Args:
+        jobs: (data_summary, product_data) by ProductID
+        on_report: Called as (product_id, report_content) as each report finishes
+        max_concurrency: Gemini requests kept in flight at once
+        client: LLM client to use (defaults to llm_engine.get_client())
+    
+    Returns:
+        Generated PSUR reports by ProductID
+    """
+    
+    engine = llm_engine.GenerationEngine(client or llm_engine.get_client(), max_concurrency=max_concurrency,
+                                         cache=llm_cache.response_cache)
+    config = get_generation_config()
+    
+    requests = {
+        product_id: {'contents': create_psur_prompt(product_id, data_summary, product_data), 'config': config}
+        for product_id, (data_summary, product_data) in jobs.items()
+    }
+    
+    reports = {}
+    
+    def finish_report(product_id: str, result: Any):
+        data_summary, product_data = jobs[product_id]
+        
+        if isinstance(result, Exception):
+            logger.info(f"Gemini API error for {product_id}, using enhanced fallback report with actual data")
+            report_content = generate_enhanced_fallback_report(product_id, data_summary, product_data)
+        else:
+            report_content = post_process_report(result, data_summary)
+        
+        reports[product_id] = report_content
+        if on_report:
+            on_report(product_id, report_content)
+    
+    engine.run(requests, on_result=finish_report)
+    return reports
+
+def generate_section_report(product_id: str, data_summary: Dict[str, Any], product_data: Dict[str, pd.DataFrame],
+                            max_concurrency: int = len(PSUR_SECTIONS), client=None) -> Tuple[str, Dict[str, List[int]]]:
+    """
+    Generate a PSUR report with one concurrent Gemini request per ICH E2C(R2) section
+    
+    Sections are stored per product with the fingerprint of their inputs,
+    and only sections whose fingerprint changed since the last generation
+    are re-prompted; the others are reused. Sections that still fail after
+    retries are taken from the enhanced fallback report and are not stored.
+    
+    Args:
+        product_id: Product ID to generate report for
+        data_summary: Data summary from prepare_data_summary
+        product_data: Product data slice
+        max_concurrency: Section requests kept in flight at once
+        client: LLM client to use (defaults to llm_engine.get_client())
+    
+    Returns:
+        Tuple of the generated PSUR report as markdown string and the
+        'reused', 'regenerated' and 'fallback' section numbers
+    """
+    
+    fingerprints = data_summary.get('section_fingerprints') or get_section_fingerprints(data_summary)
+    stored_sections = llm_cache.load_report_sections(product_id)
+    
+    sections = {}
+    for number, fingerprint in fingerprints.items():
+        stored = stored_sections.get(number)
+        if stored and stored.get('fingerprint') == fingerprint:
+            sections[number] = stored['content']
+    
+    reused = sorted(sections)
+    
+    # All sections of one report may start together
+    engine = llm_engine.GenerationEngine(client or llm_engine.get_client(), max_concurrency=max_concurrency,
+                                         burst=len(PSUR_SECTIONS), cache=llm_cache.response_cache)
+    config = get_section_generation_config()
+    
+    requests = {
+        number: {'contents': create_section_prompt(product_id, number, data_summary), 'config': config}
+        for number in fingerprints if number not in sections
+    }
+    
+    results = engine.run(requests) if requests else {}
+    
+    fallback_report = None
+    failed = []
+    for number, result in results.items():
+        if isinstance(result, Exception) or not result.strip():
+            if fallback_report is None:
+                fallback_report = generate_enhanced_fallback_report(product_id, data_summary, product_data)
+            logger.info(f"Section {number} generation failed for {product_id}, using fallback section")
+            sections[number] = extract_report_section(fallback_report, number)
+            failed.append(number)
+        else:
+            sections[number] = result
+            stored_sections[number] = {'fingerprint': fingerprints[number], 'content': result}
+    
+    if results:
+        llm_cache.save_report_sections(product_id, stored_sections)
+    
+    section_info = {
+        'reused': reused,
+        'regenerated': sorted(number for number in results if number not in failed),
+        'fallback': sorted(failed)
+    }
+    
+    logger.info(f"Sections for product {product_id}: reused {reused}, "
+                f"regenerated {section_info['regenerated']}, fallback {section_info['fallback']}")
+    
+    return post_process_report(sections, data_summary), section_info
+
+def create_section_prompt(product_id: str, section_number: int, data_summary: Dict[str, Any]) -> str:
+    """Create a focused prompt for one PSUR section with only the summary fields it needs"""
+    
+    title, fields, topics = PSUR_SECTIONS[section_number - 1]
+    data_json, _ = prompt_builder.build_prompt_data(data_summary, fields, label=f"product {product_id} section {section_number}")
+    topic_lines = '\n'.join(f"- {topic}" for topic in topics)
+    
+    return SECTION_PROMPT_TEMPLATE.format(section_number=section_number, title=title, product_id=product_id,
+                                          data_json=data_json, topic_lines=topic_lines)
+
+def extract_report_section(report_content: str, section_number: int) -> str:
+    """Extract a numbered "## N. Title" section from a full report"""
+    
+    match = re.search(rf'^## {section_number}\. .*?(?=^## |^---|\Z)', report_content, re.MULTILINE | re.DOTALL)
+    if match:
+        return match.group(0).strip()
+    
+    title = PSUR_SECTIONS[section_number - 1][0]
+    return f"## {section_number}. {title}\n\nData not available."
+
+def assemble_sections(sections: Dict[int, str]) -> str:
+    """Join generated sections in ICH E2C(R2) order, adding missing section headings"""
+    
+    parts = []
+    for number in sorted(sections):
+        content = sections[number].strip()
+        if not content.startswith('## '):
+            content = f"## {number}. {PSUR_SECTIONS[number - 1][0]}\n\n{content}"
+        parts.append(content)
+    
+    return '\n\n'.join(parts)
+
 def create_psur_prompt(product_id: str, data_summary: Dict[str, Any], product_data: Dict[str, pd.DataFrame]) -> str:
     """Create a detailed prompt for AI-powered PSUR generation"""
     
-    # Convert data summary to JSON for better AI processing
-    data_json = json.dumps(data_summary, indent=2, default=str)
+    # Convert data summary to compact JSON within the prompt token budget
+    data_json, _ = prompt_builder.build_prompt_data(data_summary, label=f"product {product_id}")
     
     prompt = f"""
 Generate a comprehensive PSUR (Periodic Safety Update Report) for Product ID: {product_id} following Indian CDSCO pharmacovigilance standards and ICH E2C(R2) guidelines.
@@ -306,19 +808,33 @@ Generate the complete PSUR report in markdown format with proper headers and pro
     
     return prompt
 
-def post_process_report(report_content: str, data_summary: Dict[str, Any]) -> str:
-    """Post-process the generated report for consistency and formatting"""
+def post_process_report(report_content: Union[str, Dict[int, str]], data_summary: Dict[str, Any]) -> str:
+    """Post-process the generated report (or its sections by number) for consistency and formatting"""
     
     try:
-        # Add timestamp
-        timestamp = datetime.now().strftime("%d-%b-%Y")
+        # Reassemble section-mode output in order
+        if isinstance(report_content, dict):
+            report_content = assemble_sections(report_content)
         
-        # Add header with product information
-        product_info = data_summary.get('product', {})
-        product_name = product_info.get('name', 'Unknown Product')
-        product_id = product_info.get('id', 'Unknown ID')
+        # Add header, combine with report content and add footer
+        final_report = get_report_header(data_summary) + report_content + get_report_footer()
+        
+        return final_report
         
-        header = f"""
+    except Exception as e:
+        logger.error(f"Error post-processing report: {str(e)}")
+        return report_content
+
+def get_report_header(data_summary: Dict[str, Any]) -> str:
+    """Get the report header with product information and generation date"""
+    
+    timestamp = datetime.now().strftime("%d-%b-%Y")
+    
+    product_info = data_summary.get('product', {})
+    product_name = product_info.get('name', 'Unknown Product')
+    product_id = product_info.get('id', 'Unknown ID')
+    
+    return f"""
 # PSUR Report - {product_name} (ID: {product_id})
 **Report Generated:** {timestamp}
 **Compliance:** Indian CDSCO Standards & ICH E2C(R2)
@@ -326,12 +842,13 @@ def post_process_report(report_content: str, data_summary: Dict[str, Any]) -> st
 ---
 
 """
-        
-        # Combine header with report content
-        final_report = header + report_content
-        
-        # Add footer
-        footer = f"""
+
+def get_report_footer() -> str:
+    """Get the report footer with generation information"""
+    
+    timestamp = datetime.now().strftime("%d-%b-%Y")
+    
+    return f"""
 
 ---
 
@@ -343,14 +860,14 @@ def post_process_report(report_content: str, data_summary: Dict[str, Any]) -> st
 
 *This report has been automatically generated based on the provided data and should be reviewed by qualified pharmacovigilance professionals before submission.*
 """
-        
-        final_report += footer
-        
-        return final_report
-        
-    except Exception as e:
-        logger.error(f"Error post-processing report: {str(e)}")
-        return report_content
+
+# Generation info lines identifying reports built without the model
+FALLBACK_MARKERS = ("Pharma Pulse System (Enhanced Data Mode)", "Pharma Pulse System (Fallback Mode)")
+
+def is_fallback_report(report_content: str) -> bool:
+    """Check whether a report was built by a fallback generator instead of the model"""
+    
+    return any(marker in report_content for marker in FALLBACK_MARKERS)
 
 def generate_fallback_report(product_id: str, data_summary: Dict[str, Any], product_data: Dict[str, pd.DataFrame]) -> str:
     """Generate a basic template-based report if AI fails"""
@@ -462,6 +979,13 @@ def generate_enhanced_fallback_report(product_id: str, data_summary: Dict[str, A
         studies_data = data_summary.get('clinical_studies', {})
         reg_actions_data = data_summary.get('regulatory_actions', {})
         
+        reporting_period = data_summary.get('reporting_period')
+        psur_period = (f"{reporting_period['start']} to {reporting_period['end']}" if reporting_period
+                       else "Not specified (all available data)")
+        recent_window = data_summary.get('recent_window')
+        recent_label = (f"last {recent_window['days']} days, {recent_window['start']} to {recent_window['end']}"
+                        if recent_window else f"last {RECENT_WINDOW_DAYS} days")
+        
         enhanced_report = f"""
 # PSUR Report - {product_name} (ID: {product_id})
 **Report Generated:** {timestamp}
@@ -487,7 +1011,7 @@ This PSUR report has been generated for **{product_name}** (Product ID: {product
 **INN:** {product_info.get('inn', 'N/A')}
 **Dosage Form:** {product_info.get('dosage_form', 'N/A')}
 **Strength:** {product_info.get('strength', 'N/A')}
-**PSUR Period:** {timestamp}
+**PSUR Period:** {psur_period}
 **Reporting Company:** Pharma Pulse System
 
 ## 2. Executive Summary
@@ -633,8 +1157,8 @@ Based on the adverse events data, {"no significant safety signals were identifie
 
 ## 10. Other Information
 
-**Recent Events (2023+):** {ae_data.get('recent_events', 0)} adverse events
-**Recent Actions (2023+):** {reg_actions_data.get('recent_actions', 0)} regulatory actions
+**Recent Events ({recent_label}):** {ae_data.get('recent_events', 0)} adverse events
+**Recent Actions ({recent_label}):** {reg_actions_data.get('recent_actions', 0)} regulatory actions
 
 Additional safety information from literature review and post-marketing surveillance would be included in a complete assessment.
 
@@ -0,0 +1,90 @@
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Dict, Any, List
+
+import llm_engine
+from llm_engine import StubAPIError, StubResponse
+
+class StubGeminiClient:
+    """
+    Offline stand-in for genai.Client that simulates latency and throttling
+
+    Requests beyond max_in_flight concurrent calls are rejected with 429,
+    the exceptions in failures are raised by the next calls in order, and
+    error_rate of the remaining calls fail with 503.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.05, max_in_flight: int = None,
+                 error_rate: float = 0.0, failures: List[Exception] = None, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_in_flight = max_in_flight
+        self.error_rate = error_rate
+        self.failures = list(failures or [])
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.succeeded = 0
+        self.aio = SimpleNamespace(models=self)
+
+    async def generate_content(self, model: str, contents: str, config: Any = None) -> StubResponse:
+        self.calls += 1
+
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            self.throttled += 1
+            raise StubAPIError(429, "RESOURCE_EXHAUSTED")
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+            if self.failures:
+                raise self.failures.pop(0)
+            if self.random.random() < self.error_rate:
+                raise StubAPIError(503, "UNAVAILABLE")
+            self.succeeded += 1
+            return StubResponse(f"# Stub report\n\nGenerated by {model} for a {len(contents)} character prompt.")
+        finally:
+            self.in_flight -= 1
+
+def measure_throughput(concurrency_levels: List[int], request_count: int = 40, latency: float = 0.2,
+                       max_in_flight: int = None) -> List[Dict[str, Any]]:
+    """
+    Measure engine throughput against StubGeminiClient at several concurrency levels
+
+    Args:
+        concurrency_levels: Values of max_concurrency to try
+        request_count: Requests per run
+        latency: Simulated response latency in seconds
+        max_in_flight: Simulated server concurrency limit (429 beyond it)
+
+    Returns:
+        One result per level with elapsed time, successful requests per
+        second, failed requests and throttled calls
+    """
+
+    results = []
+    for level in concurrency_levels:
+        client = StubGeminiClient(latency=latency, max_in_flight=max_in_flight, seed=level)
+        engine = llm_engine.GenerationEngine(client, max_concurrency=level, requests_per_minute=60_000, burst=level,
+                                             backoff_base=latency / 4, backoff_max=latency * 4)
+        requests = {str(i): {'contents': f"prompt {i}"} for i in range(request_count)}
+
+        started = time.perf_counter()
+        outcome = engine.run(requests)
+        elapsed = time.perf_counter() - started
+
+        failed = sum(1 for result in outcome.values() if isinstance(result, Exception))
+        results.append({
+            'concurrency': level,
+            'elapsed_seconds': round(elapsed, 3),
+            'requests_per_second': round((request_count - failed) / elapsed, 2),
+            'failed': failed,
+            'throttled': client.throttled
+        })
+
+    return results
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+import backend
+import report_generator
+
+def reference_counts(ages, bands) -> dict:
+    """Age band counts with a plain Python loop over half-open [lower, next lower) bands"""
+
+    counts = {label: 0 for label, _ in bands}
+    counts['Unknown'] = 0
+    for age in ages:
+        if pd.isna(age):
+            counts['Unknown'] += 1
+            continue
+        label = bands[0][0]
+        for band_label, lower in bands:
+            if age >= lower:
+                label = band_label
+        counts[label] += 1
+    return counts
+
+def test_summary_bands_are_half_open():
+    ages = [0, 17.9, 18, 64.9, 65, 100, np.nan]
+
+    assert backend.count_age_bands(ages) == {'0-17': 2, '18-64': 2, '65+': 2, 'Unknown': 1}
+
+def test_ich_band_boundaries():
+    ages = [0.01, 0.1, 1.99, 2, 11.9, 12, 17, 18, 64, 65, 84.9, 85]
+
+    counts = backend.count_age_bands(ages, backend.AGE_BAND_PRESETS['ich'], include_unknown=False)
+
+    assert counts == {'0-27d': 1, '28d-23m': 2, '2-11': 2, '12-17': 2, '18-64': 2, '65-84': 2, '85+': 1}
+
+def test_counts_match_a_python_loop():
+    rng = np.random.default_rng(0)
+    ages = pd.Series(rng.uniform(0, 100, 5000))
+    ages[rng.random(5000) < 0.05] = np.nan
+
+    for bands in backend.AGE_BAND_PRESETS.values():
+        assert backend.count_age_bands(ages, bands) == reference_counts(ages, bands)
+
+def test_grouped_distribution_matches_per_product_counts():
+    rng = np.random.default_rng(1)
+    events = pd.DataFrame({'ProductID': rng.choice(['101', '102', '103'], 2000),
+                           'PatientAge': rng.integers(0, 95, 2000).astype('float64')})
+    events.loc[::17, 'PatientAge'] = np.nan
+
+    grouped = report_generator.group_age_distribution(events)
+
+    for product_id, rows in events.groupby('ProductID'):
+        assert grouped[product_id] == backend.count_age_bands(rows['PatientAge'], report_generator.SUMMARY_AGE_BANDS)
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import batch_generator
+import llm_cache
+import llm_engine
+from llm_engine import StubAPIError
+from llm_stubs import StubGeminiClient
+
+PRODUCT_IDS = ['101', '102', '103']
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    monkeypatch.setattr(llm_cache, 'response_cache', None)
+
+def build_data() -> dict:
+    return {
+        'Products.csv': pd.DataFrame({'ProductID': PRODUCT_IDS, 'ProductName': ['A', 'B', 'C'], 'INN': ['a', 'b', 'c'],
+                                      'DosageForm': ['Tablet'] * 3, 'Strength': ['5mg'] * 3}),
+        'AdverseEvents.csv': pd.DataFrame({
+            'ProductID': PRODUCT_IDS * 2,
+            'ReportedDate': pd.to_datetime(['2024-01-15'] * 6),
+            'PatientAge': [40.0] * 6,
+            'Gender': ['Female'] * 6,
+            'Outcome': ['Recovered'] * 6
+        })
+    }
+
+def run(monkeypatch, tmp_path, client, **kwargs):
+    monkeypatch.setattr(llm_engine, 'llm_client', client)
+    progress = []
+    manifest = batch_generator.run_batch(build_data(), output_dir=str(tmp_path), workers=1,
+                                         progress_callback=lambda *args: progress.append(args), **kwargs)
+    return manifest, progress
+
+def test_fallback_reports_are_not_completed(monkeypatch, tmp_path):
+    client = StubGeminiClient(latency=0.0, jitter=0.0, failures=[StubAPIError(400, "INVALID_ARGUMENT")])
+
+    manifest, _ = run(monkeypatch, tmp_path, client, formats=['docx'], generation_workers=1)
+
+    statuses = sorted(entry['status'] for entry in manifest['reports'])
+    assert statuses == ['completed', 'completed', 'fallback']
+    assert manifest['completed'] == 2
+    assert manifest['fallback'] == 1
+    assert manifest['failed'] == 1
+
+def test_progress_is_reported_as_reports_are_generated(monkeypatch, tmp_path):
+    manifest, progress = run(monkeypatch, tmp_path, StubGeminiClient(latency=0.0, jitter=0.0), formats=['docx'])
+
+    generated = [args for args in progress if args[3] in batch_generator.GENERATION_STATUSES]
+    finished = [args for args in progress if args[3] not in batch_generator.GENERATION_STATUSES]
+    assert [count for count, *_ in generated] == [1, 2, 3]
+    assert [count for count, *_ in finished] == [1, 2, 3]
+    assert all(status == 'completed' for *_, status in finished)
+    assert manifest['completed'] == 3
+
+def test_failed_submission_does_not_abort_the_batch(monkeypatch, tmp_path):
+    class FailingExporters(dict):
+        def __getitem__(self, export_format):
+            if export_format == 'pdf':
+                raise RuntimeError("exporter unavailable")
+            return super().__getitem__(export_format)
+
+    monkeypatch.setattr(batch_generator, 'EXPORTERS', FailingExporters(batch_generator.EXPORTERS))
+
+    manifest, _ = run(monkeypatch, tmp_path, StubGeminiClient(latency=0.0, jitter=0.0), formats=['docx', 'pdf'])
+
+    assert all(entry['status'] == 'failed' for entry in manifest['reports'])
+    assert manifest['failed'] == 3
+
+def test_main_exits_non_zero_when_reports_fall_back(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch_generator, 'load_datasets_from_dir', lambda data_dir: build_data())
+    monkeypatch.setattr('utils.setup_logging', lambda: None)
+    monkeypatch.setattr(llm_engine, 'llm_client',
+                        StubGeminiClient(latency=0.0, jitter=0.0, failures=[StubAPIError(400, "INVALID_ARGUMENT")] * 3))
+
+    assert batch_generator.main(['--data-dir', str(tmp_path), '--output-dir', str(tmp_path), '--formats', 'docx']) != 0
@@ -0,0 +1,39 @@
+import io
+import threading
+
+import pandas as pd
+
+import backend
+import dataset_store
+
+def test_concurrent_saves_of_the_same_content_do_not_collide(tmp_path):
+    df = pd.DataFrame({'ProductID': ['101'] * 1000, 'Value': range(1000)})
+    errors = []
+
+    def save():
+        try:
+            dataset_store.save_cleaned_dataset('abc', df, {'valid': True, 'rows': len(df)}, store_dir=tmp_path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    loaded, report = dataset_store.load_cleaned_dataset('abc', store_dir=tmp_path)
+    assert not errors
+    assert loaded['Value'].tolist() == list(range(1000))
+    assert report == {'valid': True, 'rows': 1000}
+    assert sorted(path.name for path in (tmp_path / "cleaned").iterdir()) == ['abc.arrow', 'abc.json']
+
+def test_cleaning_version_is_part_of_the_cache_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'STORE_DIR', tmp_path)
+    upload = io.BytesIO(b"ProductID,ProductName,INN,DosageForm,Strength\n101,A,a,Tablet,1mg\n")
+
+    first = backend.ingest_file(upload, 'Products.csv')
+    monkeypatch.setattr(backend, 'CLEANING_VERSION', backend.CLEANING_VERSION + 1)
+    second = backend.ingest_file(upload, 'Products.csv')
+
+    assert first['content_hash'] != second['content_hash']
@@ -0,0 +1,162 @@
+import io
+import os
+import signal
+
+import docx
+import pytest
+
+import docx_pdf_exporter
+
+REPORT = """# PSUR Report
+
+## Summary
+
+Events were **reviewed** for the *period*.
+
+| Country | Status |
+|---|---|
+| DE | Approved |
+| FR | Pending |
+"""
+
+@pytest.fixture
+def shared_pool():
+    docx_pdf_exporter.export_pool = None
+    yield
+    if docx_pdf_exporter.export_pool is not None:
+        docx_pdf_exporter.export_pool.shutdown()
+        docx_pdf_exporter.export_pool = None
+
+def assert_exported(result):
+    for export_format in docx_pdf_exporter.EXPORT_FORMATS:
+        assert 'error' not in result['artifacts'][export_format]
+        assert result['artifacts'][export_format]['content']
+
+def test_export_recovers_from_a_dead_worker(shared_pool):
+    assert_exported(docx_pdf_exporter.export_report(REPORT, '101'))
+    pool = docx_pdf_exporter.export_pool
+
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+    # Formats of the broken pool are rendered in-process and the pool is dropped
+    assert_exported(docx_pdf_exporter.export_report(REPORT, '101'))
+    assert docx_pdf_exporter.export_pool is not pool
+
+    # The next export starts a fresh pool
+    assert_exported(docx_pdf_exporter.export_report(REPORT, '101'))
+    assert docx_pdf_exporter.export_pool is not None
+
+def test_renderers_accept_parsed_blocks(monkeypatch):
+    blocks = docx_pdf_exporter.parse_report(REPORT)
+
+    def parse_report(report_content):
+        raise AssertionError("renderer parsed the report again")
+
+    monkeypatch.setattr(docx_pdf_exporter, 'parse_report', parse_report)
+
+    pdf, _ = docx_pdf_exporter.render_export('pdf', blocks, '101')
+    docx, _ = docx_pdf_exporter.render_export('docx', blocks, '101')
+
+    assert pdf.startswith(b'%PDF')
+    assert docx.startswith(b'PK')
+
+def test_shared_pool_does_not_fork_the_app_process(shared_pool):
+    pool = docx_pdf_exporter.get_export_pool()
+
+    assert pool._mp_context.get_start_method() == docx_pdf_exporter.EXPORT_START_METHOD != 'fork'
+
+def docx_texts(content):
+    document = docx.Document(io.BytesIO(content))
+    return [paragraph.text for paragraph in document.paragraphs]
+
+def test_renderers_return_bytes_without_writing_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    docx_content = docx_pdf_exporter.render_docx(REPORT, '101')
+    pdf_content = docx_pdf_exporter.render_pdf(REPORT, '101')
+
+    assert docx_content.startswith(b'PK')
+    assert pdf_content.startswith(b'%PDF')
+    assert list(tmp_path.iterdir()) == []
+
+def test_renderers_save_a_copy_to_output_dir(tmp_path):
+    docx_content = docx_pdf_exporter.render_docx(REPORT, '101', output_dir=str(tmp_path / 'docx'))
+    pdf_content = docx_pdf_exporter.render_pdf(REPORT, '101', output_dir=str(tmp_path / 'pdf'))
+
+    [docx_file] = (tmp_path / 'docx').iterdir()
+    [pdf_file] = (tmp_path / 'pdf').iterdir()
+    assert docx_file.read_bytes() == docx_content
+    assert pdf_file.read_bytes() == pdf_content
+
+def test_generated_files_match_rendered_content(tmp_path):
+    docx_path = docx_pdf_exporter.generate_docx(REPORT, '101', output_dir=str(tmp_path))
+    pdf_path = docx_pdf_exporter.generate_pdf(REPORT, '101', output_dir=str(tmp_path))
+
+    assert docx_path.endswith('.docx') and pdf_path.endswith('.pdf')
+    with open(docx_path, 'rb') as f:
+        assert docx_texts(f.read()) == docx_texts(docx_pdf_exporter.render_docx(REPORT, '101'))
+    with open(pdf_path, 'rb') as f:
+        assert f.read().startswith(b'%PDF')
+
+def test_report_is_parsed_into_blocks_and_spans():
+    blocks = docx_pdf_exporter.parse_report(REPORT)
+
+    assert [kind for kind, _ in blocks] == ['title', 'blank', 'heading', 'blank', 'paragraph', 'blank', 'table', 'blank']
+    assert blocks[4][1] == (('Events were ', ''), ('reviewed', 'bold'), (' for the ', ''),
+                            ('period', 'italic'), ('.', ''))
+    # The separator row is dropped and cells keep their inline spans
+    assert blocks[6][1] == (((('Country', ''),), (('Status', ''),)),
+                            ((('DE', ''),), (('Approved', ''),)),
+                            ((('FR', ''),), (('Pending', ''),)))
+
+def test_parsed_report_is_shared_between_exports():
+    assert docx_pdf_exporter.parse_report(REPORT) is docx_pdf_exporter.parse_report(REPORT)
+
+def test_pdf_markup_escapes_span_text():
+    spans = docx_pdf_exporter.parse_inline("**R&D** uses `a<b`")
+
+    assert docx_pdf_exporter.spans_markup(spans) == \
+        '<b>R&amp;D</b> uses <font face="Courier">a&lt;b</font>'
+    assert docx_pdf_exporter.clean_markdown_text(" **R&D** uses `a<b` ") == "R&D uses a<b"
+
+def listing_rows(count):
+    header = ((('Case', ''),), (('Narrative', ''),))
+    body = [(((f"C{number}", ''),), ((f"Event {number}", ''),)) for number in range(count)]
+    return (header,) + tuple(body)
+
+def test_column_widths_fill_the_table_and_are_clamped():
+    texts = [['ID', 'Narrative'], ['1', 'x' * 500], ['2', 'short']]
+
+    widths = docx_pdf_exporter.compute_column_widths(texts, 400)
+
+    assert sum(widths) == pytest.approx(400)
+    min_chars, max_chars = docx_pdf_exporter.MIN_COLUMN_CHARS, docx_pdf_exporter.MAX_COLUMN_CHARS
+    assert widths == pytest.approx([400 * min_chars / (min_chars + max_chars),
+                                    400 * max_chars / (min_chars + max_chars)])
+
+def test_long_pdf_tables_are_chunked_with_repeated_headers(monkeypatch):
+    monkeypatch.setattr(docx_pdf_exporter, 'TABLE_CHUNK_ROWS', 4)
+
+    tables = docx_pdf_exporter.create_pdf_tables(listing_rows(10), docx_pdf_exporter.PDF_CONTENT_WIDTH)
+
+    assert [len(table._cellvalues) for table in tables] == [5, 5, 3]
+    for table in tables:
+        assert isinstance(table, docx_pdf_exporter.LongTable)
+        assert table.repeatRows == 1
+        assert table._cellvalues[0] == ['Case', 'Narrative']
+        assert table._colWidths == tables[0]._colWidths
+    assert tables[-1]._cellvalues[-1] == ['C9', 'Event 9']
+
+def test_docx_tables_repeat_the_header_row():
+    document = docx.Document()
+
+    docx_pdf_exporter.add_docx_table(document, listing_rows(25))
+
+    [table] = document.tables
+    assert len(table.rows) == 26
+    assert [cell.text for cell in table.rows[0].cells] == ['Case', 'Narrative']
+    assert [cell.text for cell in table.rows[25].cells] == ['C24', 'Event 24']
+    assert table.rows[0]._tr.trPr.find(docx_pdf_exporter.qn('w:tblHeader')) is not None
+    assert table.rows[1]._tr.trPr is None
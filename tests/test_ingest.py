@@ -0,0 +1,106 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+import backend
+
+AE_HEADER = "AEID,ProductID,ReportedDate,PatientAge,Gender,EventDescription,Outcome\n"
+
+def csv_upload(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode('utf-8'))
+
+def test_non_numeric_age_is_coerced_before_validation():
+    upload = csv_upload(AE_HEADER + "1,101,2023-01-01,unknown,M,Nausea,Recovered\n"
+                                    "2,101,2023-02-01, ,F,Headache,Recovered\n"
+                                    "3,101,2023-03-01,34,F,Rash,Recovered\n")
+
+    result = backend.ingest_file(upload, 'AdverseEvents.csv', use_cache=False)
+
+    assert result['valid'], result['errors']
+    ages = result['data']['PatientAge']
+    assert pd.api.types.is_numeric_dtype(ages)
+    assert ages.isna().sum() == 2
+    assert ages.max() == 34
+
+def test_non_numeric_patients_still_validated():
+    upload = csv_upload("ExposureID,ProductID,Region,TimePeriod,EstimatedPatients,EstimationMethod\n"
+                        "1,101,EU,2023,unknown,Sales\n"
+                        "2,101,EU,2023,-5,Sales\n")
+
+    result = backend.ingest_file(upload, 'ExposureEstimates.csv', use_cache=False)
+
+    assert not result['valid']
+    assert result['errors'] == ["Found 1 rows with negative patient estimates"]
+
+def test_stream_ingest_coerces_non_numeric_age(tmp_path):
+    upload = csv_upload(AE_HEADER + "1,101,2023-01-01,unknown,M,Nausea,Recovered\n"
+                                    "2,102,2023-02-01,150,F,Headache,Recovered\n")
+
+    result = backend.stream_ingest_file(upload, 'AdverseEvents.csv', chunksize=1, store_dir=tmp_path)
+
+    assert result['valid'], result['errors']
+    assert result['warnings'] == ["Found 1 rows with suspicious age values"]
+
+def test_large_files_are_streamed_and_read_per_product(tmp_path, monkeypatch):
+    import dataset_store
+
+    monkeypatch.setattr(dataset_store, 'STORE_DIR', tmp_path / "store")
+    products = tmp_path / "Products.csv"
+    products.write_text("ProductID,ProductName,INN,DosageForm,Strength\n101,A,a,Tablet,1mg\n102,B,b,Tablet,2mg\n")
+    events = tmp_path / "AdverseEvents.csv"
+    events.write_text(AE_HEADER + "1,102,2023-05-01,40,M,Nausea,Recovered\n"
+                                  "2,101,2023-03-01,50,F,Rash,Recovered\n"
+                                  "3,101,2022-01-01,60,F,Headache,Fatal\n")
+    files = {'Products.csv': str(products), 'AdverseEvents.csv': str(events)}
+
+    results = backend.ingest_all_files(files, stream_threshold=events.stat().st_size)
+    data = backend.process_validated_files(files, results)
+
+    assert 'AdverseEvents.csv' not in data
+    assert 'AdverseEvents.csv' in data.stored_datasets
+
+    period = backend.normalize_period('2023-01-01', '2023-12-31')
+    product_events = backend.get_product_slice('101', data, period)['AdverseEvents']
+    assert product_events['AEID'].tolist() == ['2']
+    assert backend.get_product_slice('101', data)['AdverseEvents']['AEID'].tolist() == ['3', '2']
+
+def test_reingest_keeps_earlier_stored_datasets_readable(tmp_path):
+    import dataset_store
+
+    first = backend.stream_ingest_file(csv_upload(AE_HEADER + "1,101,2023-01-01,40,M,Nausea,Recovered\n"),
+                                       'AdverseEvents.csv', store_dir=tmp_path)
+    second = backend.stream_ingest_file(csv_upload(AE_HEADER + "2,101,2023-02-01,50,F,Rash,Recovered\n"),
+                                        'AdverseEvents.csv', store_dir=tmp_path)
+
+    assert first['store_path'] != second['store_path']
+    assert backend.get_stored_product_rows(first['store_path'], 'AdverseEvents.csv', '101')['AEID'].tolist() == ['1']
+    assert backend.get_stored_product_rows(second['store_path'], 'AdverseEvents.csv', '101')['AEID'].tolist() == ['2']
+
+    assert dataset_store.cleanup_old_datasets(days_old=1, store_dir=tmp_path) == 0
+    assert dataset_store.cleanup_old_datasets(days_old=-1, store_dir=tmp_path) == 2
+
+def test_one_invalid_date_does_not_change_valid_dates():
+    upload = csv_upload(AE_HEADER + "1,101,2023-01-05,40,M,Nausea,Recovered\n"
+                                    "2,101,not a date,50,F,Rash,Recovered\n"
+                                    "3,101,2023-02-11,60,F,Rash,Recovered\n")
+
+    result = backend.ingest_file(upload, 'AdverseEvents.csv', use_cache=False)
+
+    dates = result['data'].set_index('AEID')['ReportedDate']
+    assert dates['1'] == pd.Timestamp('2023-01-05')
+    assert dates['3'] == pd.Timestamp('2023-02-11')
+    assert pd.isna(dates['2'])
+
+def test_date_index_keeps_out_of_range_dates_in_order():
+    upload = csv_upload(AE_HEADER + "1,101,2023-01-05,40,M,Nausea,Recovered\n"
+                                    "2,101,0023-01-05,50,F,Rash,Recovered\n"
+                                    "3,101,2023-03-01,60,F,Rash,Recovered\n")
+
+    result = backend.ingest_file(upload, 'AdverseEvents.csv', use_cache=False)
+    data = backend.IngestedDatasets({'AdverseEvents.csv': result['data']})
+    date_index = data.date_index['AdverseEvents.csv']
+
+    assert date_index.dates[0] == np.datetime64('0023-01-05')
+    assert date_index.count('101', *backend.normalize_period('2023-01-01', '2023-12-31')) == 2
+    assert date_index.count('101', *backend.normalize_period('1700-01-01', '1800-12-31')) == 0
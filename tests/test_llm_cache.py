@@ -0,0 +1,96 @@
+import os
+import time
+
+import llm_cache
+
+def cache_size(cache: llm_cache.ResponseCache) -> int:
+    return sum(path.stat().st_size for path in cache.cache_dir.glob('*.json'))
+
+def count_scans(cache: llm_cache.ResponseCache, monkeypatch) -> list:
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda: (scans.append(1), evict()))
+    return scans
+
+def test_cached_response_is_returned(tmp_path):
+    cache = llm_cache.ResponseCache(tmp_path)
+    key = llm_cache.make_cache_key("model", "prompt")
+
+    assert cache.get(key) is None
+    cache.put(key, "report")
+    assert cache.get(key) == "report"
+
+def test_writes_below_the_limit_do_not_scan_the_cache(tmp_path, monkeypatch):
+    cache = llm_cache.ResponseCache(tmp_path)
+    scans = count_scans(cache, monkeypatch)
+
+    for i in range(50):
+        cache.put(f"key{i}", f"response {i}")
+    cache.put("key0", "a longer replacement response")
+
+    assert len(scans) == 1
+    assert cache.size_bytes == cache_size(cache)
+
+def test_full_cache_evicts_least_recently_used_entries(tmp_path, monkeypatch):
+    cache = llm_cache.ResponseCache(tmp_path, max_bytes=2000)
+    scans = count_scans(cache, monkeypatch)
+
+    for i in range(40):
+        cache.put(f"key{i:02d}", "x" * 90)
+        path = cache.get_path(f"key{i:02d}")
+        os.utime(path, (time.time() - 1000 + i, path.stat().st_mtime))
+
+    assert cache_size(cache) <= 2000
+    assert cache.size_bytes == cache_size(cache)
+    assert cache.get("key00") is None
+    assert cache.get("key39") is not None
+
+    # Trimming below the limit leaves room, so not every write rescans
+    assert len(scans) < 20
+
+def test_expired_entries_are_removed(tmp_path):
+    cache = llm_cache.ResponseCache(tmp_path, ttl_seconds=60)
+    cache.put("new", "fresh response")
+    cache.put("old", "stale response")
+    path = cache.get_path("old")
+    os.utime(path, (time.time(), time.time() - 120))
+
+    assert cache.get("old") is None
+    assert not path.exists()
+    assert cache.get("new") == "fresh response"
+    assert cache.size_bytes == cache_size(cache)
+
+def test_periodic_scan_evicts_expired_entries(tmp_path):
+    cache = llm_cache.ResponseCache(tmp_path, ttl_seconds=60, eviction_interval=0)
+    cache.put("unused", "response")
+    os.utime(cache.get_path("unused"), (time.time() - 120, time.time() - 120))
+
+    cache.put("other", "response")
+
+    assert not cache.get_path("unused").exists()
+
+def test_lookups_and_eviction_agree_on_expiry(tmp_path):
+    cache = llm_cache.ResponseCache(tmp_path, ttl_seconds=60, eviction_interval=0)
+    cache.put("recently used", "response")
+    path = cache.get_path("recently used")
+    os.utime(path, (time.time() - 120, time.time() - 30))
+
+    # Written within the TTL: a scan keeps it even though it was last used long ago
+    cache.put("other", "response")
+    assert cache.get("recently used") == "response"
+
+    # Using it does not extend its life past the TTL
+    os.utime(path, (time.time(), time.time() - 120))
+    cache.put("another", "response")
+    assert not path.exists()
+
+def test_hits_keep_the_write_time(tmp_path):
+    cache = llm_cache.ResponseCache(tmp_path)
+    cache.put("key", "response")
+    path = cache.get_path("key")
+    os.utime(path, (time.time() - 100, time.time() - 50))
+
+    cache.get("key")
+
+    assert time.time() - path.stat().st_mtime >= 50
+    assert time.time() - path.stat().st_atime < 5
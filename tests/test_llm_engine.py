@@ -0,0 +1,84 @@
+import time
+import asyncio
+
+import llm_engine
+from llm_engine import StubAPIError
+from llm_stubs import StubGeminiClient, measure_throughput
+
+def create_engine(client: StubGeminiClient, **options) -> llm_engine.GenerationEngine:
+    settings = {'requests_per_minute': 60_000, 'burst': 16, 'backoff_base': 0.01, 'backoff_max': 0.05}
+    settings.update(options)
+    return llm_engine.GenerationEngine(client, **settings)
+
+def prompts(count: int):
+    return {str(i): {'contents': f"prompt {i}"} for i in range(count)}
+
+def test_requests_in_flight_are_bounded():
+    client = StubGeminiClient(latency=0.03, jitter=0.0)
+    results = create_engine(client, max_concurrency=3).run(prompts(12))
+
+    assert client.peak_in_flight == 3
+    assert all(isinstance(text, str) for text in results.values())
+
+def test_throughput_scales_with_concurrency():
+    serial, parallel = measure_throughput([1, 4], request_count=16, latency=0.05)
+
+    assert serial['failed'] == parallel['failed'] == 0
+    assert parallel['requests_per_second'] > 2.5 * serial['requests_per_second']
+
+def test_throttled_and_server_errors_are_retried():
+    client = StubGeminiClient(latency=0.0, jitter=0.0,
+                              failures=[StubAPIError(429, "RESOURCE_EXHAUSTED"), StubAPIError(503, "UNAVAILABLE")])
+    results = create_engine(client, max_retries=2).run(prompts(1))
+
+    assert isinstance(results['0'], str)
+    assert client.calls == 3
+
+def test_retries_are_limited():
+    client = StubGeminiClient(latency=0.0, jitter=0.0, failures=[StubAPIError(503, "UNAVAILABLE")] * 3)
+    results = create_engine(client, max_retries=2).run(prompts(1))
+
+    assert isinstance(results['0'], StubAPIError)
+    assert client.calls == 3
+
+def test_other_errors_are_not_retried():
+    client = StubGeminiClient(latency=0.0, jitter=0.0,
+                              failures=[StubAPIError(400, "INVALID_ARGUMENT"), ValueError("bad config")])
+    results = create_engine(client).run(prompts(2))
+
+    assert {type(result) for result in results.values()} == {StubAPIError, ValueError}
+    assert client.calls == 2
+
+def test_requests_time_out():
+    client = StubGeminiClient(latency=1.0, jitter=0.0)
+
+    started = time.perf_counter()
+    results = create_engine(client, timeout=0.05, max_retries=1).run(prompts(1))
+
+    assert isinstance(results['0'], asyncio.TimeoutError)
+    assert client.calls == 2
+    assert time.perf_counter() - started < 0.5
+
+def test_throttling_slows_the_whole_run():
+    client = StubGeminiClient(latency=0.03, jitter=0.01, max_in_flight=3, seed=0)
+    results = create_engine(client, max_concurrency=4).run(prompts(24))
+
+    assert not [result for result in results.values() if isinstance(result, Exception)]
+    assert client.succeeded == 24
+    assert client.throttled <= 10
+
+def test_throttled_runs_report_successful_throughput():
+    result, = measure_throughput([4], request_count=24, latency=0.05, max_in_flight=3)
+
+    assert result['failed'] == 0
+    assert result['requests_per_second'] > 0
+
+def test_paused_token_bucket_holds_every_request():
+    async def wait_after_pause() -> float:
+        bucket = llm_engine.TokenBucket(rate=1000, capacity=10)
+        bucket.pause(0.1)
+        started = time.monotonic()
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+        return time.monotonic() - started
+
+    assert asyncio.run(wait_after_pause()) >= 0.09
@@ -0,0 +1,27 @@
+import load_test
+import report_generator
+
+def test_fallback_reports_are_not_counted_as_throughput(monkeypatch):
+    def generate_psur_report(product_id, data, section_mode=False):
+        if product_id == '102':
+            return f"# Report\n\n{report_generator.FALLBACK_MARKERS[0]}"
+        return "# Report"
+
+    monkeypatch.setattr(report_generator, 'generate_psur_report', generate_psur_report)
+
+    result = load_test.run_load_test({}, ['101', '102', '102', '102'], report_count=8, concurrency=2)
+
+    assert result['successful_reports'] == 2
+    assert result['fallback_reports'] == 6
+    assert result['fallback_rate'] == 0.75
+    assert result['successful_reports_per_minute'] > 0
+    assert 'reports_per_minute' not in result
+
+def test_latency_is_none_when_every_report_falls_back(monkeypatch):
+    monkeypatch.setattr(report_generator, 'generate_psur_report',
+                        lambda product_id, data, section_mode=False: report_generator.FALLBACK_MARKERS[1])
+
+    result = load_test.run_load_test({}, ['101'], report_count=3, concurrency=1)
+
+    assert result['successful_reports_per_minute'] == 0
+    assert result['p50_latency_seconds'] is None
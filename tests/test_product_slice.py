@@ -0,0 +1,104 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend
+
+ROWS = 20_000
+
+def build_upload(rows: int = ROWS) -> io.BytesIO:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'AEID': np.arange(rows),
+        'ProductID': rng.integers(101, 111, rows),
+        'ReportedDate': (pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D')).strftime('%Y-%m-%d'),
+        'PatientAge': rng.integers(1, 90, rows),
+        'Gender': rng.choice(['M', 'F'], rows),
+        'EventDescription': rng.choice(['Nausea', 'Rash'], rows),
+        'Outcome': rng.choice(['Recovered', 'Fatal'], rows)
+    })
+    return io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+
+@pytest.fixture
+def data() -> backend.IngestedDatasets:
+    result = backend.ingest_file(build_upload(), 'AdverseEvents.csv', use_cache=False)
+    backend.product_slice_cache.clear()
+    yield backend.IngestedDatasets({'AdverseEvents.csv': result['data']})
+    backend.product_slice_cache.clear()
+
+def data_buffers(column: pd.Series) -> set:
+    """Addresses of the buffers holding the values of an Arrow-backed column"""
+
+    arrow = column.array.__arrow_array__()
+    return {chunk.buffers()[-1].address for chunk in getattr(arrow, 'chunks', [arrow])}
+
+def shares_memory(column: pd.Series, stored: pd.Series) -> bool:
+    """Check whether a column is a view of a stored column (numpy- or Arrow-backed)"""
+
+    if hasattr(column.array, '__arrow_array__'):
+        return bool(data_buffers(column) & data_buffers(stored))
+    return np.shares_memory(column.to_numpy(), stored.to_numpy())
+
+def test_product_id_is_canonical_text_after_ingest(data):
+    product_ids = data['AdverseEvents.csv']['ProductID']
+
+    assert pd.api.types.is_string_dtype(product_ids)
+    assert set(product_ids.unique()) == {str(product_id) for product_id in range(101, 111)}
+
+def test_repeated_lookups_allocate_no_new_columns(data):
+    stored = data['AdverseEvents.csv']
+    stored_product_ids = stored['ProductID']
+    version = data.version
+
+    for _ in range(3):
+        # Clear the slice cache so every lookup runs the extraction again
+        backend.product_slice_cache.clear()
+        product_events = backend.get_product_data('105', data)['AdverseEvents.csv']
+
+        assert data['AdverseEvents.csv'] is stored
+        assert shares_memory(data['AdverseEvents.csv']['ProductID'], stored_product_ids)
+        assert len(product_events) < len(stored)
+        assert (product_events['ProductID'] == '105').all()
+        for column in ('ProductID', 'PatientAge', 'EventDescription'):
+            assert shares_memory(product_events[column], stored[column]), column
+
+    assert data.version == version
+
+def test_cached_lookups_return_the_same_slice(data):
+    first = backend.get_product_slice('105', data)
+    second = backend.get_product_slice(105, data)
+
+    assert first is second
+    assert backend.get_product_data('105', data)['AdverseEvents.csv'] is first['AdverseEvents']
+
+def test_plain_dict_lookup_does_not_mutate_input():
+    df = pd.DataFrame({'ProductID': [101.0, 102.0, 101.0], 'ProductName': ['A', 'B', 'A']})
+    product_ids = df['ProductID']
+    data = {'Products.csv': df}
+
+    product_rows = backend.get_product_data('101', data)['Products.csv']
+
+    assert len(product_rows) == 2
+    assert data['Products.csv'] is df
+    assert df['ProductID'].dtype == 'float64'
+    assert np.shares_memory(df['ProductID'].to_numpy(), product_ids.to_numpy())
+
+def test_slice_summary_reuses_the_ingested_date_index(data, monkeypatch):
+    import report_generator
+
+    period = backend.normalize_period('2022-01-01', '2023-06-30')
+    product_slice = backend.get_product_slice('105', data, period)
+    assert product_slice.date_index['AdverseEvents'] is data.date_index['AdverseEvents.csv']
+
+    def build_index(*args, **kwargs):
+        raise AssertionError("summary rebuilt the date index")
+
+    monkeypatch.setattr(backend.DateIndex, 'from_frame', build_index)
+    summary = report_generator.prepare_data_summary(product_slice)
+
+    events = data['AdverseEvents.csv']
+    recent = events[(events['ProductID'] == '105') & (events['ReportedDate'] >= period[1] - pd.Timedelta(days=report_generator.RECENT_WINDOW_DAYS))
+                    & (events['ReportedDate'] < period[1])]
+    assert summary['adverse_events']['recent_events'] == len(recent)
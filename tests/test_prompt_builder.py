@@ -0,0 +1,46 @@
+import json
+
+import prompt_builder
+
+def build_summary(countries: int = 190, outcomes: int = 300) -> dict:
+    return {
+        'product': {'id': '101', 'name': 'Drug'},
+        'authorizations': {'total_countries': countries, 'countries': [f"Country {i}" for i in range(countries)]},
+        'adverse_events': {'total_events': 5000, 'outcomes': {f"Outcome {i}": 1000 - i for i in range(outcomes)}},
+        'section_fingerprints': {1: 'abc'}
+    }
+
+def test_small_summary_is_sent_unchanged():
+    summary = build_summary(countries=3, outcomes=3)
+
+    data_json, tokens = prompt_builder.build_prompt_data(summary)
+
+    assert json.loads(data_json) == json.loads(json.dumps({key: value for key, value in summary.items()
+                                                            if key != 'section_fingerprints'}))
+    assert tokens == prompt_builder.estimate_tokens(data_json)
+
+def test_top_k_compaction_stays_within_the_budget():
+    summary = build_summary()
+    full_tokens = prompt_builder.estimate_tokens(prompt_builder.compact_json(summary))
+
+    data_json, tokens = prompt_builder.build_prompt_data(summary, budget=800)
+
+    assert full_tokens > 800
+    assert tokens <= 800
+    data = json.loads(data_json)
+    outcomes = data['adverse_events']['outcomes']
+    other = [label for label in outcomes if label.startswith(prompt_builder.OTHER_LABEL)]
+    assert len(other) == 1
+    assert sum(outcomes.values()) == sum(summary['adverse_events']['outcomes'].values())
+    assert data['authorizations']['countries'][-1].startswith(prompt_builder.OTHER_LABEL)
+    assert data['authorizations']['total_countries'] == 190
+
+def test_bucketing_keeps_the_largest_counts():
+    counts = {'a': 5, 'b': 50, 'c': 1, 'd': 20}
+
+    assert prompt_builder.bucket_counts(counts, 2) == {'b': 50, 'd': 20, 'Other (2 values)': 6}
+
+def test_fields_limit_the_serialized_summary():
+    data_json, _ = prompt_builder.build_prompt_data(build_summary(3, 3), fields=['product'])
+
+    assert json.loads(data_json) == {'product': {'id': '101', 'name': 'Drug'}}
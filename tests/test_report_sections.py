@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+import llm_cache
+import report_generator
+from llm_engine import StubAPIError
+from llm_stubs import StubGeminiClient
+
+@pytest.fixture(autouse=True)
+def sections_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, 'SECTIONS_DIR', tmp_path / "sections")
+    monkeypatch.setattr(llm_cache, 'response_cache', None)
+    return tmp_path / "sections"
+
+def build_summary(event_count: int) -> dict:
+    frames = {
+        'Products': pd.DataFrame({'ProductID': ['101'], 'ProductName': ['Drug'], 'INN': ['inn'],
+                                  'DosageForm': ['Tablet'], 'Strength': ['5mg']}),
+        'AdverseEvents': pd.DataFrame({
+            'ProductID': ['101'] * event_count,
+            'ReportedDate': pd.to_datetime(['2024-01-15'] * event_count),
+            'PatientAge': [40.0] * event_count,
+            'Gender': ['Female'] * event_count,
+            'Outcome': ['Recovered'] * event_count
+        }),
+        'ExposureEstimates': pd.DataFrame({'ProductID': ['101'], 'Region': ['EU'], 'EstimatedPatients': [1000],
+                                           'EstimationMethod': ['Sales']})
+    }
+    return report_generator.summarize_products(frames, ['101'])['101']
+
+def generate(summary: dict, client: StubGeminiClient):
+    return report_generator.generate_section_report('101', summary, {}, client=client)
+
+def test_unchanged_sections_are_reused():
+    client = StubGeminiClient(latency=0.0, jitter=0.0)
+    summary = build_summary(3)
+
+    _, first = generate(summary, client)
+    report, second = generate(summary, client)
+
+    assert first == {'reused': [], 'regenerated': list(range(1, 13)), 'fallback': []}
+    assert second == {'reused': list(range(1, 13)), 'regenerated': [], 'fallback': []}
+    assert client.calls == 12
+    assert report.count("# Stub report") == 12
+
+def test_only_sections_using_changed_data_are_regenerated():
+    client = StubGeminiClient(latency=0.0, jitter=0.0)
+    generate(build_summary(3), client)
+
+    _, info = generate(build_summary(4), client)
+
+    uses_events = [number for number, (_, fields, _) in enumerate(report_generator.PSUR_SECTIONS, start=1)
+                   if 'adverse_events' in fields]
+    assert info['regenerated'] == uses_events
+    assert info['reused'] == [number for number in range(1, 13) if number not in uses_events]
+
+def test_prompt_template_changes_regenerate_sections(monkeypatch):
+    summary = build_summary(3)
+    fingerprints = report_generator.get_section_fingerprints(summary)
+
+    monkeypatch.setattr(report_generator, 'SECTION_PROMPT_TEMPLATE',
+                        report_generator.SECTION_PROMPT_TEMPLATE + "- Cite the data source\n")
+
+    changed = report_generator.get_section_fingerprints(summary)
+    assert all(changed[number] != fingerprints[number] for number in fingerprints)
+
+def test_sections_path_stays_in_the_sections_directory(sections_dir):
+    paths = {product_id: llm_cache.get_sections_path(product_id) for product_id in ('../../etc/passwd', 'a/b', 'a_b', '101')}
+
+    for path in paths.values():
+        assert path.parent == sections_dir
+    assert len(set(paths.values())) == len(paths)
+
+def test_sections_are_assembled_in_order_with_headings():
+    client = StubGeminiClient(latency=0.0, jitter=0.0)
+
+    report, _ = generate(build_summary(3), client)
+
+    positions = [report.index(f"## {number}. {title}")
+                 for number, (title, _, _) in enumerate(report_generator.PSUR_SECTIONS, start=1)]
+    assert positions == sorted(positions)
+
+def test_failed_section_is_taken_from_the_fallback_report():
+    client = StubGeminiClient(latency=0.0, jitter=0.0, failures=[StubAPIError(400, "INVALID_ARGUMENT")])
+
+    report, info = report_generator.generate_section_report('101', build_summary(3), {}, max_concurrency=1,
+                                                            client=client)
+
+    assert info['fallback'] == [1]
+    assert info['regenerated'] == list(range(2, 13))
+    assert report.count("# Stub report") == 11
+    assert "## 1. Title Page" in report
+
+def test_section_prompts_only_carry_their_fields():
+    summary = build_summary(3)
+
+    prompt = report_generator.create_section_prompt('101', 7, summary)
+
+    assert '"exposure"' in prompt
+    assert '"adverse_events"' not in prompt
+    assert '"product"' not in prompt
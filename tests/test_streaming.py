@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+import llm_cache
+import llm_engine
+import report_generator
+
+SUMMARY = {'product': {'name': 'Drug', 'id': '101'}}
+
+class StreamingClient:
+    """Client whose generate_content_stream yields chunks, optionally failing after fail_after of them"""
+
+    def __init__(self, chunks, fail_after: int = None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.models = self
+
+    def generate_content_stream(self, model, contents, config=None):
+        for index, text in enumerate(self.chunks):
+            if index == self.fail_after:
+                raise RuntimeError("connection reset")
+            yield SimpleNamespace(text=text)
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = llm_cache.ResponseCache(tmp_path)
+    monkeypatch.setattr(llm_cache, 'response_cache', cache)
+    return cache
+
+def stream(monkeypatch, client) -> list:
+    monkeypatch.setattr(llm_engine, 'llm_client', client)
+    monkeypatch.setattr(report_generator, 'create_psur_prompt', lambda product_id, summary, data: "prompt")
+    return list(report_generator.stream_ai_report('101', SUMMARY, {}))
+
+def test_joined_stream_equals_the_post_processed_report(monkeypatch, cache):
+    chunks = stream(monkeypatch, StreamingClient(["## 1. Title", "", " Page\n\nText"]))
+
+    assert ''.join(chunks) == report_generator.post_process_report("## 1. Title Page\n\nText", SUMMARY)
+    assert len(chunks) == 4
+
+def test_cached_response_is_yielded_at_once(monkeypatch, cache):
+    stream(monkeypatch, StreamingClient(["## 1. Title", " Page"]))
+
+    chunks = stream(monkeypatch, StreamingClient([], fail_after=0))
+
+    assert chunks == [report_generator.post_process_report("## 1. Title Page", SUMMARY)]
+
+def test_failure_before_any_text_yields_the_fallback_report(monkeypatch, cache):
+    monkeypatch.setattr(report_generator, 'generate_enhanced_fallback_report',
+                        lambda product_id, summary, data: "fallback report")
+
+    assert stream(monkeypatch, StreamingClient(["text"], fail_after=0)) == ["fallback report"]
+
+def test_interrupted_stream_keeps_the_partial_text_and_is_not_cached(monkeypatch, cache):
+    chunks = stream(monkeypatch, StreamingClient(["partial", " text", " lost"], fail_after=2))
+
+    report = ''.join(chunks)
+    assert "partial text" in report
+    assert "*Report generation was interrupted: connection reset*" in report
+    assert report.endswith(report_generator.get_report_footer())
+    assert not list(cache.cache_dir.glob('*.json'))
@@ -0,0 +1,103 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend
+import report_generator
+
+def build_frames() -> dict:
+    return {
+        'Products': pd.DataFrame({'ProductID': ['101'], 'ProductName': ['Drug'], 'INN': ['inn'],
+                                  'DosageForm': ['Tablet'], 'Strength': ['5mg']}),
+        'AdverseEvents': pd.DataFrame({
+            'ProductID': ['101'] * 3,
+            'ReportedDate': pd.to_datetime(['2023-02-01', '2024-05-01', '2024-06-30']),
+            'PatientAge': [30.0, 40.0, 50.0],
+            'Gender': ['Female'] * 3,
+            'Outcome': ['Recovered'] * 3
+        })
+    }
+
+def test_recent_counts_cover_the_end_of_the_period():
+    period = backend.normalize_period('2023-01-01', '2024-06-30')
+    summary = report_generator.summarize_products(build_frames(), ['101'], period)['101']
+
+    assert summary['adverse_events']['recent_events'] == 2
+    assert summary['recent_window'] == {'days': report_generator.RECENT_WINDOW_DAYS,
+                                        'start': '02-Apr-2024', 'end': '30-Jun-2024'}
+
+def test_fallback_report_labels_the_period_and_recent_window():
+    period = backend.normalize_period('2023-01-01', '2024-06-30')
+    summary = report_generator.summarize_products(build_frames(), ['101'], period)['101']
+
+    report = report_generator.generate_enhanced_fallback_report('101', summary, {})
+
+    assert "**PSUR Period:** 01-Jan-2023 to 30-Jun-2024" in report
+    assert "**Recent Events (last 90 days, 02-Apr-2024 to 30-Jun-2024):** 2 adverse events" in report
+    assert "2023+" not in report
+
+def test_fallback_report_without_a_period_says_so():
+    summary = report_generator.summarize_products(build_frames(), ['101'])['101']
+
+    report = report_generator.generate_enhanced_fallback_report('101', summary, {})
+
+    assert "**PSUR Period:** Not specified (all available data)" in report
+    assert f"to present):** 0 adverse events" in report
+
+def build_portfolio(products: int = 12, rows: int = 3000) -> backend.IngestedDatasets:
+    rng = np.random.default_rng(1)
+    product_ids = np.arange(101, 101 + products).astype(str)
+
+    def pick(values, size=rows):
+        return rng.choice(values, size)
+
+    def dates(size=rows):
+        return (pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 1200, size), unit='D')).strftime('%Y-%m-%d')
+
+    frames = {
+        'Products.csv': pd.DataFrame({'ProductID': product_ids, 'ProductName': [f"Drug {i}" for i in product_ids],
+                                      'INN': 'inn', 'DosageForm': 'Tablet', 'Strength': '5mg'}),
+        'Authorizations.csv': pd.DataFrame({'AuthorizationID': np.arange(200), 'ProductID': pick(product_ids, 200),
+                                            'Country': pick(['IN', 'DE', 'US', 'BR'], 200),
+                                            'MarketingStatus': pick(['Approved', 'Pending'], 200),
+                                            'AuthorizationDate': dates(200), 'LicenseNumber': 'L'}),
+        'AdverseEvents.csv': pd.DataFrame({'AEID': np.arange(rows), 'ProductID': pick(product_ids),
+                                           'ReportedDate': dates(), 'PatientAge': rng.integers(0, 95, rows),
+                                           'Gender': pick(['M', 'F', 'female']), 'EventDescription': 'Nausea',
+                                           'Outcome': pick(['Recovered', 'Fatal', 'Unknown'])}),
+        'RegulatoryActions.csv': pd.DataFrame({'ActionID': np.arange(300), 'ProductID': pick(product_ids, 300),
+                                               'ActionDate': dates(300), 'Region': pick(['EU', 'APAC'], 300),
+                                               'ActionTaken': pick(['Label update', 'Recall'], 300),
+                                               'Justification': 'Signal'}),
+        'ExposureEstimates.csv': pd.DataFrame({'ExposureID': np.arange(100), 'ProductID': pick(product_ids, 100),
+                                               'Region': pick(['EU', 'APAC'], 100), 'TimePeriod': '2023',
+                                               'EstimatedPatients': rng.integers(100, 10000, 100),
+                                               'EstimationMethod': pick(['Sales', 'Prescriptions'], 100)}),
+        'ClinicalStudies.csv': pd.DataFrame({'StudyID': np.arange(50), 'ProductID': pick(product_ids, 50),
+                                             'StudyTitle': 'Study', 'Status': pick(['Ongoing', 'Completed'], 50),
+                                             'CompletionDate': dates(50)})
+    }
+    uploads = {file_name: io.BytesIO(df.to_csv(index=False).encode('utf-8')) for file_name, df in frames.items()}
+    results = backend.ingest_all_files(uploads, stream_threshold=None)
+    return backend.process_validated_files(uploads, results)
+
+@pytest.mark.parametrize('reporting_period', [None, ('2022-01-01', '2022-12-31')])
+def test_grouped_summaries_match_per_product_summaries(reporting_period):
+    data = build_portfolio()
+    backend.product_slice_cache.clear()
+
+    portfolio = report_generator.prepare_portfolio_summaries(data, reporting_period=reporting_period)
+
+    assert len(portfolio) == 12
+    for product_id, summary in portfolio.items():
+        product_data = report_generator.extract_product_data(product_id, data, reporting_period)
+        assert summary == report_generator.prepare_data_summary(product_data)
+
+    events = data['AdverseEvents.csv']
+    if reporting_period:
+        start, end = backend.normalize_period(*reporting_period)
+        events = events[(events['ReportedDate'] >= start) & (events['ReportedDate'] < end)]
+    assert {product_id: summary['adverse_events']['total_events'] for product_id, summary in portfolio.items()} == \
+        events['ProductID'].value_counts().to_dict()
@@ -4,9 +4,11 @@ from datetime import datetime
 from pathlib import Path
 import matplotlib.pyplot as plt
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import seaborn as sns
 
+import backend
+
 def setup_logging():
     """Setup logging configuration with rotating logs"""
     
@@ -33,13 +35,14 @@ def setup_logging():
     logger.info("Pharma Pulse application started")
     logger.info(f"Logging to: {log_path}")
 
-def create_adverse_events_chart(ae_data: pd.DataFrame, product_id: str) -> str:
+def create_adverse_events_chart(ae_data: pd.DataFrame, product_id: str, age_bands: List[Tuple[str, float]] = None) -> str:
     """
     Create adverse events outcome chart
     
     Args:
         ae_data: Adverse events DataFrame
         product_id: Product ID for chart title
+        age_bands: (label, lower bound) age bands (defaults to the ICH age groups)
     
     Returns:
         Path to saved chart image
@@ -60,6 +63,7 @@ def create_adverse_events_chart(ae_data: pd.DataFrame, product_id: str) -> str:
         # Outcome distribution pie chart
         if 'Outcome' in ae_data.columns and not ae_data['Outcome'].empty:
             outcome_counts = ae_data['Outcome'].value_counts()
+            outcome_counts = outcome_counts[outcome_counts > 0]
             
             ax1.pie(outcome_counts.values, labels=outcome_counts.index, autopct='%1.1f%%', startangle=90)
             ax1.set_title(f'Adverse Events Outcomes\nProduct: {product_id}')
@@ -69,19 +73,16 @@ def create_adverse_events_chart(ae_data: pd.DataFrame, product_id: str) -> str:
         
         # Age distribution bar chart
         if 'PatientAge' in ae_data.columns and not ae_data['PatientAge'].empty:
-            # Create age groups
-            age_bins = [0, 18, 30, 50, 65, 100]
-            age_labels = ['0-17', '18-29', '30-49', '50-64', '65+']
-            ae_data['AgeGroup'] = pd.cut(ae_data['PatientAge'], bins=age_bins, labels=age_labels, right=False)
-            
-            age_counts = ae_data['AgeGroup'].value_counts().sort_index()
+            # Count events per age group
+            age_counts = backend.count_age_bands(ae_data['PatientAge'], age_bands or backend.AGE_BAND_PRESETS['ich'],
+                                                 include_unknown=False)
             
-            bars = ax2.bar(range(len(age_counts)), age_counts.values)
+            bars = ax2.bar(range(len(age_counts)), list(age_counts.values()))
             ax2.set_xlabel('Age Group')
             ax2.set_ylabel('Number of Events')
             ax2.set_title('Adverse Events by Age Group')
             ax2.set_xticks(range(len(age_counts)))
-            ax2.set_xticklabels(age_counts.index, rotation=45)
+            ax2.set_xticklabels(list(age_counts), rotation=45)
             
             # Add value labels on bars
             for bar in bars:
@@ -135,7 +136,7 @@ def create_exposure_chart(exposure_data: pd.DataFrame, product_id: str) -> str:
         
         if 'Region' in exposure_data.columns and 'EstimatedPatients' in exposure_data.columns:
             # Group by region and sum estimated patients
-            regional_exposure = exposure_data.groupby('Region')['EstimatedPatients'].sum().sort_values(ascending=True)
+            regional_exposure = exposure_data.groupby('Region', observed=True)['EstimatedPatients'].sum().sort_values(ascending=True)
             
             if not regional_exposure.empty:
                 bars = ax.barh(range(len(regional_exposure)), regional_exposure.values)
@@ -201,14 +202,12 @@ def create_regulatory_actions_timeline(reg_data: pd.DataFrame, product_id: str)
         fig, ax = plt.subplots(figsize=(12, 6))
         
         if 'ActionDate' in reg_data.columns and 'ActionTaken' in reg_data.columns and not reg_data.empty:
-            # Convert date column
-            reg_data['ActionDate'] = pd.to_datetime(reg_data['ActionDate'], errors='coerce')
-            reg_data = reg_data.dropna(subset=['ActionDate'])
+            # Convert date column without modifying the shared input frame
+            action_dates = pd.to_datetime(reg_data['ActionDate'], errors='coerce').dropna()
             
-            if not reg_data.empty:
+            if not action_dates.empty:
                 # Group by month and count actions
-                reg_data['YearMonth'] = reg_data['ActionDate'].dt.to_period('M')
-                monthly_actions = reg_data.groupby('YearMonth').size()
+                monthly_actions = action_dates.groupby(action_dates.dt.to_period('M')).size()
                 
                 ax.plot(monthly_actions.index.astype(str), monthly_actions.values, marker='o', linewidth=2, markersize=6)
                 ax.set_xlabel('Month')